@@ -0,0 +1,211 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from rutinas import construir_rutina, titulo_material
+
+# --- HISTORIAL DE ALUMNOS, RUTINAS Y 1RM (SQLite) ---
+# Un archivo SQLite junto a la app. Cada rutina generada se guarda con todo lo que
+# hace falta para rehacer sus documentos sin el formulario (material, parámetros,
+# ejercicios con su 1RM, estiramientos) y cada 1RM va además al historial del alumno.
+# Las consultas por alumno y fecha van por índice: "cargar la última rutina" es una
+# sola consulta. Cada archivo tiene una sola conexión por proceso, compartida por
+# todas las sesiones de Streamlit; el modo WAL deja leer a otros procesos (la CLI)
+# mientras la app escribe.
+RUTA_ALMACEN = "historial_rutinas.sqlite3"
+ESPERA_BLOQUEO = 10  # Segundos que espera una escritura si otra tiene la base bloqueada
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS alumnos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE COLLATE NOCASE
+);
+CREATE TABLE IF NOT EXISTS rutinas (
+    id INTEGER PRIMARY KEY,
+    alumno_id INTEGER NOT NULL REFERENCES alumnos(id),
+    fecha TEXT NOT NULL,
+    objetivo TEXT NOT NULL,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rutinas_alumno_fecha ON rutinas(alumno_id, fecha);
+CREATE TABLE IF NOT EXISTS historial_rm (
+    alumno_id INTEGER NOT NULL REFERENCES alumnos(id),
+    ejercicio TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    rm REAL NOT NULL,
+    rutina_id INTEGER REFERENCES rutinas(id)
+);
+CREATE INDEX IF NOT EXISTS idx_rm_alumno_ejercicio_fecha ON historial_rm(alumno_id, ejercicio, fecha);
+"""
+
+_conexiones = {}  # Ruta absoluta -> conexión compartida por todos los hilos
+_lock_conexiones = threading.RLock()
+
+
+@contextlib.contextmanager
+def _conexion(ruta=None):
+    """Conexión del archivo, compartida por todos los hilos y usada de uno en uno.
+    Streamlit ejecuta cada rerun en un hilo nuevo: una conexión por hilo se abriría
+    (y rehará el esquema) en cada rerun. Aquí el esquema y el modo WAL se preparan una
+    sola vez por archivo y proceso; las operaciones duran milisegundos."""
+    ruta = os.path.abspath(ruta or RUTA_ALMACEN)
+    with _lock_conexiones:
+        con = _conexiones.get(ruta)
+        if con is None or not os.path.exists(ruta):
+            if con is not None:
+                con.close()  # Borraron el archivo: se crea de nuevo
+            con = sqlite3.connect(ruta, timeout=ESPERA_BLOQUEO, check_same_thread=False)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            con.executescript(ESQUEMA)
+            _conexiones[ruta] = con
+        yield con
+
+
+def cerrar(ruta=None):
+    """Cierra la conexión del archivo (la siguiente operación abre otra)."""
+    with _lock_conexiones:
+        con = _conexiones.pop(os.path.abspath(ruta or RUTA_ALMACEN), None)
+        if con is not None:
+            con.close()
+
+
+def _ahora():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def guardar_rutina(alumno, objetivo, material, ejercicios, rm_inputs, intensidad, reps, descanso, series,
+                   cardio_tipo, cardio_tiempo, estiramientos=(), esquema="fijo", redondear_material=False,
+                   fecha=None, ruta=None):
+    """Guarda la rutina y los 1RM de sus ejercicios en una sola transacción.
+    'ejercicios' y 'estiramientos' son objetos del catálogo. Devuelve el id de la rutina."""
+    alumno = alumno.strip()
+    if not alumno:
+        raise ValueError("la rutina necesita el nombre del alumno")
+    fecha = fecha or _ahora()
+    datos = {
+        "material": list(material),
+        "intensidad": intensidad,
+        "reps": reps,
+        "descanso": descanso,
+        "series": series,
+        "esquema": esquema,
+        "redondear_material": bool(redondear_material),
+        "cardio_tipo": cardio_tipo,
+        "cardio_tiempo": cardio_tiempo,
+        "ejercicios": [[ej['nombre'], ej.get('tipo', ''), float(rm_inputs[ej['nombre']])] for ej in ejercicios],
+        "estiramientos": [e['nombre'] for e in estiramientos],
+    }
+    with _conexion(ruta) as con, con:
+        con.execute("INSERT OR IGNORE INTO alumnos (nombre) VALUES (?)", (alumno,))
+        alumno_id = con.execute("SELECT id FROM alumnos WHERE nombre = ?", (alumno,)).fetchone()[0]
+        rutina_id = con.execute(
+            "INSERT INTO rutinas (alumno_id, fecha, objetivo, datos) VALUES (?, ?, ?, ?)",
+            (alumno_id, fecha, objetivo, json.dumps(datos, ensure_ascii=False)),
+        ).lastrowid
+        con.executemany(
+            "INSERT INTO historial_rm (alumno_id, ejercicio, fecha, rm, rutina_id) VALUES (?, ?, ?, ?, ?)",
+            [(alumno_id, nombre, fecha, rm, rutina_id) for nombre, _, rm in datos["ejercicios"]],
+        )
+    return rutina_id
+
+
+def _registro(fila):
+    return {"id": fila["id"], "alumno": fila["alumno"], "fecha": fila["fecha"], "objetivo": fila["objetivo"],
+            **json.loads(fila["datos"])}
+
+
+def rutinas_alumno(alumno, desde=None, hasta=None, limite=None, ruta=None):
+    """Rutinas guardadas del alumno, de la más reciente a la más antigua. 'desde' y
+    'hasta' son fechas ISO ('2026-10-01'); 'hasta' incluye todo ese día."""
+    consulta = ("SELECT r.id, a.nombre AS alumno, r.fecha, r.objetivo, r.datos FROM rutinas r "
+                "JOIN alumnos a ON a.id = r.alumno_id WHERE a.nombre = ?")
+    parametros = [alumno.strip()]
+    if desde:
+        consulta += " AND r.fecha >= ?"
+        parametros.append(desde)
+    if hasta:
+        consulta += " AND r.fecha < ?"  # Hasta el final de ese día
+        parametros.append((date.fromisoformat(hasta[:10]) + timedelta(days=1)).isoformat())
+    consulta += " ORDER BY r.fecha DESC, r.id DESC"
+    if limite:
+        consulta += " LIMIT ?"
+        parametros.append(int(limite))
+    with _conexion(ruta) as con:
+        return [_registro(fila) for fila in con.execute(consulta, parametros)]
+
+
+def ultima_rutina(alumno, ruta=None):
+    """La rutina más reciente del alumno o None."""
+    rutinas = rutinas_alumno(alumno, limite=1, ruta=ruta)
+    return rutinas[0] if rutinas else None
+
+
+def ultimos_rm(alumno, ruta=None):
+    """{ejercicio: último 1RM guardado} del alumno."""
+    # En SQLite, con MAX() las columnas sueltas salen de la fila del máximo
+    with _conexion(ruta) as con:
+        filas = con.execute(
+            "SELECT h.ejercicio, h.rm, MAX(h.fecha) FROM historial_rm h JOIN alumnos a ON a.id = h.alumno_id "
+            "WHERE a.nombre = ? GROUP BY h.ejercicio",
+            (alumno.strip(),),
+        )
+        return {fila[0]: fila[1] for fila in filas}
+
+
+def historial_rm(alumno, ejercicio=None, ruta=None):
+    """DataFrame fecha / ejercicio / rm con la evolución del alumno (de más antiguo a más reciente)."""
+    consulta = ("SELECT h.fecha, h.ejercicio, h.rm FROM historial_rm h JOIN alumnos a ON a.id = h.alumno_id "
+                "WHERE a.nombre = ?")
+    parametros = [alumno.strip()]
+    if ejercicio:
+        consulta += " AND h.ejercicio = ?"
+        parametros.append(ejercicio)
+    consulta += " ORDER BY h.fecha, h.ejercicio"
+    with _conexion(ruta) as con:
+        filas = con.execute(consulta, parametros).fetchall()
+    return pd.DataFrame([tuple(f) for f in filas], columns=["fecha", "ejercicio", "rm"])
+
+
+def nombres_alumnos(ruta=None):
+    with _conexion(ruta) as con:
+        return [fila[0] for fila in con.execute("SELECT nombre FROM alumnos ORDER BY nombre")]
+
+
+def parametros_documento(registro, catalogo):
+    """Argumentos de generar_word_final / generar_pdf_final (sin 'incluir_analisis_muscular')
+    rehechos a partir de una rutina guardada. Lanza ValueError si el catálogo ya no
+    tiene alguno de sus ejercicios."""
+    seleccionados = []
+    rm_inputs = {}
+    for nombre, tipo, rm in registro["ejercicios"]:
+        ejercicio = catalogo.buscar(nombre, [tipo]) or catalogo.buscar(nombre)
+        if ejercicio is None:
+            raise ValueError(f"ejercicio desconocido '{nombre}'")
+        seleccionados.append(ejercicio)
+        rm_inputs[nombre] = rm
+    estiramientos = []
+    for nombre in registro["estiramientos"]:
+        estiramiento = catalogo.buscar(nombre)
+        if estiramiento is None:
+            raise ValueError(f"estiramiento desconocido '{nombre}'")
+        estiramientos.append(estiramiento)
+    rutina_export = construir_rutina(seleccionados, rm_inputs, registro["intensidad"], registro["reps"], registro["descanso"],
+                                     registro["series"], registro["esquema"], registro["redondear_material"])
+    return {
+        "rutina_df": pd.DataFrame(rutina_export),
+        "lista_estiramientos": estiramientos,
+        "objetivo": registro["objetivo"],
+        "alumno": registro["alumno"],
+        "titulo_material": titulo_material(registro["material"]),
+        "intensidad_str": f"{registro['intensidad']}%",
+        "cardio_tipo": registro["cardio_tipo"],
+        "cardio_tiempo": registro["cardio_tiempo"],
+        "series_str": registro["series"],
+    }
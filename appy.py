@@ -1,16 +1,19 @@
 import streamlit as st
 import pandas as pd
-import random
-import os
-from docx import Document
-from docx.shared import Inches, Pt, Cm, RGBColor
-from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_LINE_SPACING
-from docx.enum.table import WD_TABLE_ALIGNMENT, WD_CELL_VERTICAL_ALIGNMENT
-from docx.enum.section import WD_ORIENT
-from docx.oxml import OxmlElement, ns
-from docx.oxml.ns import qn
-from io import BytesIO
-from datetime import datetime
+import almacen
+import recursos
+from autorrelleno import completar_ejercicios, completar_estiramientos
+from imagenes import encontrar_imagen_recursiva, obtener_miniatura
+from cargas import ESQUEMAS_SERIES, estimar_1rm
+from catalogo import ROLES_MUSCULARES, CatalogoEjercicios
+from generador_pdf import MIME_PDF, generar_pdf_cacheado
+from generador_word import MIME_DOCX, generar_mesociclo_word, generar_variantes_cacheado, generar_word_cacheado, huella_documento
+from lote import MIME_ZIP, generar_lote, leer_lista_clase
+from mesociclo import (DESCARGA_CADA, DIAS_POR_DEFECTO, DIAS_POR_OBJETIVO, DIAS_SEMANA_MAX, DIAS_SEMANA_MIN,
+                       SEMANAS_MAX, SEMANAS_MIN, planificar_mesociclo)
+from pregeneracion import programar as programar_pregeneracion
+from rutinas import construir_rutina, titulo_material, volumen_por_musculo
+from tiempos import ULTIMAS_MEDICIONES
 
 # --- CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(page_title="Entrenador Pro Científico", layout="wide")
@@ -22,718 +25,106 @@ if 'reset_counter' not in st.session_state:
 def get_key(base_name):
     return f"{base_name}_{st.session_state.reset_counter}"
 
-# --- DATOS TEÓRICOS DE LOS OBJETIVOS ---
-INFO_OBJETIVOS = {
-    "Fuerza Máxima": """1️⃣ FUERZA MÁXIMA
-🎯 Objetivo
-Aumentar la capacidad máxima de producción de fuerza (adaptación neural).
-
-🏋️‍♂️ Trabajo de fuerza
-Intensidad: 85–100 % RM
-Repeticiones: 1–5
-Series: 4–6
-Descanso: 3–6 min
-Ejercicios: multiarticulares (sentadilla, peso muerto, press banca, press militar)
-
-❤️ Trabajo cardiovascular
-Tipo: aeróbico extensivo
-Intensidad: 60–70 % FCmáx
-Duración: 15–25 min
-Frecuencia: 1–2 días/semana
-Objetivo: recuperación, no interferir con la fuerza""",
-
-    "Hipertrofia Muscular": """2️⃣ HIPERTROFIA MUSCULAR
-🎯 Objetivo
-Aumentar el tamaño muscular (hipertrofia miofibrilar y sarcoplasmática).
-
-🏋️‍♂️ Trabajo de fuerza
-Intensidad: 65–85 % RM
-Repeticiones: 6–12
-Series: 3–6
-Descanso: 60–120 s
-RIR: 0–2 (cerca del fallo)
-
-❤️ Trabajo cardiovascular
-Tipo: aeróbico moderado
-Intensidad: 65–75 % FCmáx
-Duración: 20–30 min
-Frecuencia: 2–3 días/semana
-Objetivo: salud cardiovascular sin comprometer ganancias musculares""",
-
-    "Definición Muscular": """3️⃣ DEFINICIÓN MUSCULAR
-🎯 Objetivo
-Mantener masa muscular + reducir grasa corporal.
-
-🏋️‍♂️ Trabajo de fuerza
-Intensidad: 60–75 % RM
-Repeticiones: 10–15
-Series: 3–5
-Descanso: 30–60 s
-Métodos: superseries, circuitos, alta densidad
-
-❤️ Trabajo cardiovascular
-Tipo: HIIT + aeróbico
-HIIT: 85–95 % FCmáx | 10–20 min | 1–2 días/sem
-Aeróbico: 65–75 % FCmáx | 30–45 min | 2–3 días/sem""",
-
-    "Resistencia Muscular": """4️⃣ RESISTENCIA MUSCULAR
-🎯 Objetivo
-Mejorar la capacidad de sostener esfuerzos prolongados.
-
-🏋️‍♂️ Trabajo de fuerza
-Intensidad: 30–60 % RM
-Repeticiones: 15–30+
-Series: 2–4
-Descanso: 15–45 s
-Formato: circuitos o estaciones
-
-❤️ Trabajo cardiovascular
-Tipo: aeróbico extensivo
-Intensidad: 65–80 % FCmáx
-Duración: 30–60 min
-Frecuencia: 3–5 días/semana
-Objetivo: base aeróbica y resistencia general""",
-
-    "Mantenimiento Muscular": """5️⃣ MANTENIMIENTO MUSCULAR
-🎯 Objetivo
-Conservar masa muscular, fuerza y salud con bajo volumen.
-
-🏋️‍♂️ Trabajo de fuerza
-Intensidad: 60–75 % RM
-Repeticiones: 8–12
-Series: 2–3
-Descanso: 60–90 s
-Frecuencia: 2–3 días/semana
-
-❤️ Trabajo cardiovascular
-Tipo: aeróbico saludable
-Intensidad: 60–75 % FCmáx
-Duración: 20–40 min
-Frecuencia: 2–4 días/semana""",
-
-    "Rehabilitación Muscular y Articular": """5️⃣ REHABILITACIÓN MUSCULAR Y ARTICULAR
-🔁 Progresión recomendada (por fases)
-
-🟢 Fase 1 – Readaptación
-20–30 % RM
-Isométricos + movilidad
-Cardio muy suave
-
-🟡 Fase 2 – Reacondicionamiento
-30–50 % RM
-Concéntrico + excéntrico lento
-Propiocepción dinámica
-
-🔵 Fase 3 – Transición al entrenamiento
-50–60 % RM
-Patrones básicos
-Integración progresiva con mantenimiento muscular""",
-
-    "Programa de Pérdida de Peso": """🔥 PROGRAMA DE PÉRDIDA DE PESO
-
-🎯 Objetivo
-Reducir grasa corporal
-Mantener o minimizar la pérdida de masa muscular
-Aumentar el gasto energético total
-Mejorar la salud metabólica y cardiovascular
-Crear hábitos de actividad física sostenibles
-
-🏋️‍♂️ Fuerza (entrenamiento principal)
-🔹 Intensidad
-50–70 % de 1RM
-🔹 Repeticiones
-12–20 repeticiones
-🔹 Series
-3–4 series
-🔹 Descanso
-20–45 segundos
-
-🔹 Organización del trabajo
-Circuitos
-Superseries
-Ejercicios multiarticulares prioritarios
-Ritmo continuo, intensidad alta
-
-Objetivo de la fuerza
-Mantener masa muscular
-Aumentar gasto calórico
-Mejorar tono muscular
-
-❤️ Entrenamiento cardiovascular
-🔹 Aeróbico continuo
-Intensidad: 60–75 % FCmáx
-Duración: 30–60 min
-Frecuencia: 3–5 días/semana
-Ejemplos: caminar rápido, bici, elíptica, natación
-
-🔹 HIIT (opcional)
-Intensidad: 85–95 % FCmáx
-Duración: 10–20 min
-Frecuencia: 1–2 días/semana
-Formato: intervalos cortos de alta intensidad + recuperación activa
-
-🧠 Consejos clave
-La fuerza es imprescindible para no perder músculo
-No bajar de 50 % RM de forma sistemática
-Mantener déficit calórico moderado
-Priorizar adherencia y progresión
-Dormir y recuperarse adecuadamente
-Aumentar el NEAT- Non Exercice Activity Thermogenesis (pasos diarios, vida activa)
-Revaluar cargas cada 4–6 semanas
-
-⚠️ Errores comunes
-Solo cardio y nada de fuerza
-Usar cargas muy ligeras durante meses
-Descansos excesivos
-Déficits calóricos extremos"""
-}
-
-# --- FUNCIONES AUXILIARES WORD ---
-def create_element(name):
-    return OxmlElement(name)
-
-def create_attribute(element, name, value):
-    element.set(ns.qn(name), value)
-
-def add_page_number(run):
-    fldChar1 = create_element('w:fldChar')
-    create_attribute(fldChar1, 'w:fldCharType', 'begin')
-    instrText = create_element('w:instrText')
-    create_attribute(instrText, 'xml:space', 'preserve')
-    instrText.text = "PAGE"
-    fldChar2 = create_element('w:fldChar')
-    create_attribute(fldChar2, 'w:fldCharType', 'end')
-    run._r.append(fldChar1)
-    run._r.append(instrText)
-    run._r.append(fldChar2)
-
-def set_cell_bg_color(cell, hex_color):
-    tcPr = cell._tc.get_or_add_tcPr()
-    shd = OxmlElement('w:shd')
-    shd.set(qn('w:val'), 'clear')
-    shd.set(qn('w:color'), 'auto')
-    shd.set(qn('w:fill'), hex_color)
-    tcPr.append(shd)
-
-def style_header_cell(cell, text, width_inches=None):
-    cell.text = text
-    if width_inches:
-        cell.width = Inches(width_inches)
-    p = cell.paragraphs[0]
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run = p.runs[0]
-    run.font.bold = True
-    run.font.color.rgb = RGBColor(255, 255, 255)
-    set_cell_bg_color(cell, "2E4053")
-
-def set_row_cant_split(row):
-    tr = row._tr
-    trPr = tr.get_or_add_trPr()
-    cantSplit = OxmlElement('w:cantSplit')
-    trPr.append(cantSplit)
-
-def set_keep_with_next(paragraph):
-    paragraph.paragraph_format.keep_with_next = True
-
-# --- XML MAGIC: FUNCIÓN PARA MARCA DE AGUA FLOTANTE ---
-def add_float_picture(p, image_path_or_stream, width=None, height=None):
-    """
-    Inserta una imagen flotante en el párrafo 'p'.
-    La imagen se posiciona "Behind Text" (detrás del texto)
-    y se ancla a la parte INFERIOR IZQUIERDA de la PÁGINA.
-    """
-    run = p.add_run()
-    inline = run.add_picture(image_path_or_stream, width=width, height=height)
-    inline_shape = inline._inline
-    
-    # IDs aleatorios
-    shape_id = random.randint(1, 10000)
-    
-    # Crear la estructura XML para 'anchor' (flotante)
-    # Namespaces
-    wp = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
-    a  = 'http://schemas.openxmlformats.org/drawingml/2006/main'
-    pic = 'http://schemas.openxmlformats.org/drawingml/2006/picture'
-    
-    # Convertir inline a anchor
-    # Paso 1: Crear el elemento <wp:anchor>
-    anchor = OxmlElement('wp:anchor')
-    anchor.set('distT', "0")
-    anchor.set('distB', "0")
-    anchor.set('distL', "0")
-    anchor.set('distR', "0")
-    anchor.set('simplePos', "0")
-    anchor.set('relativeHeight', "251658240")
-    anchor.set('behindDoc', "1") # 1 = Detrás del texto
-    anchor.set('locked', "0")
-    anchor.set('layoutInCell', "1")
-    anchor.set('allowOverlap', "1")
-    
-    # Paso 2: simplePos
-    simplePos = OxmlElement('wp:simplePos')
-    simplePos.set('x', "0")
-    simplePos.set('y', "0")
-    anchor.append(simplePos)
-    
-    # Paso 3: Posición Horizontal (Alineado a la Izquierda de la Página)
-    positionH = OxmlElement('wp:positionH')
-    positionH.set('relativeFrom', "page")
-    posOffsetH = OxmlElement('wp:posOffset')
-    posOffsetH.text = "720000" # Unos 2 cm desde el borde izq (en EMUs)
-    positionH.append(posOffsetH)
-    anchor.append(positionH)
-    
-    # Paso 4: Posición Vertical (Alineado Abajo de la Página)
-    positionV = OxmlElement('wp:positionV')
-    positionV.set('relativeFrom', "page")
-    alignV = OxmlElement('wp:align')
-    alignV.text = "bottom" # Alineado abajo
-    positionV.append(alignV)
-    # Ajuste fino hacia arriba para que no se salga (offset negativo visual simulado)
-    # En XML puro, 'bottom' pega al borde. Si queremos margen, usamos posOffset con valor alto.
-    # Pero align=bottom suele funcionar bien para pies de página.
-    anchor.append(positionV)
-    
-    # Paso 5: Extent (Tamaño)
-    extent = OxmlElement('wp:extent')
-    extent.set('cx', str(inline_shape.extent.cx))
-    extent.set('cy', str(inline_shape.extent.cy))
-    anchor.append(extent)
-    
-    # Paso 6: EffectExtent
-    effectExtent = OxmlElement('wp:effectExtent')
-    effectExtent.set('l', "0")
-    effectExtent.set('t', "0")
-    effectExtent.set('r', "0")
-    effectExtent.set('b', "0")
-    anchor.append(effectExtent)
-    
-    # Paso 7: WrapNone (Para que no afecte al texto)
-    wrapNone = OxmlElement('wp:wrapNone')
-    anchor.append(wrapNone)
-    
-    # Paso 8: DocPr
-    docPr = OxmlElement('wp:docPr')
-    docPr.set('id', str(shape_id))
-    docPr.set('name', f"Picture {shape_id}")
-    anchor.append(docPr)
-    
-    # Paso 9: Graphic (El contenido real de la imagen)
-    graphic = inline_shape.graphic
-    anchor.append(graphic)
-    
-    # Reemplazar el elemento inline por el anchor en el párrafo
-    inline_parent = inline_shape.getparent()
-    inline_parent.replace(inline_shape, anchor)
-
-# --- BUSCADOR ---
-def encontrar_imagen_recursiva(nombre_objetivo):
-    if not nombre_objetivo or pd.isna(nombre_objetivo):
-        return None, "Celda Vacía"
-    nombre_limpio = str(nombre_objetivo).strip().lower()
-    nombre_base_excel = os.path.splitext(nombre_limpio)[0]
-    for root, dirs, files in os.walk("."):
-        for filename in files:
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                filename_base = os.path.splitext(filename)[0].lower()
-                if filename.lower() == nombre_limpio:
-                    return os.path.join(root, filename), "Exacta"
-                if filename_base == nombre_base_excel:
-                    return os.path.join(root, filename), "Por Nombre"
-    return None, f"No encontrado"
-
-# --- CARGAR EXCEL ---
-@st.cache_data
-def cargar_ejercicios():
-    try:
-        if os.path.exists("DB_EJERCICIOS.xlsx"):
-            df = pd.read_excel("DB_EJERCICIOS.xlsx")
-            df.columns = df.columns.str.strip().str.lower()
-            if 'nombre' not in df.columns:
-                if 'ejercicio' in df.columns: df.rename(columns={'ejercicio': 'nombre'}, inplace=True)
-            for col in ['tipo', 'imagen', 'desc', 'agonistas', 'sinergistas', 'estabilizadores']:
-                if col not in df.columns: df[col] = ""
-            
-            df['tipo'] = df['tipo'].astype(str).str.replace('Olimpica', 'Olímpica', regex=False)
-            df['tipo'] = df['tipo'].str.replace('olimpica', 'Olímpica', regex=False, case=False)
-            df['tipo'] = df['tipo'].str.replace('Rehabilitacion', 'Rehabilitación', regex=False)
-            df['tipo'] = df['tipo'].str.replace('Rotualiana', 'Rotuliana', regex=False)
-            df['tipo'] = df['tipo'].str.strip()
-            df = df.fillna("")
-            return df.to_dict('records')
-        else:
-            return None
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-DB_EJERCICIOS = cargar_ejercicios()
-
-# --- GENERADOR WORD ---
-def generar_word_final(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular):
-    doc = Document()
-    section = doc.sections[0]
-    section.orientation = WD_ORIENT.LANDSCAPE
-    section.page_width = Inches(11.69)
-    section.page_height = Inches(8.27)
-    section.top_margin = Cm(1.0)
-    section.bottom_margin = Cm(1.0)
-    section.left_margin = Cm(1.27)
-    section.right_margin = Cm(1.27)
-
-    # --- ENCABEZADO "HACK" (Marca de agua Fantasma) ---
-    header = section.header
-    # Limpiar header por si acaso
-    for p in header.paragraphs:
-        p._element.getparent().remove(p._element)
-    
-    path_watermark, _ = encontrar_imagen_recursiva("logo_firma")
-    if not path_watermark:
-        path_watermark, _ = encontrar_imagen_recursiva("watermark")
-
-    if path_watermark:
-        p_header = header.add_paragraph()
-        # Inyectamos la imagen flotante que se irá al fondo de la página
-        add_float_picture(p_header, path_watermark, width=Inches(2.5)) # Ajusta ancho si es necesario
-
-    # --- PIE DE PÁGINA (SOLO PAGINACIÓN) ---
-    footer = section.footer
-    for p in footer.paragraphs:
-        p._element.getparent().remove(p._element)
-    
-    p_foot = footer.add_paragraph()
-    p_foot.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    run_pag = p_foot.add_run("Página ")
-    run_pag.font.size = Pt(10)
-    add_page_number(p_foot.add_run())
-    p_foot.runs[-1].font.size = Pt(10) # Aplicar tamaño al número
-
-    # --- CUERPO DEL DOCUMENTO ---
-    
-    # PÁGINA 1
-    head_tbl = doc.add_table(rows=1, cols=2)
-    head_tbl.autofit = False
-    head_tbl.columns[0].width = Inches(9.8) 
-    head_tbl.columns[1].width = Inches(1.0)
-    
-    c1 = head_tbl.cell(0,0)
-    p = c1.paragraphs[0]
-    r1 = p.add_run(f"PROGRAMA DE ENTRENAMIENTO DE: {titulo_material.upper()}\n")
-    r1.font.bold = True
-    r1.font.size = Pt(12) 
-    r1.font.color.rgb = RGBColor(41, 128, 185)
-    
-    nombre_mostrar = alumno if alumno.strip() else "ALUMNO"
-    
-    font_size_meta = Pt(10) 
-    r_obj_label = p.add_run("OBJETIVO: ")
-    r_obj_label.font.bold = True
-    r_obj_label.font.size = font_size_meta
-    p.add_run(f"{objetivo}").font.size = font_size_meta
-    p.add_run("   |   ").font.size = font_size_meta 
-    
-    r_int_label = p.add_run("INTENSIDAD DE TRABAJO: ")
-    r_int_label.font.bold = True
-    r_int_label.font.size = font_size_meta
-    p.add_run(f"({intensidad_str})").font.size = font_size_meta
-    p.add_run("   |   ").font.size = font_size_meta 
-    
-    r_alu_label = p.add_run("ALUMNO/A: ")
-    r_alu_label.font.bold = True
-    r_alu_label.font.size = font_size_meta
-    p.add_run(f"{nombre_mostrar.upper()}").font.size = font_size_meta
-
-    c2 = head_tbl.cell(0,1)
-    p2 = c2.paragraphs[0]
-    p2.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p2.add_run(f"FECHA:\n{datetime.now().strftime('%d/%m/%Y')}").bold = True
-    
-    p_sub = doc.add_paragraph()
-    p_sub.alignment = WD_ALIGN_PARAGRAPH.LEFT 
-    run_sub = p_sub.add_run("Situación de Aprendizaje: Trabajo en Salas de Musculación 1º de Bachillerato IES Lucía de Medrano")
-    run_sub.font.bold = True
-    run_sub.font.name = 'Cambria'
-    run_sub.font.size = Pt(16)    
-    rPr = run_sub._element.get_or_add_rPr()
-    rFonts = OxmlElement('w:rFonts')
-    rFonts.set(qn('w:ascii'), 'Cambria')
-    rFonts.set(qn('w:hAnsi'), 'Cambria')
-    rPr.append(rFonts)
-
-    doc.add_paragraph("_" * 95)
-
-    h1 = doc.add_heading(level=1)
-    titulo_seccion_1 = '1. Guía Visual de Ejercicios con Análisis Muscular' if incluir_analisis_muscular else '1. Guía Visual de Ejercicios'
-    h1.add_run(titulo_seccion_1).font.color.rgb = RGBColor(44, 62, 80)
-
-    cardio_table = doc.add_table(rows=1, cols=2)
-    cardio_table.style = 'Table Grid'
-    c_warm = cardio_table.cell(0,0)
-    p_warm = c_warm.paragraphs[0]
-    p_warm.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run_w = p_warm.add_run("A) Calentamiento de 5 minutos de Duración")
-    run_w.font.bold = True
-    run_w.font.size = Pt(10)
-    set_cell_bg_color(c_warm, "EAEDED") 
-    c_card = cardio_table.cell(0,1)
-    p_card = c_card.paragraphs[0]
-    p_card.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    run_c = p_card.add_run(f"B) Cardio: {cardio_tipo} -> {cardio_tiempo}")
-    run_c.font.bold = True
-    run_c.font.size = Pt(10) 
-    set_cell_bg_color(c_card, "EAEDED") 
-    
-    doc.add_paragraph("")
-
-    num_ej = len(rutina_df)
-    cols_visual = 4
-    rows_visual = (num_ej + cols_visual - 1) // cols_visual
-    vis_table = doc.add_table(rows=rows_visual, cols=cols_visual)
-    vis_table.style = 'Table Grid'
-    
-    TR_HEIGHT_TWIPS = 3800 if incluir_analisis_muscular else 2800 
-    
-    for row in vis_table.rows:
-        tr = row._tr
-        trPr = tr.get_or_add_trPr()
-        trHeight = OxmlElement('w:trHeight')
-        trHeight.set(qn('w:val'), str(TR_HEIGHT_TWIPS))
-        trHeight.set(qn('w:hRule'), "atLeast")
-        trPr.append(trHeight)
-        set_row_cant_split(row)
-
-    for i, row_data in enumerate(rutina_df.to_dict('records')):
-        r = i // cols_visual
-        c = i % cols_visual
-        cell = vis_table.cell(r, c)
-        p = cell.paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        ruta_img, msg = encontrar_imagen_recursiva(row_data['Imagen'])
-        if ruta_img:
-            try:
-                run = p.add_run()
-                run.add_picture(ruta_img, width=Inches(2.4), height=Inches(1.55))
-                p.paragraph_format.space_before = Pt(4)
-                p.paragraph_format.space_after = Pt(2)
-            except:
-                p.add_run(f"[Error]\n")
-        else:
-            p.add_run(f"\n[FOTO NO DISPONIBLE]\n")
-        
-        run_nom = p.add_run("\n" + row_data['Ejercicio'])
-        run_nom.font.bold = True
-        run_nom.font.size = Pt(10)
-        
-        if incluir_analisis_muscular:
-            p.add_run("\n" + "_"*25 + "\n").font.size = Pt(6)
-            
-            p.add_run("Músculos Agonistas:\n").font.bold = True
-            p.add_run(f"{str(row_data.get('agonistas', ''))}\n").font.size = Pt(8)
-            
-            p.add_run("Músculos Sinergistas:\n").font.bold = True
-            p.add_run(f"{str(row_data.get('sinergistas', ''))}\n").font.size = Pt(8)
-
-            p.add_run("Músculos Estabilizadores:\n").font.bold = True
-            p.add_run(f"{str(row_data.get('estabilizadores', ''))}").font.size = Pt(8)
-
-    doc.add_page_break()
-
-    # PÁGINA 2
-    h2 = doc.add_heading(level=1)
-    run_h2 = h2.add_run('2. Rutina Detallada')
-    run_h2.font.size = Pt(18)
-    run_h2.font.color.rgb = RGBColor(44, 62, 80)
-
-    tech_table = doc.add_table(rows=1, cols=6)
-    tech_table.style = 'Table Grid'
-    tech_table.autofit = False 
-    widths = [0.7, 3.5, 1.5, 1.0, 1.5, 2.4] 
-    headers = ["Orden", "Ejercicio", "Series x Reps", "Carga", "Descanso", "Notas"]
-    row_hdr = tech_table.rows[0]
-    set_row_cant_split(row_hdr)
-    for i, h in enumerate(headers):
-        style_header_cell(row_hdr.cells[i], h, widths[i])
-        
-    for idx, row_data in rutina_df.iterrows():
-        row_cells = tech_table.add_row().cells
-        set_row_cant_split(tech_table.rows[-1])
-        for i in range(6):
-            row_cells[i].width = Inches(widths[i])
-        row_cells[0].text = str(idx + 1)
-        row_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        row_cells[1].text = row_data['Ejercicio']
-        row_cells[2].text = f"{series_str} x {row_data['Reps']}"
-        row_cells[3].text = f"{row_data['Peso']} kg"
-        row_cells[4].text = row_data['Descanso']
-        row_cells[5].text = f"Int: {row_data['Intensidad_Real']}" 
-
-    doc.add_paragraph("\n")
-
-    if lista_estiramientos:
-        h3 = doc.add_heading(level=1)
-        run_h3 = h3.add_run('3. Ejercicios de Estiramientos')
-        run_h3.font.size = Pt(18)
-        run_h3.font.color.rgb = RGBColor(44, 62, 80)
-        set_keep_with_next(h3)
-
-        num_est = len(lista_estiramientos)
-        cols_est = 4
-        rows_est = (num_est + cols_est - 1) // cols_est
-        est_table = doc.add_table(rows=rows_est, cols=cols_est)
-        est_table.style = 'Table Grid'
-        for row in est_table.rows:
-            tr = row._tr
-            trPr = tr.get_or_add_trPr()
-            trHeight = OxmlElement('w:trHeight')
-            trHeight.set(qn('w:val'), str(2600))
-            trHeight.set(qn('w:hRule'), "atLeast")
-            trPr.append(trHeight)
-            set_row_cant_split(row)
-
-        for i, item_est in enumerate(lista_estiramientos):
-            r = i // cols_est
-            c = i % cols_est
-            cell = est_table.cell(r, c)
-            p = cell.paragraphs[0]
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            ruta_img, msg = encontrar_imagen_recursiva(item_est['imagen'])
-            if ruta_img:
-                try:
-                    run = p.add_run()
-                    run.add_picture(ruta_img, width=Inches(2.2), height=Inches(1.4))
-                    p.paragraph_format.space_before = Pt(3)
-                    p.paragraph_format.space_after = Pt(3)
-                except:
-                    p.add_run(f"[Error]\n")
+# --- RECURSOS COMPARTIDOS (uno por proceso, de solo lectura) ---
+# Catálogo, índice de imágenes y plantillas viven en recursos.py y se cargan una vez
+# para todas las sesiones. Si se sustituye el Excel el catálogo se recarga solo.
+# Reiniciar NO toca estos recursos (afectaría a todas las sesiones del servidor).
+recursos.precargar()
+DB_EJERCICIOS = recursos.obtener_catalogo()
+
+# --- GALERÍA PAGINADA ---
+# Solo se resuelven y se envían al navegador las imágenes de la página visible
+TAMANOS_PAGINA_GALERIA = [12, 24, 48, 96]
+
+def mostrar_galeria(ejercicios, clave):
+    col_busq, col_tam, col_pag = st.columns([3, 1, 1])
+    with col_busq:
+        texto = st.text_input("🔎 Buscar por nombre o músculo (agonistas / sinergistas):", key=get_key(f"{clave}_busq"))
+    with col_tam:
+        tam_pagina = st.selectbox("Por página:", TAMANOS_PAGINA_GALERIA, index=1, key=get_key(f"{clave}_tam"))
+    filtrados = CatalogoEjercicios.buscar_texto(ejercicios, texto)
+    num_paginas = max(1, (len(filtrados) + tam_pagina - 1) // tam_pagina)
+    with col_pag:
+        # La clave incluye búsqueda y tamaño: al cambiarlos se vuelve a la página 1
+        pagina = st.number_input("Página:", 1, num_paginas, 1, key=get_key(f"{clave}_pag_{texto}_{tam_pagina}"))
+    st.caption(f"{len(filtrados)} ejercicios · página {pagina} de {num_paginas}")
+
+    inicio = (pagina - 1) * tam_pagina
+    cols_galeria = st.columns(6)
+    for i, ej in enumerate(filtrados[inicio:inicio + tam_pagina]):
+        with cols_galeria[i % 6]:
+            ruta, msg = encontrar_imagen_recursiva(ej['imagen'])
+            if ruta:
+                st.image(obtener_miniatura(ruta), caption=ej['nombre'], use_container_width=True)
             else:
-                p.add_run(f"\n[FOTO NO DISPONIBLE]\n")
-            run_nom = p.add_run("\n" + item_est['nombre'])
-            run_nom.font.bold = True
-            run_nom.font.size = Pt(9)
-        doc.add_paragraph("\n")
-
-    # ================= SECCIÓN 4: BORG (BLOQUE INDIVISIBLE) =================
-    h4 = doc.add_heading(level=1)
-    run_h4 = h4.add_run('4. Percepción del Esfuerzo (RPE) - Escala de Borg')
-    run_h4.font.size = Pt(18)
-    run_h4.font.color.rgb = RGBColor(44, 62, 80)
-    set_keep_with_next(h4)
-
-    borg_table = doc.add_table(rows=3, cols=5)
-    borg_table.style = 'Table Grid'
-    borg_table.autofit = True
-    
-    for row in borg_table.rows:
-        set_row_cant_split(row)
-
-    borg_data = [
-        {"val": "6-8", "txt": "Muy Ligero", "icon": "🙂", "color": "A9DFBF"},
-        {"val": "9-11", "txt": "Ligero", "icon": "😌", "color": "D4EFDF"},
-        {"val": "12-14", "txt": "Algo Duro", "icon": "😐", "color": "F9E79F"},
-        {"val": "15-17", "txt": "Duro", "icon": "😓", "color": "F5CBA7"},
-        {"val": "18-20", "txt": "Máximo", "icon": "🥵", "color": "E6B0AA"}
-    ]
-    
-    row_icons = borg_table.rows[0]
-    for i, data in enumerate(borg_data):
-        c = row_icons.cells[i]
-        p = c.paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        run_icon = p.add_run(f"{data['icon']}\n")
-        run_icon.font.size = Pt(26) 
-        run_val = p.add_run(f"{data['val']}")
-        run_val.font.size = Pt(14)
-        set_cell_bg_color(c, data['color'])
-
-    row_text = borg_table.rows[1]
-    for i, data in enumerate(borg_data):
-        c = row_text.cells[i]
-        p = c.paragraphs[0]
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.add_run(data['txt']).font.bold = True
-        set_cell_bg_color(c, data['color'])
-
-    row_check = borg_table.rows[2]
-    tr = row_check._tr
-    trPr = tr.get_or_add_trPr()
-    trHeight = OxmlElement('w:trHeight')
-    trHeight.set(qn('w:val'), "600")
-    trPr.append(trHeight)
-    for i, data in enumerate(borg_data):
-        c = row_check.cells[i]
-        set_cell_bg_color(c, data['color'])
-
-    p_note = doc.add_paragraph("Marca con una X la sensación global al terminar el entrenamiento.")
-    p_note.style = "Caption"
-    set_keep_with_next(p_note) # Para que no quede huérfana
-
-    doc.add_paragraph("\n")
-
-    # --- SECCIÓN 5: MARCO TEÓRICO ---
-    h5 = doc.add_heading(level=1)
-    run_h5 = h5.add_run(f"5. {objetivo.upper()}")
-    run_h5.font.size = Pt(18)
-    run_h5.font.color.rgb = RGBColor(44, 62, 80)
-    
-    raw_text = INFO_OBJETIVOS.get(objetivo, "Información no disponible.")
-    clean_lines = raw_text.split('\n')[1:] 
-    
-    emojis_clave = ['🎯', '🏋️‍♂️', '❤️', '🔁', '🟢', '🟡', '🔵', '🔥', '🔹', '🧠', '⚠️']
-    
-    for line in clean_lines:
-        if not line.strip(): 
-            continue 
-            
-        p_teoria = doc.add_paragraph()
-        
-        if any(line.strip().startswith(e) for e in emojis_clave):
-            parts = line.strip().split(' ', 1)
-            emoji_part = parts[0]
-            text_part = parts[1] if len(parts) > 1 else ""
-            
-            r_emo = p_teoria.add_run(emoji_part + " ")
-            r_emo.font.size = Pt(18) 
-            
-            r_txt = p_teoria.add_run(text_part)
-            r_txt.font.size = Pt(11) 
-        else:
-            r_normal = p_teoria.add_run(line)
-            r_normal.font.size = Pt(11)
-
-    doc.add_paragraph("\n")
-
-    # --- SECCIÓN 6: RESUMEN (IMAGEN) ---
-    h6 = doc.add_heading(level=1)
-    run_h6 = h6.add_run('6. RESUMEN DE FORMAS DE TRABAJO')
-    run_h6.font.size = Pt(18)
-    run_h6.font.color.rgb = RGBColor(44, 62, 80)
-    set_keep_with_next(h6)
-    
-    ruta_resumen, msg = encontrar_imagen_recursiva("tabla_resumen") 
-    if ruta_resumen:
+                st.caption(f"❌ {ej['nombre']}")
+
+# --- DOCUMENTOS FINALES (PREGENERADOS SI ES POSIBLE) ---
+# La sesión no guarda copia de los documentos: quedan en las cachés compartidas y las
+# descargas son diferidas (los bytes se leen solo cuando se pulsa el botón).
+def preparar_documentos(parametros_doc):
+    # Solo se espera al trabajo si ya se está construyendo; si sigue en cola se
+    # descarta y las dos variantes Word se generan aquí. Los PDF, al pulsar su descarga.
+    trabajo = st.session_state.get('pregeneracion')
+    if trabajo is not None and not trabajo.cancelado:
         try:
-            doc.add_picture(ruta_resumen, width=Inches(9.0))
-        except:
-            doc.add_paragraph("[Error al insertar la imagen de resumen]")
-    else:
-        doc.add_paragraph("[Imagen 'tabla_resumen' no encontrada]")
-
-    doc.add_paragraph("\n")
-
-    # --- SECCIÓN 7: REFLEXIÓN ALUMNO ---
-    h7 = doc.add_heading(level=1)
-    run_h7 = h7.add_run('7. MI CIRCUITO DE TRABAJO SE BASA EN LOS SIGUIENTES PRINCIPIOS DE ENTRENAMIENTO Y SIGUE LA SIGUIENTE LÓGICA')
-    run_h7.font.size = Pt(14)
-    run_h7.font.color.rgb = RGBColor(44, 62, 80)
-    set_keep_with_next(h7)
-    
-    p_inst = doc.add_paragraph("(Explica cómo y por qué estableces este circuito según tus objetivos y criterios científicos):")
-    p_inst.paragraph_format.space_after = Pt(200) 
+            if trabajo.esperar():
+                return
+        except Exception:
+            pass  # Fallo en segundo plano: se genera aquí mismo
+    generar_variantes_cacheado(**parametros_doc)
+
+def descarga_diferida(generador, parametros_doc, analisis):
+    # Si el documento ya salió de la caché, se vuelve a generar al pulsar
+    return lambda: generador(**parametros_doc, incluir_analisis_muscular=analisis).getvalue()
+
+def leer_desde_inicio(archivo):
+    archivo.seek(0)
+    return archivo.read()
+
+# --- HISTORIAL DEL ALUMNO (almacen.py) ---
+# Sufijo de las claves de intensidad / repeticiones / descanso de cada objetivo
+MAX_RUTINAS_HISTORIAL = 20
+CLAVES_OBJETIVO = {
+    "Fuerza Máxima": "fm",
+    "Hipertrofia Muscular": "hyp",
+    "Definición Muscular": "def",
+    "Programa de Pérdida de Peso": "pp",
+    "Resistencia Muscular": "res",
+    "Mantenimiento Muscular": "man",
+    "Rehabilitación Muscular y Articular": "rehab",
+}
 
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+def cargar_ultima_rutina():
+    """Rellena el formulario con la última rutina guardada del alumno. Va como
+    on_click porque el estado de los controles solo se puede cambiar antes de dibujarlos."""
+    estado = st.session_state
+    nombre_alumno = estado.get(get_key("alumno"), "")
+    registro = almacen.ultima_rutina(nombre_alumno) if nombre_alumno.strip() else None
+    if registro is None:
+        estado.aviso_historial = f"No hay rutinas guardadas de '{nombre_alumno}'."
+        return
+    sufijo = CLAVES_OBJETIVO[registro['objetivo']]
+    estado[get_key("sel_material")] = registro['material']
+    estado[get_key("objetivo")] = registro['objetivo']
+    estado[get_key("cardio")] = registro['cardio_tipo']
+    estado[get_key(f"int_{sufijo}")] = registro['intensidad']
+    estado[get_key(f"reps_{sufijo}")] = int(registro['reps'])
+    estado[get_key(f"desc_{sufijo}")] = registro['descanso']
+    if sufijo == "rehab":
+        estado[get_key("ser_reh")] = registro['series']
+    # Exactamente los ejercicios guardados, sin autorrelleno
+    estado[get_key("slider_ej")] = len(registro['ejercicios'])
+    estado[get_key("sel_ej")] = [nombre for nombre, _, _ in registro['ejercicios']]
+    estado[get_key("check_auto")] = False
+    for i, (nombre, _, rm) in enumerate(registro['ejercicios']):
+        estado[f"rm_{i}_{nombre}_{estado.reset_counter}"] = int(rm)
+    estado[get_key("esquema")] = registro['esquema']
+    estado[get_key("redondeo")] = registro['redondear_material']
+    if registro['estiramientos']:
+        estado[get_key("slider_est")] = len(registro['estiramientos'])
+        estado[get_key("sel_est")] = registro['estiramientos']
+    estado.aviso_historial = f"Cargada la rutina del {registro['fecha'][:10]}."
 
 # --- INTERFAZ STREAMLIT ---
 
@@ -748,16 +139,28 @@ st.markdown('<p class="big-font">Generador Científico de Rutinas creado por Jos
 st.markdown('<p class="sub-font">Situación de aprendizaje: Trabajo en Salas de Musculación 1º de Bachillerato IES Lucía de Medrano.</p>', unsafe_allow_html=True)
 st.markdown("---")
 
-imagenes_encontradas = []
-for root, dirs, files in os.walk("."):
-    for file in files:
-        if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-            imagenes_encontradas.append(file)
-if imagenes_encontradas:
-    st.sidebar.success(f"✅ {len(imagenes_encontradas)} imágenes detectadas.")
+num_imagenes = recursos.num_imagenes()
+if num_imagenes:
+    st.sidebar.success(f"✅ {num_imagenes} imágenes detectadas.")
 else:
     st.sidebar.error("❌ No hay imágenes en GitHub.")
 
+# --- ADMINISTRACIÓN: RECARGA EXPLÍCITA DE LAS CACHÉS COMPARTIDAS ---
+with st.sidebar.expander("⚙️ Administración"):
+    st.caption("Vuelve a leer el Excel y las imágenes y vacía los documentos en caché para TODAS las sesiones.")
+    st.button("♻️ Recargar base de datos e imágenes", on_click=recursos.recargar, key="btn_recargar_admin")
+    faltantes = recursos.imagenes_faltantes()
+    if faltantes:
+        st.warning(f"{len(faltantes)} ejercicios sin imagen")
+        st.dataframe(pd.DataFrame([(ej.nombre, ej.tipo, ej.imagen) for ej in faltantes], columns=["Ejercicio", "Tipo", "Imagen"]), hide_index=True)
+    if recursos.CAMBIOS_IMAGENES:
+        st.caption("Últimos cambios en las imágenes:")
+        st.text("\n".join(f"{'+' if evento == 'añadida' else '-'} {ruta}" for evento, ruta in reversed(recursos.CAMBIOS_IMAGENES)))
+    if st.checkbox("⏱️ Ver tiempos del último documento", key="check_tiempos_admin") and ULTIMAS_MEDICIONES:
+        ultima = ULTIMAS_MEDICIONES[-1]
+        st.caption(f"{ultima['documento']}: {ultima['total_ms']:.0f} ms en total")
+        st.dataframe(pd.DataFrame(list(ultima['etapas'].items()), columns=["Etapa", "ms"]), hide_index=True)
+
 if DB_EJERCICIOS is None:
     st.error("Error: DB_EJERCICIOS.xlsx no encontrado.")
     st.stop()
@@ -765,13 +168,47 @@ elif isinstance(DB_EJERCICIOS, str):
     st.error(DB_EJERCICIOS)
     st.stop()
 
+# --- GENERACIÓN POR LOTES ---
+with st.expander("👥 Generar rutinas de toda la clase (lista CSV / Excel)"):
+    st.caption("Columnas: alumno, objetivo, material, ejercicios (p. ej. `Press de Banca=80; Squats=100`). "
+               "Opcionales: intensidad, repeticiones, descanso, series, cardio, estiramientos, esquema (fijo, piramide, piramide_inversa, ondulante). "
+               "Las listas se separan con ';'.")
+    archivo_clase = st.file_uploader("Lista de clase:", type=["csv", "xlsx"], key=get_key("lista_clase"))
+    if archivo_clase is not None and st.button("⚙️ GENERAR RUTINAS DE LA CLASE", key=get_key("btn_lote")):
+        with st.spinner("Generando documentos..."):
+            filas_clase = leer_lista_clase(archivo_clase, archivo_clase.name)
+            zip_clase, num_alumnos, errores_lote = generar_lote(filas_clase, DB_EJERCICIOS)
+        st.success(f"{num_alumnos} alumnos procesados ({num_alumnos * 2} documentos).")
+        for error in errores_lote:
+            st.warning(error)
+        # El ZIP sigue en el archivo temporal (en disco si es grande) hasta que se descarga
+        st.download_button("📥 Descargar ZIP de la clase", lambda: leer_desde_inicio(zip_clase), "Rutinas_Clase.zip", MIME_ZIP, key=get_key("dl_lote"))
+
 col1, col2 = st.columns(2)
 with col1:
     alumno = st.text_input("Nombre del Alumno:", "", key=get_key("alumno"))
+    st.button("📂 Cargar última rutina", on_click=cargar_ultima_rutina, key=get_key("btn_cargar_ultima"))
+    if 'aviso_historial' in st.session_state:
+        st.info(st.session_state.pop('aviso_historial'))
+    rutinas_guardadas = almacen.rutinas_alumno(alumno, limite=MAX_RUTINAS_HISTORIAL) if alumno.strip() else []
+    if rutinas_guardadas:
+        with st.expander(f"📈 Historial de {alumno} ({len(rutinas_guardadas)} rutinas)"):
+            evolucion = almacen.historial_rm(alumno)
+            st.dataframe(evolucion.pivot_table(index="fecha", columns="ejercicio", values="rm", aggfunc="last"), use_container_width=True)
+            # Documentos de cualquier rutina guardada, sin pasar por el formulario
+            i_guardada = st.selectbox("Rutina guardada:", range(len(rutinas_guardadas)), key=get_key("rutina_guardada"),
+                                      format_func=lambda i: f"{rutinas_guardadas[i]['fecha'][:16].replace('T', ' ')} · {rutinas_guardadas[i]['objetivo']}")
+            guardada = rutinas_guardadas[i_guardada]
+            try:
+                parametros_guardada = almacen.parametros_documento(guardada, DB_EJERCICIOS)
+            except ValueError as e:
+                st.warning(f"No se puede regenerar: {e}")
+            else:
+                st.download_button("📥 Regenerar Word", descarga_diferida(generar_word_cacheado, parametros_guardada, False),
+                                   f"Rutina_{alumno}_{guardada['fecha'][:10]}.docx", MIME_DOCX, key=get_key("dl_guardada"))
     
     # 1. OBTENER TIPOS
-    tipos_todos = sorted(list(set([e['tipo'] for e in DB_EJERCICIOS if e['tipo']])))
-    tipos_entreno = [t for t in tipos_todos if 'estiramiento' not in t.lower()]
+    tipos_entreno = DB_EJERCICIOS.tipos_entreno
     
     # DEFAULT = None PARA EMPEZAR VACÍO
     sel_tipos = st.multiselect(
@@ -892,7 +329,7 @@ with col2:
         series_finales = st.selectbox("Series:", ["1", "2", "3", "4", "5"], index=2, key=get_key("ser_reh"))
 
 if sel_tipos:
-    ej_filtrados = [e for e in DB_EJERCICIOS if e['tipo'] in sel_tipos]
+    ej_filtrados = DB_EJERCICIOS.filtrar(sel_tipos)
     
     # RANGO 1-12
     default_val = 8 if objetivo == "Rehabilitación Muscular y Articular" else 6
@@ -909,17 +346,24 @@ else:
 st.subheader("Selección de Ejercicios")
 
 if sel_tipos:
+    # Filtro por músculo sobre el índice invertido del catálogo (sin recorrerlo)
+    col_mus, col_rol = st.columns([3, 1])
+    with col_mus:
+        musculos_filtro = st.multiselect("💪 Ejercicios para estos músculos:", DB_EJERCICIOS.grupos_musculares,
+                                         format_func=lambda g: f"{g} ({len(DB_EJERCICIOS.por_musculo(g, ('agonistas',)))})",
+                                         key=get_key("filtro_musculo"))
+    with col_rol:
+        st.write("")
+        solo_agonistas = st.checkbox("Solo como agonista", key=get_key("solo_agonista"))
+    ej_musculo = DB_EJERCICIOS.filtrar_musculos(ej_filtrados, musculos_filtro, ('agonistas',) if solo_agonistas else ROLES_MUSCULARES)
+
     with st.expander(f"📸 Ver Galería Visual de ejercicios disponibles ({', '.join(sel_tipos)})"):
-        cols_galeria = st.columns(6)
-        for i, ej in enumerate(ej_filtrados):
-            with cols_galeria[i % 6]:
-                ruta, msg = encontrar_imagen_recursiva(ej['imagen'])
-                if ruta:
-                    st.image(ruta, caption=ej['nombre'], use_container_width=True)
-                else:
-                    st.caption(f"❌ {ej['nombre']}")
+        mostrar_galeria(ej_musculo, "gal_ej")
 
-    nombres_fil = [e['nombre'] for e in ej_filtrados]
+    # Lo que ya estaba elegido sigue en la lista aunque no pase el filtro
+    nombres_material = {e['nombre'] for e in ej_filtrados}
+    ya_elegidos = [n for n in st.session_state.get(get_key("sel_ej"), []) if n in nombres_material]
+    nombres_fil = list(dict.fromkeys([e['nombre'] for e in ej_musculo] + ya_elegidos))
     seleccion = st.multiselect("Elige los ejercicios:", nombres_fil, max_selections=num_ej, key=get_key("sel_ej"))
 
     rellenar_auto = st.checkbox(f"Rellenar automáticamente hasta llegar a {num_ej} ejercicios", value=True, key=get_key("check_auto"))
@@ -932,11 +376,10 @@ if sel_tipos:
     
     if 'last_config_id' not in st.session_state or st.session_state.last_config_id != config_id:
         if rellenar_auto and len(nombres_finales) < num_ej:
-            pool = [x for x in ej_filtrados if x['nombre'] not in nombres_finales]
-            needed = num_ej - len(nombres_finales)
-            if needed <= len(pool):
-                extras = random.sample(pool, needed)
-                nombres_finales.extend([x['nombre'] for x in extras])
+            # Completa buscando la mayor cobertura muscular (ver autorrelleno.py)
+            fijos = [DB_EJERCICIOS.buscar(nom, sel_tipos) for nom in nombres_finales]
+            extras = completar_ejercicios(DB_EJERCICIOS, ej_filtrados, num_ej, fijos)[len(fijos):]
+            nombres_finales.extend([x['nombre'] for x in extras])
         st.session_state.final_names = nombres_finales
         st.session_state.last_config_id = config_id
     
@@ -944,7 +387,7 @@ if sel_tipos:
     
     seleccionados_data = []
     for nom in nombres_finales_estables:
-        obj_ejercicio = next((x for x in ej_filtrados if x['nombre'] == nom), None)
+        obj_ejercicio = DB_EJERCICIOS.buscar(nom, sel_tipos)
         if obj_ejercicio:
             seleccionados_data.append(obj_ejercicio)
 
@@ -959,7 +402,7 @@ if sel_tipos:
         with cols_prev[i % 6]:
             ruta, msg = encontrar_imagen_recursiva(item['imagen'])
             if ruta:
-                st.image(ruta, caption=item['nombre'], use_container_width=True)
+                st.image(obtener_miniatura(ruta), caption=item['nombre'], use_container_width=True)
             else:
                 st.error(f"❌ {item['imagen']}")
 
@@ -967,6 +410,7 @@ if sel_tipos:
     st.write(f"Introduce el 1RM actual. Se calculará el **{intensidad_seleccionada}%** automáticamente.")
     cols = st.columns(3)
     rm_inputs = {}
+    rm_previos = almacen.ultimos_rm(alumno) if alumno.strip() else {}  # Último 1RM guardado de cada ejercicio
     for i, ej in enumerate(seleccionados_data):
         with cols[i%3]:
             # === MEMORIA INTELIGENTE PARA 1RM ===
@@ -975,144 +419,143 @@ if sel_tipos:
                 f"1RM {ej['nombre']} (kg)", 
                 min_value=0, 
                 max_value=500, 
-                value=60, 
+                value=int(rm_previos.get(ej['nombre'], 60)), 
                 step=1, 
                 key=val_key
             )
 
+    with st.expander("🧮 ¿No conoces tu 1RM? Estímalo con peso × repeticiones"):
+        col_e1, col_e2, col_e3 = st.columns(3)
+        with col_e1:
+            peso_test = st.number_input("Peso levantado (kg):", 0.0, 500.0, 40.0, 2.5, key=get_key("peso_test"))
+        with col_e2:
+            reps_test = st.number_input("Repeticiones completas:", 1, 30, 8, key=get_key("reps_test"))
+        with col_e3:
+            epley, brzycki = (estimar_1rm(peso_test, reps_test, f) for f in ("epley", "brzycki"))
+            st.metric("1RM estimado (Epley / Brzycki)", f"{epley:.0f} / {brzycki:.0f} kg")
+        if reps_test > 10:
+            st.caption("Con más de 10 repeticiones las fórmulas pierden precisión.")
+
+    col_esq, col_red = st.columns(2)
+    with col_esq:
+        esquema_series = st.selectbox("Esquema de series:", list(ESQUEMAS_SERIES), format_func=ESQUEMAS_SERIES.get, key=get_key("esquema"))
+    with col_red:
+        st.write("")
+        redondear_material = st.checkbox("Redondear a los discos / mancuernas disponibles", key=get_key("redondeo"))
+    rutina_export = construir_rutina(seleccionados_data, rm_inputs, intensidad_seleccionada, reps_seleccionadas, descanso_seleccionado,
+                                     series_finales, esquema_series, redondear_material)
+    if rutina_export:
+        st.dataframe(pd.DataFrame([(r['Ejercicio'], f"{r['Peso']} kg", r['Intensidad_Real']) for r in rutina_export],
+                                  columns=["Ejercicio", "Carga", "% RM"]), hide_index=True, use_container_width=True)
+        with st.expander("💪 Volumen de la sesión por grupo muscular (series × repeticiones)"):
+            st.dataframe(volumen_por_musculo(seleccionados_data, series_finales, reps_seleccionadas),
+                         hide_index=True, use_container_width=True)
+
     st.markdown("---")
     st.subheader("Vuelta a la Calma: Estiramientos")
 
-    pool_estiramientos = [e for e in DB_EJERCICIOS if 'estiramiento' in str(e['tipo']).lower()]
-    nombres_est = [e['nombre'] for e in pool_estiramientos]
+    pool_estiramientos = DB_EJERCICIOS.estiramientos
+    nombres_est = DB_EJERCICIOS.nombres_estiramientos
 
     if pool_estiramientos:
         with st.expander("🧘 Ver Galería Visual de Estiramientos disponibles"):
-            cols_est_gal = st.columns(6)
-            for i, ej in enumerate(pool_estiramientos):
-                with cols_est_gal[i % 6]:
-                    ruta, msg = encontrar_imagen_recursiva(ej['imagen'])
-                    if ruta:
-                        st.image(ruta, caption=ej['nombre'], use_container_width=True)
-                    else:
-                        st.caption(f"❌ {ej['nombre']}")
+            mostrar_galeria(pool_estiramientos, "gal_est")
 
         num_est_select = st.slider("Cantidad de estiramientos:", 1, 12, 4, key=get_key("slider_est"))
         seleccion_est = st.multiselect("Elige estiramientos:", nombres_est, max_selections=num_est_select, key=get_key("sel_est"))
         
         # Estabilización de estiramientos
-        config_est_id = f"EST_{num_est_select}_{seleccion_est}_{st.session_state.reset_counter}"
+        # Incluye los ejercicios: los estiramientos automáticos dependen de los músculos trabajados
+        config_est_id = f"EST_{num_est_select}_{seleccion_est}_{nombres_finales_estables}_{st.session_state.reset_counter}"
         
         if 'last_est_id' not in st.session_state or st.session_state.last_est_id != config_est_id:
             estiramientos_finales_nombres = seleccion_est.copy()
             if len(estiramientos_finales_nombres) < num_est_select:
-                pool_est = [x['nombre'] for x in pool_estiramientos if x['nombre'] not in estiramientos_finales_nombres]
-                needed_est = num_est_select - len(estiramientos_finales_nombres)
-                if needed_est <= len(pool_est):
-                     estiramientos_finales_nombres.extend(random.sample(pool_est, needed_est))
+                fijos_est = [DB_EJERCICIOS.buscar(nom) for nom in estiramientos_finales_nombres]
+                extras_est = completar_estiramientos(DB_EJERCICIOS, seleccionados_data, num_est_select, fijos_est)[len(fijos_est):]
+                estiramientos_finales_nombres.extend([x['nombre'] for x in extras_est])
             st.session_state.final_est_names = estiramientos_finales_nombres
             st.session_state.last_est_id = config_est_id
             
         estiramientos_finales = []
         for nom in st.session_state.final_est_names:
-             estiramientos_finales.append(next(x for x in pool_estiramientos if x['nombre'] == nom))
+             estiramientos_finales.append(DB_EJERCICIOS.buscar(nom))
 
     else:
         st.warning("⚠️ No se han encontrado ejercicios marcados como 'Estiramientos' en el Excel.")
         estiramientos_finales = []
 
+    # --- PREGENERACIÓN EN SEGUNDO PLANO ---
+    # Con cada cambio se lanza (y se cancela el anterior) el trabajo que construye
+    # las dos variantes; cuando se pulsa el botón normalmente ya está terminado.
+    parametros_doc = dict(
+        rutina_df=pd.DataFrame(rutina_export),
+        lista_estiramientos=estiramientos_finales,
+        objetivo=objetivo,
+        alumno=alumno,
+        titulo_material=titulo_material(sel_tipos),
+        intensidad_str=f"{intensidad_seleccionada}%",
+        cardio_tipo=cardio_seleccion,
+        cardio_tiempo=cardio_duracion,
+        series_str=series_finales,
+    )
+    huella_actual = huella_documento(**parametros_doc, incluir_analisis_muscular=True)
+    st.session_state.pregeneracion = programar_pregeneracion(huella_actual, parametros_doc, st.session_state.get('pregeneracion'))
+
+    # --- MESOCICLO ---
+    # El plan se recalcula en cada rerun (es numpy sobre unos pocos ejercicios); el
+    # documento solo se genera al pulsar la descarga
+    with st.expander("📅 Planificar un mesociclo (4-12 semanas) con esta rutina"):
+        col_sem, col_dias, col_desc = st.columns(3)
+        with col_sem:
+            semanas_meso = st.slider("Semanas:", SEMANAS_MIN, SEMANAS_MAX, 8, key=get_key("meso_semanas"))
+        with col_dias:
+            dias_meso = st.slider("Sesiones por semana:", DIAS_SEMANA_MIN, DIAS_SEMANA_MAX, DIAS_POR_OBJETIVO.get(objetivo, DIAS_POR_DEFECTO),
+                                  key=get_key(f"meso_dias_{objetivo}"))
+        with col_desc:
+            descarga_meso = st.slider("Semana de descarga cada:", 3, 6, DESCARGA_CADA, key=get_key("meso_descarga"))
+        if seleccionados_data:
+            plan_meso = planificar_mesociclo(seleccionados_data, rm_inputs, objetivo, intensidad_seleccionada, reps_seleccionadas,
+                                             descanso_seleccionado, series_finales, semanas_meso, dias_meso, descarga_meso, redondear_material)
+            for dia, ejercicios_dia in plan_meso['dias'].items():
+                st.caption(f"**Día {dia}:** {', '.join(e['nombre'] for e in ejercicios_dia)}")
+            st.dataframe(plan_meso['calendario'], hide_index=True, use_container_width=True,
+                         column_config={"Intensidad": st.column_config.NumberColumn("% RM", format="%g%%")})
+            st.download_button("📥 Descargar mesociclo (Word)",
+                               lambda: generar_mesociclo_word(plan_meso, estiramientos_finales, alumno, titulo_material(sel_tipos),
+                                                              cardio_seleccion, cardio_duracion).getvalue(),
+                               f"Mesociclo_{alumno}.docx", MIME_DOCX, key=get_key("dl_meso"))
+
     # --- BOTONES FINALES ---
     st.write("---")
     st.subheader("Generar Informe")
     col_pdf, col_reset = st.columns([2, 1])
 
     with col_pdf:
-        if st.button("📄 GENERAR DOCUMENTO ESTÁNDAR", type="primary", use_container_width=True, key=get_key("btn_std")):
-            rutina_export = []
-            for item in seleccionados_data:
-                rm = rm_inputs[item['nombre']]
-                factor = intensidad_seleccionada / 100.0
-                peso_real = int(rm * factor)
-                rutina_export.append({
-                    "Ejercicio": item['nombre'],
-                    "Imagen": item['imagen'],
-                    "Reps": reps_seleccionadas,
-                    "Peso": peso_real,
-                    "Descanso": descanso_seleccionado,
-                    "Intensidad_Real": f"{intensidad_seleccionada}%",
-                    "agonistas": item.get('agonistas', ''),
-                    "sinergistas": item.get('sinergistas', ''),
-                    "estabilizadores": item.get('estabilizadores', '')
-                })
-            df = pd.DataFrame(rutina_export)
-            
-            if len(sel_tipos) > 1:
-                titulo_doc = "MIXTO"
-            elif len(sel_tipos) == 1:
-                titulo_doc = sel_tipos[0]
-            else:
-                titulo_doc = "GENERAL"
-            
-            docx = generar_word_final(
-                rutina_df=df, 
-                lista_estiramientos=estiramientos_finales, 
-                objetivo=objetivo, 
-                alumno=alumno, 
-                titulo_material=titulo_doc, 
-                intensidad_str=f"{intensidad_seleccionada}%", 
-                cardio_tipo=cardio_seleccion, 
-                cardio_tiempo=cardio_duracion,
-                series_str=series_finales,
-                incluir_analisis_muscular=False # <--- MODO ESTÁNDAR
-            )
-            st.success(f"Informe Estándar Generado: {objetivo}")
-            st.download_button("📥 Descargar Word Estándar", docx, f"Rutina_{alumno}_Estandar.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", key=get_key("dl_std"))
-
-        if st.button("🧬 GENERAR DOCUMENTO CON ANÁLISIS MUSCULAR", use_container_width=True, key=get_key("btn_ana")):
-            rutina_export = []
-            for item in seleccionados_data:
-                rm = rm_inputs[item['nombre']]
-                factor = intensidad_seleccionada / 100.0
-                peso_real = int(rm * factor)
-                rutina_export.append({
-                    "Ejercicio": item['nombre'],
-                    "Imagen": item['imagen'],
-                    "Reps": reps_seleccionadas,
-                    "Peso": peso_real,
-                    "Descanso": descanso_seleccionado,
-                    "Intensidad_Real": f"{intensidad_seleccionada}%",
-                    "agonistas": item.get('agonistas', ''),
-                    "sinergistas": item.get('sinergistas', ''),
-                    "estabilizadores": item.get('estabilizadores', '')
-                })
-            df = pd.DataFrame(rutina_export)
-            
-            if len(sel_tipos) > 1:
-                titulo_doc = "MIXTO"
-            elif len(sel_tipos) == 1:
-                titulo_doc = sel_tipos[0]
-            else:
-                titulo_doc = "GENERAL"
-            
-            docx = generar_word_final(
-                rutina_df=df, 
-                lista_estiramientos=estiramientos_finales, 
-                objetivo=objetivo, 
-                alumno=alumno, 
-                titulo_material=titulo_doc, 
-                intensidad_str=f"{intensidad_seleccionada}%", 
-                cardio_tipo=cardio_seleccion, 
-                cardio_tiempo=cardio_duracion,
-                series_str=series_finales,
-                incluir_analisis_muscular=True # <--- MODO ANÁLISIS
-            )
-            st.success(f"Informe con Análisis Muscular Generado: {objetivo}")
-            st.download_button("📥 Descargar Word con Análisis", docx, f"Rutina_{alumno}_Analisis.docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", key=get_key("dl_ana"))
+        # Una sola generación para las dos variantes (Estándar y Análisis Muscular)
+        if st.button("📄 GENERAR DOCUMENTOS (ESTÁNDAR Y CON ANÁLISIS MUSCULAR)", type="primary", use_container_width=True, key=get_key("btn_gen")):
+            preparar_documentos(parametros_doc)
+            st.success(f"Informes Generados: {objetivo}")
+            if alumno.strip():
+                almacen.guardar_rutina(alumno, objetivo, sel_tipos, seleccionados_data, rm_inputs, intensidad_seleccionada,
+                                       reps_seleccionadas, descanso_seleccionado, series_finales, cardio_seleccion, cardio_duracion,
+                                       estiramientos_finales, esquema_series, redondear_material)
+                st.caption("💾 Rutina guardada en el historial del alumno.")
+            col_dl_std, col_dl_ana = st.columns(2)
+            with col_dl_std:
+                st.download_button("📥 Descargar Word Estándar", descarga_diferida(generar_word_cacheado, parametros_doc, False), f"Rutina_{alumno}_Estandar.docx", MIME_DOCX, use_container_width=True, key=get_key("dl_std"))
+                st.download_button("📥 Descargar PDF Estándar", descarga_diferida(generar_pdf_cacheado, parametros_doc, False), f"Rutina_{alumno}_Estandar.pdf", MIME_PDF, use_container_width=True, key=get_key("dl_std_pdf"))
+            with col_dl_ana:
+                st.download_button("📥 Descargar Word con Análisis", descarga_diferida(generar_word_cacheado, parametros_doc, True), f"Rutina_{alumno}_Analisis.docx", MIME_DOCX, use_container_width=True, key=get_key("dl_ana"))
+                st.download_button("📥 Descargar PDF con Análisis", descarga_diferida(generar_pdf_cacheado, parametros_doc, True), f"Rutina_{alumno}_Analisis.pdf", MIME_PDF, use_container_width=True, key=get_key("dl_ana_pdf"))
 
 # --- LÓGICA DE REINICIO ---
+# Solo afecta a la sesión actual: las cachés compartidas se conservan
 def reset_app():
     st.session_state.reset_counter += 1
-    st.cache_data.clear()
+    if 'pregeneracion' in st.session_state:
+        st.session_state.pregeneracion.cancelar()
+        del st.session_state.pregeneracion
     if 'last_config_id' in st.session_state: del st.session_state.last_config_id
     if 'last_est_id' in st.session_state: del st.session_state.last_est_id
 
@@ -0,0 +1,104 @@
+import numpy as np
+
+# --- AUTORRELLENO DE LA RUTINA ---
+# Completa la selección del alumno buscando cubrir el máximo de grupos musculares
+# (catalogo.matriz_roles) en lugar de sacar ejercicios al azar. La puntuación de
+# una selección es:
+#   - por cada grupo, el peso del mejor rol con que lo trabaja algún ejercicio
+#     (agonista 1, sinergista 0,5, estabilizador 0,25), multiplicado por la demanda
+#     del grupo (1 para los ejercicios; los músculos entrenados para los estiramientos)
+#   - menos PENALIZACION_REPETIDO por cada vez que un grupo vuelve a ser agonista
+# Se rellena con un voraz (el que más suma en cada paso) y después se prueban
+# intercambios hueco a hueco hasta que ninguno mejora. Todo va en numpy sobre la
+# matriz de candidatos, así que con miles de ejercicios tarda milisegundos.
+PESOS_ROL = np.array([0.0, 0.25, 0.5, 1.0], dtype=np.float32)  # Índice = valor de catalogo.matriz_roles
+NIVEL_AGONISTA = 3
+PENALIZACION_REPETIDO = 0.5
+DEMANDA_BASE_ESTIRAMIENTOS = 0.1  # Para que un músculo no entrenado cuente algo
+RUIDO_DESEMPATE = 1e-3  # Entre selecciones igual de buenas decide el azar, como antes
+MAX_RONDAS_INTERCAMBIO = 5
+
+
+def _matrices(catalogo, ejercicios):
+    filas = np.array([ej.orden for ej in ejercicios], dtype=np.intp)
+    roles = catalogo.matriz_roles[filas]
+    return PESOS_ROL[roles], (roles == NIVEL_AGONISTA).astype(np.float32)
+
+
+def _optimizar(pesos, agonistas, codigos, total, cubierto_fijos, repeticiones_fijos, rng):
+    """Índices de hasta 'total' filas de 'pesos' que maximizan la puntuación partiendo
+    de lo que ya cubren los fijos. 'codigos' identifica los nombres: nunca se eligen
+    dos filas con el mismo nombre (los hay repetidos en varios tipos)."""
+    ruido = rng.random(len(pesos)) * RUIDO_DESEMPATE
+
+    def valores(elegidos):
+        # Lo que sumaría cada candidato junto a 'elegidos' (sin los términos comunes)
+        cubierto = cubierto_fijos
+        repeticiones = repeticiones_fijos
+        if elegidos:
+            cubierto = np.maximum(cubierto, pesos[elegidos].max(axis=0))
+            repeticiones = repeticiones + agonistas[elegidos].sum(axis=0)
+        valor = (np.maximum(pesos, cubierto).sum(axis=1)
+                 - PENALIZACION_REPETIDO * (agonistas @ (repeticiones > 0)) + ruido)
+        usados = np.zeros(codigos.max() + 1, dtype=bool)
+        usados[codigos[elegidos]] = True
+        valor[usados[codigos]] = -np.inf
+        return valor
+
+    elegidos = []
+    for _ in range(total):
+        valor = valores(elegidos)
+        i = int(np.argmax(valor))
+        if valor[i] == -np.inf:
+            break
+        elegidos.append(i)
+
+    # Búsqueda local: cambiar un elegido por el mejor candidato mientras mejore
+    for _ in range(MAX_RONDAS_INTERCAMBIO):
+        mejorado = False
+        for pos, actual in enumerate(elegidos):
+            resto = elegidos[:pos] + elegidos[pos + 1:]
+            valor = valores(resto)
+            j = int(np.argmax(valor))
+            if valor[j] > valor[actual] + 1e-9:
+                elegidos[pos] = j
+                mejorado = True
+        if not mejorado:
+            break
+    return elegidos
+
+
+def _completar(catalogo, candidatos, total, fijos, demanda_de, semilla):
+    fijos = list(fijos)
+    nombres_fijos = {ej.nombre for ej in fijos}
+    candidatos = [ej for ej in candidatos if ej.nombre not in nombres_fijos]
+    faltan = total - len(fijos)
+    if faltan <= 0 or not candidatos:
+        return fijos
+    pesos, agonistas = _matrices(catalogo, candidatos)
+    pesos = pesos * demanda_de
+    if fijos:
+        pesos_fijos, agonistas_fijos = _matrices(catalogo, fijos)
+        cubierto, repeticiones = (pesos_fijos * demanda_de).max(axis=0), agonistas_fijos.sum(axis=0)
+    else:
+        cubierto, repeticiones = np.zeros(pesos.shape[1]), np.zeros(pesos.shape[1])
+    codigo_nombre = {}
+    codigos = np.array([codigo_nombre.setdefault(ej.nombre, len(codigo_nombre)) for ej in candidatos])
+    elegidos = _optimizar(pesos, agonistas, codigos, faltan, cubierto, repeticiones,
+                          np.random.default_rng(semilla))
+    return fijos + [candidatos[i] for i in elegidos]
+
+
+def completar_ejercicios(catalogo, candidatos, total, fijos=(), semilla=None):
+    """'fijos' (lo que eligió el alumno) más los candidatos que mejor completan la
+    cobertura muscular hasta 'total' ejercicios (menos si no hay bastantes)."""
+    return _completar(catalogo, candidatos, total, fijos, 1.0, semilla)
+
+
+def completar_estiramientos(catalogo, entrenados, total, fijos=(), semilla=None):
+    """'fijos' más los estiramientos del catálogo que mejor cubren los músculos
+    trabajados en 'entrenados', hasta 'total'."""
+    demanda = np.full(len(catalogo.grupos_musculares), DEMANDA_BASE_ESTIRAMIENTOS)
+    if entrenados:
+        demanda = demanda + _matrices(catalogo, entrenados)[0].max(axis=0)
+    return _completar(catalogo, catalogo.estiramientos, total, fijos, demanda, semilla)
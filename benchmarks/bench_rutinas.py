@@ -0,0 +1,459 @@
+"""
+Benchmarks de los caminos críticos de la generación de rutinas.
+
+    python benchmarks/bench_rutinas.py
+    python benchmarks/bench_rutinas.py --imagenes 146 2000 10000 --ejercicios 2000 --alumnos 30
+    python benchmarks/bench_rutinas.py --solo documentos --repeticiones 10 --json resultados.json
+
+Todo se ejecuta sobre un catálogo y un árbol de imágenes SINTÉTICOS creados en una
+carpeta temporal, así que se puede escalar muy por encima de las 146 imágenes reales
+sin tocar la carpeta de la app. Para cada caso se mide:
+  - tiempo: primera ejecución (en frío) y mediana de las siguientes
+  - memoria: pico de tracemalloc en una ejecución aparte (solo memoria de Python
+    del proceso actual; los procesos hijos del lote no cuentan)
+  - tamaño: del .docx / .zip generado, cuando lo hay
+El grupo "concurrencia" simula N sesiones a la vez (un hilo por sesión, como el
+servidor de Streamlit) sobre los recursos compartidos de recursos.py.
+El grupo "memoria" mide además el pico de RSS de la descarga de un documento y de
+cada forma de servir el ZIP de la clase, cada caso en un proceso nuevo (solo
+Linux / macOS: usa el módulo resource).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+DIR_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DIR_APP)
+
+import pandas as pd  # noqa: E402
+from PIL import Image, ImageDraw  # noqa: E402
+
+import generador_word  # noqa: E402
+import imagenes  # noqa: E402
+import recursos  # noqa: E402
+from autorrelleno import completar_ejercicios, completar_estiramientos  # noqa: E402
+from catalogo import CatalogoEjercicios  # noqa: E402
+import lote  # noqa: E402
+from lote import generar_lote  # noqa: E402
+from mesociclo import planificar_mesociclo  # noqa: E402
+from rutinas import RUTA_CACHE_DB, RUTA_DB, construir_rutina, leer_ejercicios  # noqa: E402
+
+TIPOS_SINTETICOS = ["Barra Olímpica", "Mancuernas", "Multipower", "TRX", "Autocarga", "Banda Elástica"]
+MUSCULOS = ["Pectoral mayor", "Deltoides anterior", "Tríceps braquial", "Bíceps braquial", "Dorsal ancho",
+            "Cuádriceps", "Isquiotibiales", "Glúteo mayor", "Gemelos", "Recto abdominal", "Oblicuos", "Trapecio"]
+IMAGENES_POR_CARPETA = 50
+GRUPOS = ["excel", "imagenes", "documentos", "autorrelleno", "lote", "concurrencia", "memoria"]
+
+
+# --- GENERADORES SINTÉTICOS ---
+def generar_imagenes(raiz, n, lado=900, semilla=0):
+    """Crea 'n' JPEG de lado x 2/3 lado repartidos en subcarpetas de img/.
+    Devuelve los nombres de archivo. Las fotos tienen ruido para que pesen como fotos reales."""
+    rnd = random.Random(semilla)
+    ruido = Image.effect_noise((lado, lado * 2 // 3), 40).convert('RGB')
+    nombres = []
+    for i in range(n):
+        carpeta = os.path.join(raiz, "img", f"grupo_{i // IMAGENES_POR_CARPETA:03d}")
+        os.makedirs(carpeta, exist_ok=True)
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        img = Image.blend(Image.new('RGB', ruido.size, color), ruido, 0.3)
+        ImageDraw.Draw(img).rectangle([rnd.randrange(lado // 2), rnd.randrange(lado // 3), lado - 1, lado * 2 // 3 - 1],
+                                      outline=(0, 0, 0), width=8)
+        nombre = f"sintetica_{i:05d}.jpg"
+        img.save(os.path.join(carpeta, nombre), quality=90)
+        nombres.append(nombre)
+    return nombres
+
+
+def filas_catalogo(n_ejercicios, n_estiramientos, nombres_imagen, semilla=0):
+    """Filas con las columnas del Excel real. Las imágenes se reparten cíclicamente
+    entre los ejercicios."""
+    rnd = random.Random(semilla)
+    filas = []
+    for i in range(n_ejercicios + n_estiramientos):
+        estiramiento = i >= n_ejercicios
+        musculos = rnd.sample(MUSCULOS, 6)
+        filas.append({
+            "nombre": f"Estiramiento {i:05d}" if estiramiento else f"Ejercicio {i:05d}",
+            "tipo": "Estiramientos" if estiramiento else TIPOS_SINTETICOS[i % len(TIPOS_SINTETICOS)],
+            "imagen": nombres_imagen[i % len(nombres_imagen)],
+            "desc": "Descripción sintética del ejercicio.",
+            "agonistas": ", ".join(musculos[:2]),
+            "sinergistas": ", ".join(musculos[2:4]),
+            "estabilizadores": ", ".join(musculos[4:]),
+        })
+    return filas
+
+
+def generar_catalogo(ruta, n_ejercicios, n_estiramientos, nombres_imagen, semilla=0):
+    """Escribe un DB_EJERCICIOS.xlsx con el mismo formato que el real."""
+    pd.DataFrame(filas_catalogo(n_ejercicios, n_estiramientos, nombres_imagen, semilla)).to_excel(ruta, index=False)
+
+
+def preparar_entorno(raiz, n_imagenes, n_ejercicios, n_estiramientos):
+    nombres = generar_imagenes(raiz, n_imagenes)
+    generar_catalogo(os.path.join(raiz, RUTA_DB), n_ejercicios, n_estiramientos, nombres)
+    # Las dos imágenes fijas del documento, con los mismos nombres que en la app
+    for nombre in ("logo_firma.png", "tabla_resumen.png"):
+        shutil.copy(os.path.join(raiz, "img", "grupo_000", nombres[0]), os.path.join(raiz, "img", nombre.replace('.png', '.jpg')))
+
+
+def activar_raiz(raiz):
+    """La app trabaja con rutas relativas: el índice de imágenes y el Excel se buscan en el cwd."""
+    os.chdir(raiz)
+    imagenes.INDICE_IMAGENES.refrescar()
+    vaciar_caches()
+
+
+def vaciar_caches():
+    imagenes._bytes_documento.cache_clear()
+    generador_word.vaciar_plantillas()
+    generador_word.CACHE_DOCUMENTOS.limpiar()
+
+
+# --- MEDICIÓN ---
+def _tamano(resultado):
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    if isinstance(resultado, dict):
+        return sum(_tamano(r) or 0 for r in resultado.values())
+    if isinstance(resultado, BytesIO):
+        return len(resultado.getbuffer())
+    if isinstance(resultado, (bytes, bytearray)):
+        return len(resultado)
+    if hasattr(resultado, 'seek'):  # Archivo temporal del lote
+        tamano = resultado.seek(0, os.SEEK_END)
+        resultado.seek(0)
+        return tamano
+    return None
+
+
+def medir(nombre, funcion, repeticiones=5, preparar=None):
+    """Ejecuta 'funcion' repeticiones + 1 veces (la primera cuenta como fría) y una más con
+    tracemalloc. 'preparar' se llama antes de cada ejecución, fuera del cronómetro."""
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones + 1):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    if preparar:
+        preparar()
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    fila = {
+        "caso": nombre,
+        "primera_ms": tiempos[0] * 1000,
+        "mediana_ms": statistics.median(tiempos[1:]) * 1000 if repeticiones else tiempos[0] * 1000,
+        "pico_mem_kb": pico / 1024,
+        "tamano_kb": (_tamano(resultado) or 0) / 1024,
+    }
+    print(f"{fila['caso']:<52} {fila['primera_ms']:>10.1f} {fila['mediana_ms']:>10.1f} "
+          f"{fila['pico_mem_kb']:>12.0f} {fila['tamano_kb']:>10.0f}", flush=True)
+    return fila
+
+
+def cabecera(titulo):
+    print(f"\n== {titulo} ==")
+    print(f"{'caso':<52} {'1ª (ms)':>10} {'mediana':>10} {'pico (KB)':>12} {'tamaño KB':>10}")
+
+
+# --- CASOS ---
+def bench_excel(repeticiones):
+    cabecera("Lectura del Excel (leer_ejercicios)")
+
+    def borrar_cache():
+        if os.path.exists(RUTA_CACHE_DB):
+            os.remove(RUTA_CACHE_DB)
+
+    filas = [medir("leer_ejercicios en frío (sin .pkl)", leer_ejercicios, repeticiones, preparar=borrar_cache)]
+    leer_ejercicios()
+    filas.append(medir("leer_ejercicios en caliente (.pkl válido)", leer_ejercicios, repeticiones))
+    return filas
+
+
+def bench_imagenes(tamanos, base, repeticiones):
+    cabecera("Búsqueda de imágenes (encontrar_imagen_recursiva)")
+    filas = []
+    for n in tamanos:
+        raiz = os.path.join(base, f"arbol_{n}")
+        nombres = generar_imagenes(raiz, n)
+        os.chdir(raiz)
+        rnd = random.Random(1)
+        consultas = [rnd.choice(nombres) for _ in range(1000)]
+        consultas += [os.path.splitext(c)[0].upper() for c in consultas[:500]] + ["no_existe.png"] * 100
+        filas.append(medir(f"construir índice ({n} imágenes)", imagenes.INDICE_IMAGENES.refrescar, repeticiones))
+        filas.append(medir(f"1600 búsquedas ({n} imágenes)",
+                           lambda: [imagenes.encontrar_imagen_recursiva(c) for c in consultas], repeticiones))
+    return filas
+
+
+def _argumentos_documento(catalogo, n_ejercicios, n_estiramientos):
+    seleccion = catalogo.entrenamiento[:n_ejercicios]
+    rm = {ej['nombre']: 60 + 5 * i for i, ej in enumerate(seleccion)}
+    rutina_df = pd.DataFrame(construir_rutina(seleccion, rm, 65, "10", "60 seg"))
+    return (rutina_df, catalogo.estiramientos[:n_estiramientos], "Hipertrofia Muscular", "Benchmark",
+            "MIXTO", "65%", "Bicicleta", "Moderado", "3-6")
+
+
+def bench_documentos(catalogo, repeticiones):
+    cabecera("Documento Word (generar_word_final)")
+    filas = []
+    for n_ej in (1, 6, 12):
+        for n_est in (0, 12):
+            args = _argumentos_documento(catalogo, n_ej, n_est)
+            for analisis in (False, True):
+                modo = "análisis" if analisis else "estándar"
+                # La 1ª ejecución de cada caso es en frío: sin plantilla ni imágenes ya reducidas
+                vaciar_caches()
+                filas.append(medir(f"{n_ej:>2} ejercicios, {n_est:>2} estiramientos, {modo}",
+                                   lambda: generador_word.generar_word_final(*args, analisis), repeticiones))
+    args = _argumentos_documento(catalogo, 12, 12)
+    vaciar_caches()
+    filas.append(medir("12 + 12, las dos variantes en una pasada",
+                       lambda: generador_word.generar_variantes_word(*args), repeticiones))
+    seleccion = catalogo.entrenamiento[:12]
+    plan = planificar_mesociclo(seleccion, {ej.nombre: 80 for ej in seleccion}, "Hipertrofia Muscular", 65, "10", "60 seg", "3-6",
+                                semanas=12, dias_semana=4)
+    vaciar_caches()
+    filas.append(medir("mesociclo 12 semanas x 4 sesiones, 12 + 12",
+                       lambda: generador_word.generar_mesociclo_word(plan, catalogo.estiramientos[:12], "Benchmark", "MIXTO",
+                                                                     "Bicicleta", "Moderado"), repeticiones))
+    return filas
+
+
+def bench_autorrelleno(tamanos, repeticiones):
+    cabecera("Autorrelleno por cobertura muscular (autorrelleno.py)")
+    filas = []
+    for n in tamanos:
+        catalogo = CatalogoEjercicios(filas_catalogo(n, max(10, n // 10), ["sintetica.jpg"]))
+        fijos = catalogo.entrenamiento[:2]
+        for total in (6, 12):
+            filas.append(medir(f"{total} ejercicios (2 fijos) entre {n}",
+                               lambda: completar_ejercicios(catalogo, catalogo.entrenamiento, total, fijos), repeticiones))
+        elegidos = completar_ejercicios(catalogo, catalogo.entrenamiento, 12, semilla=0)
+        filas.append(medir(f"6 estiramientos para 12 ejercicios ({len(catalogo.estiramientos)} estiramientos)",
+                           lambda: completar_estiramientos(catalogo, elegidos, 6), repeticiones))
+    return filas
+
+
+def _filas_clase(catalogo, n_alumnos):
+    tipos = catalogo.tipos_entreno
+    filas_clase = []
+    for i in range(n_alumnos):
+        tipo = tipos[i % len(tipos)]
+        ejercicios = catalogo.por_tipo(tipo)[:8]
+        filas_clase.append({
+            "alumno": f"Alumno {i:03d}",
+            "objetivo": "Hipertrofia Muscular",
+            "material": tipo,
+            "ejercicios": "; ".join(f"{ej.nombre}={50 + i}" for ej in ejercicios),
+            "estiramientos": "6",
+        })
+    return filas_clase
+
+
+def bench_lote(catalogo, n_alumnos, repeticiones):
+    cabecera(f"Lote de clase ({n_alumnos} alumnos, 2 documentos cada uno)")
+    filas_clase = _filas_clase(catalogo, n_alumnos)
+    filas = [medir("lote en serie (1 proceso)", lambda: generar_lote(filas_clase, catalogo, 1), repeticiones)]
+    filas.append(medir(f"lote en paralelo ({os.cpu_count()} CPUs)", lambda: generar_lote(filas_clase, catalogo), repeticiones))
+    return filas
+
+
+def _reiniciar_pico_rss():
+    """En Linux el pico (VmHWM) se puede poner a cero; en otros sistemas se mide
+    el pico desde el arranque del proceso."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _rerun_sesion(rnd, con_os_walk):
+    """Lo que hace cada rerun de la app con los recursos compartidos: catálogo, nº de
+    imágenes, filtrar un material y una página de 24 miniaturas de la galería."""
+    catalogo = recursos.obtener_catalogo()
+    if con_os_walk:  # Recuento de la barra lateral tal y como se hacía antes
+        sum(1 for _, _, files in os.walk(".") for f in files if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    else:
+        recursos.num_imagenes()
+    ejercicios = catalogo.filtrar([rnd.choice(catalogo.tipos_entreno)])
+    for ej in CatalogoEjercicios.buscar_texto(ejercicios, "")[:24]:
+        ruta, _ = imagenes.encontrar_imagen_recursiva(ej['imagen'])
+        if ruta:
+            imagenes.obtener_miniatura(ruta)
+
+
+def _sesion(indice, reruns, con_os_walk, con_documento):
+    rnd = random.Random(indice)
+    for _ in range(reruns):
+        _rerun_sesion(rnd, con_os_walk)
+    if con_documento:
+        catalogo = recursos.obtener_catalogo()
+        args = list(_argumentos_documento(catalogo, 8, 4))
+        args[3] = f"Alumno {indice}"  # Un documento distinto por sesión: sin aciertos de caché
+        generador_word.generar_variantes_cacheado(*args)
+
+
+def bench_concurrencia(max_sesiones, reruns):
+    print(f"\n== Sesiones concurrentes ({reruns} reruns por sesión) ==")
+    print(f"{'caso':<52} {'total (ms)':>10} {'ms/sesión':>10} {'sesiones/s':>12}")
+    recursos.precargar()
+    # Miniaturas ya creadas: se mide el reparto de los recursos, no la primera visita
+    catalogo = recursos.obtener_catalogo()
+    for tipo in catalogo.tipos_entreno:
+        for ej in catalogo.por_tipo(tipo)[:24]:
+            imagenes.obtener_miniatura(imagenes.encontrar_imagen_recursiva(ej['imagen'])[0] or "")
+    filas = []
+    niveles = [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= max_sesiones]
+    for modo, con_os_walk, con_documento in (("os.walk por rerun (antes)", True, False),
+                                             ("recursos compartidos", False, False),
+                                             ("recursos compartidos + documento", False, True)):
+        for n in niveles:
+            generador_word.CACHE_DOCUMENTOS.limpiar()
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                list(pool.map(lambda i: _sesion(i, reruns, con_os_walk, con_documento), range(n)))
+            total = time.perf_counter() - inicio
+            fila = {"caso": f"{modo}, {n} sesiones", "total_ms": total * 1000,
+                    "ms_por_sesion": total * 1000 / n, "sesiones_por_segundo": n / total}
+            print(f"{fila['caso']:<52} {fila['total_ms']:>10.1f} {fila['ms_por_sesion']:>10.1f} "
+                  f"{fila['sesiones_por_segundo']:>12.1f}", flush=True)
+            filas.append(fila)
+    return filas
+
+
+def _pico_rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 if sys.platform == 'darwin' else pico  # macOS lo da en bytes
+
+
+def _rss_lote_hijo(raiz, modo, n_alumnos, cola):
+    """Proceso nuevo: genera el lote como lo hace la app y entrega los bytes una vez
+    (lo que hace download_button al pulsar). Devuelve el pico de RSS antes y después."""
+    activar_raiz(raiz)
+    catalogo = CatalogoEjercicios(leer_ejercicios())
+    filas_clase = _filas_clase(catalogo, n_alumnos)
+    generar_lote(filas_clase[:1], catalogo, 1)  # Plantilla e imágenes ya cargadas en los dos modos
+    _reiniciar_pico_rss()
+    antes = _pico_rss_kb()
+    destino = BytesIO() if modo == "zip en BytesIO" else None
+    archivo, _, _ = generar_lote(filas_clase, catalogo, 1, destino=destino)
+    datos = archivo.read()
+    cola.put((antes, _pico_rss_kb(), len(datos)))
+
+
+def _rss_documento_hijo(raiz, cola):
+    """Proceso nuevo: descarga diferida de un documento (generar_word_cacheado +
+    getvalue, lo que hace download_button al pulsar), con la plantilla ya caliente."""
+    activar_raiz(raiz)
+    catalogo = CatalogoEjercicios(leer_ejercicios())
+    args = list(_argumentos_documento(catalogo, 12, 12))
+    generador_word.generar_word_cacheado(*args, True)
+    _reiniciar_pico_rss()
+    antes = _pico_rss_kb()
+    args[3] = "Otro alumno"  # Otra clave: se genera de nuevo
+    datos = generador_word.generar_word_cacheado(*args, True).getvalue()
+    cola.put((antes, _pico_rss_kb(), len(datos)))
+
+
+def _medir_rss_hijo(contexto, caso, objetivo, args):
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=objetivo, args=(*args, cola))
+    proceso.start()
+    antes, despues, tamano = cola.get()
+    proceso.join()
+    fila = {"caso": caso, "rss_antes_kb": antes, "rss_pico_kb": despues,
+            "pico_mem_kb": despues - antes, "tamano_kb": tamano / 1024}
+    print(f"{fila['caso']:<52} {'':>10} {'':>10} {fila['pico_mem_kb']:>12.0f} {fila['tamano_kb']:>10.0f}", flush=True)
+    return fila
+
+
+def bench_memoria(raiz, n_alumnos):
+    cabecera(f"Pico de RSS por documento y del lote ({n_alumnos} alumnos), proceso nuevo por caso")
+    print(f"(pico = aumento del pico de RSS durante la generación; umbral del spool: {lote.MAX_ZIP_EN_MEMORIA // 1024} KB)")
+    contexto = multiprocessing.get_context('spawn')
+    filas = [_medir_rss_hijo(contexto, "descarga de un documento (12+12)", _rss_documento_hijo, (raiz,))]
+    for modo in ("zip en BytesIO", "zip en SpooledTemporaryFile"):
+        filas.append(_medir_rss_hijo(contexto, f"lote servido con {modo}", _rss_lote_hijo, (raiz, modo, n_alumnos)))
+    return filas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de la generación de rutinas (datos sintéticos)")
+    parser.add_argument("--imagenes", type=int, nargs="+", default=[146, 1000, 5000], help="tamaños del árbol de imágenes")
+    parser.add_argument("--ejercicios", type=int, default=300, help="ejercicios del catálogo sintético")
+    parser.add_argument("--estiramientos", type=int, default=40)
+    parser.add_argument("--alumnos", type=int, default=12, help="alumnos del lote")
+    parser.add_argument("--sesiones", type=int, default=32, help="máximo de sesiones simultáneas")
+    parser.add_argument("--reruns", type=int, default=10, help="reruns por sesión simulada")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--solo", choices=GRUPOS, action="append",
+                        help="ejecuta solo estos grupos (repetible)")
+    parser.add_argument("--json", help="guarda los resultados en este archivo")
+    parser.add_argument("--conservar", action="store_true", help="no borra la carpeta temporal")
+    args = parser.parse_args(argv)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    grupos = set(args.solo or GRUPOS)
+
+    base = tempfile.mkdtemp(prefix="bench_rutinas_")
+    cwd = os.getcwd()
+    resultados = []
+    try:
+        raiz = os.path.join(base, "app")
+        print(f"Preparando datos sintéticos en {base} ...", flush=True)
+        preparar_entorno(raiz, max(args.imagenes[0], 1), args.ejercicios, args.estiramientos)
+        activar_raiz(raiz)
+        if "excel" in grupos:
+            resultados += bench_excel(args.repeticiones)
+        catalogo = CatalogoEjercicios(leer_ejercicios())
+        if "documentos" in grupos:
+            resultados += bench_documentos(catalogo, args.repeticiones)
+        if "autorrelleno" in grupos:
+            resultados += bench_autorrelleno([args.ejercicios, 5000], args.repeticiones)
+        if "lote" in grupos:
+            resultados += bench_lote(catalogo, args.alumnos, max(1, args.repeticiones // 2))
+        if "concurrencia" in grupos:
+            resultados += bench_concurrencia(args.sesiones, args.reruns)
+        if "memoria" in grupos:
+            resultados += bench_memoria(raiz, args.alumnos)
+        if "imagenes" in grupos:
+            resultados += bench_imagenes(args.imagenes, base, args.repeticiones)
+    finally:
+        os.chdir(cwd)
+        if not args.conservar:
+            shutil.rmtree(base, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# --- CACHÉ LRU DE DOCUMENTOS TERMINADOS ---
+# Límite por tamaño total (no por número de entradas): un documento con 12
+# ejercicios y 12 estiramientos ocupa ~200 KB, así que 64 MB son ~300 documentos.
+MAX_BYTES_CACHE_DOCUMENTOS = 64 * 1024 * 1024
+
+
+def huella(*partes):
+    """Hash estable de cualquier combinación de dicts, listas, textos y números."""
+    canonico = json.dumps(partes, sort_keys=True, ensure_ascii=False, default=str, separators=(',', ':'))
+    return hashlib.sha256(canonico.encode('utf-8')).hexdigest()
+
+
+class CacheLRUBytes:
+    """Caché LRU de bytes, segura entre hilos, que expulsa por tamaño total."""
+
+    def __init__(self, max_bytes=MAX_BYTES_CACHE_DOCUMENTOS):
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave):
+        with self._lock:
+            datos = self._datos.get(clave)
+            if datos is None:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return datos
+
+    def put(self, clave, datos):
+        if len(datos) > self.max_bytes:
+            return
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior)
+            self._datos[clave] = datos
+            self._bytes += len(datos)
+            while self._bytes > self.max_bytes:
+                _, expulsado = self._datos.popitem(last=False)
+                self._bytes -= len(expulsado)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    @property
+    def bytes_usados(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._datos)
@@ -0,0 +1,136 @@
+import re
+
+import numpy as np
+
+# --- MOTOR DE CÁLCULO DE CARGAS (VECTORIZADO) ---
+# Todo trabaja sobre arrays: un vector de 1RM (una rutina) o una matriz
+# alumnos x ejercicios (toda la clase) se calcula en una sola llamada.
+ESQUEMAS_SERIES = {
+    "fijo": "Fijo (misma carga en todas las series)",
+    "piramide": "Pirámide ascendente",
+    "piramide_inversa": "Pirámide descendente",
+    "ondulante": "Ondulante (ola de 3 series)",
+}
+PASO_ESQUEMA = 5  # Puntos de % RM entre series en pirámides y olas
+OLA = (-1, 0, 1)  # En pasos: ligera, media, pesada
+
+# Salto mínimo de carga de cada material del catálogo (columna 'tipo' del Excel, kg):
+# discos de 1,25 kg por lado en la barra y en el multipower (también sus máquinas
+# de placas), mancuernas de 2 en 2
+INCREMENTOS_MATERIAL = {
+    "Barra Olímpica": 2.5,
+    "Multipower": 2.5,
+    "Mancuernas": 2.0,
+}
+# Materiales sin carga externa que redondear: se quedan en kilos enteros
+TIPOS_SIN_CARGA = frozenset({
+    "Autocarga",
+    "Banda Elástica",
+    "TRX",
+    "Estiramientos",
+    "Ejercicio para Cruzado Anterior y Menisco Interno SIN OPERAR",
+    "Rehabilitación de Condromalacia Rotuliana",
+    "Rehabilitación de Esguince de Tobillo",
+    "Rehabilitación de Lesión Meniscal",
+    "Rehabilitación de Ligamentos Cruzados DESPUES DE OPERAR",
+})
+INCREMENTO_POR_DEFECTO = 1.0  # Lo de siempre: kilos enteros, truncando (también para TIPOS_SIN_CARGA)
+
+
+def num_series(series_str):
+    """Primer número de textos como '3-6' o '4': las series mínimas prescritas."""
+    numeros = re.findall(r'\d+', str(series_str))
+    return max(1, int(numeros[0])) if numeros else 1
+
+
+def desplazamientos_series(series, esquema="fijo", paso=PASO_ESQUEMA):
+    """Puntos de % RM que se suman a la intensidad base en cada serie. La base es
+    la serie más pesada en las pirámides y el centro de la ola en el ondulante."""
+    indices = np.arange(series)
+    if esquema == "piramide":
+        return -paso * (series - 1 - indices).astype(float)
+    if esquema == "piramide_inversa":
+        return -paso * indices.astype(float)
+    if esquema == "ondulante":
+        return paso * np.resize(np.array(OLA, dtype=float), series)
+    if esquema == "fijo":
+        return np.zeros(series)
+    raise ValueError(f"esquema desconocido '{esquema}'")
+
+
+def intensidades_series(intensidad, series, esquema="fijo", paso=PASO_ESQUEMA):
+    """% RM de cada serie (array de 'series' valores entre 0 y 100)."""
+    return np.clip(float(intensidad) + desplazamientos_series(series, esquema, paso), 0, 100)
+
+
+def redondear_carga(cargas, incremento=INCREMENTO_POR_DEFECTO, modo="abajo"):
+    """Redondea a múltiplos de 'incremento' (escalar o array que se difunde).
+    'abajo' no supera nunca la carga teórica, como el int() de siempre."""
+    cargas = np.asarray(cargas, dtype=float)
+    incremento = np.asarray(incremento, dtype=float)
+    # El 1e-9 evita que 59.99999 (error de coma flotante) baje a 59
+    if modo == "abajo":
+        pasos = np.floor(cargas / incremento + 1e-9)
+    elif modo == "cercano":
+        pasos = np.round(cargas / incremento)
+    elif modo == "arriba":
+        pasos = np.ceil(cargas / incremento - 1e-9)
+    else:
+        raise ValueError(f"modo de redondeo desconocido '{modo}'")
+    return pasos * incremento
+
+
+def tabla_cargas(rm, intensidades, incremento=INCREMENTO_POR_DEFECTO, modo="abajo"):
+    """Carga de cada serie: rm (..., ejercicios) x intensidades (series,) o
+    (..., ejercicios, series). Devuelve (..., ejercicios, series) en kg."""
+    rm = np.asarray(rm, dtype=float)
+    pct = np.asarray(intensidades, dtype=float)
+    incremento = np.asarray(incremento, dtype=float)
+    if incremento.ndim:
+        incremento = incremento[..., None]  # Un incremento por ejercicio
+    return redondear_carga(rm[..., None] * pct / 100.0, incremento, modo)
+
+
+def estimar_1rm(peso, reps, formula="epley"):
+    """1RM estimado a partir de peso x repeticiones (escalares o arrays).
+    Epley: peso * (1 + reps/30). Brzycki: peso * 36 / (37 - reps), válida hasta ~10 reps."""
+    peso = np.asarray(peso, dtype=float)
+    reps = np.asarray(reps, dtype=float)
+    if formula == "epley":
+        rm = peso * (1 + reps / 30.0)
+    elif formula == "brzycki":
+        rm = peso * 36.0 / np.maximum(37.0 - reps, 1.0)
+    else:
+        raise ValueError(f"fórmula desconocida '{formula}'")
+    # Con una sola repetición el peso levantado ya es el 1RM
+    return np.where(reps <= 1, peso, rm)
+
+
+def incrementos_para(tipos):
+    """Incremento de cada tipo de material (INCREMENTO_POR_DEFECTO si no tiene uno propio)."""
+    return np.array([INCREMENTOS_MATERIAL.get(t, INCREMENTO_POR_DEFECTO) for t in tipos], dtype=float)
+
+
+def formatear_kg(valor):
+    valor = float(valor)
+    return str(int(valor)) if valor.is_integer() else f"{valor:g}"
+
+
+def cargas_clase(tabla, series=1, esquema="fijo", redondear_material=False, modo="abajo"):
+    """
+    Cargas de toda una clase en una sola llamada.
+    'tabla' tiene una fila por alumno y ejercicio con las columnas 'rm' e 'intensidad'
+    (y 'tipo' si se redondea por material). Devuelve la tabla en formato largo con una
+    fila por serie: columnas originales + 'serie', 'pct' y 'peso'.
+    """
+    tabla = tabla.reset_index(drop=True)
+    rm = tabla['rm'].to_numpy(dtype=float)
+    intensidad = tabla['intensidad'].to_numpy(dtype=float)
+    pct = np.clip(intensidad[:, None] + desplazamientos_series(series, esquema), 0, 100)
+    incremento = incrementos_para(tabla['tipo']) if redondear_material else INCREMENTO_POR_DEFECTO
+    pesos = tabla_cargas(rm, pct, incremento, modo)
+    largo = tabla.loc[tabla.index.repeat(series)].reset_index(drop=True)
+    largo['serie'] = np.tile(np.arange(1, series + 1), len(tabla))
+    largo['pct'] = pct.ravel()
+    largo['peso'] = pesos.ravel()
+    return largo
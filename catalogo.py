@@ -0,0 +1,178 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# --- CATÁLOGO DE EJERCICIOS EN MEMORIA ---
+CAMPOS_EJERCICIO = ('nombre', 'tipo', 'imagen', 'desc', 'agonistas', 'sinergistas', 'estabilizadores')
+ROLES_MUSCULARES = ('estabilizadores', 'sinergistas', 'agonistas')  # De menor a mayor implicación
+
+# --- GRUPOS MUSCULARES ---
+# Las columnas de músculos son texto libre ("Tríceps Bracquial", "Gúteo Mediano y Menor",
+# "Core completo"...). Cada patrón se busca en el texto normalizado y, si aparece, se
+# quita para que no lo vuelva a encontrar otro más general: por eso "triceps sural" va
+# antes que "triceps" y "biceps femoral" antes que "biceps". Lo que no encaja en ningún
+# grupo ("leve", "pierna de apoyo"...) se ignora.
+REGLAS_MUSCULOS = (
+    (r'triceps sural|gemel|gastrocnemio|soleo|aquiles|flexion plantar', ('Gemelos y sóleo',)),
+    (r'biceps femoral|isquio', ('Isquiotibiales',)),
+    (r'recto femoral|cuadricep|vasto|\bvmo\b', ('Cuádriceps',)),
+    (r'cadena posterior', ('Isquiotibiales', 'Gemelos y sóleo', 'Lumbar')),
+    (r'cadena anterior brazo', ('Bíceps', 'Antebrazo')),
+    (r'recto abdominal|transverso|oblicuo|abdomin|\bcore\b|tronco', ('Core',)),
+    (r'erector|lumbar', ('Lumbar',)),
+    (r'manguito|supraespinoso|infraespinoso|subescapular|redondo menor|rotador interno', ('Manguito rotador',)),
+    (r'dorsal|redondo', ('Dorsal',)),
+    (r'trapecio|romboide|escapula', ('Trapecio y romboides',)),
+    (r'serrato', ('Serrato',)),
+    (r'pectoral|pecho', ('Pectoral',)),
+    (r'deltoides|hombro', ('Deltoides',)),
+    (r'triceps', ('Tríceps',)),
+    (r'braquiorradial|antebrazo|supinador', ('Antebrazo',)),
+    (r'biceps|braquial', ('Bíceps',)),
+    (r'psoas|iliaco|flexores de (la )?cadera|sartorio', ('Flexores de cadera',)),
+    (r'abductor|tensor de la fascia', ('Abductores',)),
+    (r'aductor|gracil', ('Aductores',)),
+    (r'glute|guteo|piramidal|cadera|pelvis', ('Glúteos',)),
+    (r'tibial|peroneo|tobillo|dorsiflexion|eversion|inversion', ('Tibiales y peroneos',)),
+    (r'\bpie\b|plantar|intrinsec|dedos', ('Pie',)),
+    (r'cuello', ('Cuello',)),
+)
+_REGLAS_MUSCULOS = tuple((re.compile(patron), grupos) for patron, grupos in REGLAS_MUSCULOS)
+
+
+def normalizar_texto(texto):
+    """Minúsculas y sin tildes, para buscar 'biceps' y encontrar 'Bíceps'."""
+    descompuesto = unicodedata.normalize('NFD', str(texto).lower())
+    return ''.join(c for c in descompuesto if unicodedata.category(c) != 'Mn')
+
+
+def grupos_musculares(texto):
+    """Grupos musculares (ordenados como REGLAS_MUSCULOS) que nombra un texto libre."""
+    texto = normalizar_texto(texto)
+    grupos = []
+    for patron, grupos_regla in _REGLAS_MUSCULOS:
+        texto, encontrados = patron.subn(' ', texto)
+        if encontrados:
+            grupos.extend(g for g in grupos_regla if g not in grupos)
+    return tuple(grupos)
+
+
+class Ejercicio:
+    """Fila del Excel en formato compacto. Admite ej['nombre'] y ej.get(...) como los
+    dicts de antes, así que el generador Word y el resto del código no cambian."""
+
+    __slots__ = CAMPOS_EJERCICIO + ('orden', 'texto_busqueda', 'musculos')
+
+    def __init__(self, registro, orden):
+        for campo in CAMPOS_EJERCICIO:
+            setattr(self, campo, str(registro.get(campo, "")))
+        self.orden = orden
+        self.texto_busqueda = normalizar_texto(f"{self.nombre} {self.agonistas} {self.sinergistas}")
+        # Rol de cada grupo muscular (si sale en varias columnas, cuenta la de más implicación).
+        # Los estiramientos no rellenan las columnas: el músculo va en el nombre.
+        textos = {rol: getattr(self, rol) for rol in ROLES_MUSCULARES}
+        if not any(t.strip() for t in textos.values()):
+            textos['agonistas'] = self.nombre
+        self.musculos = {grupo: rol for rol in ROLES_MUSCULARES for grupo in grupos_musculares(textos[rol])}
+
+    def __getitem__(self, campo):
+        return getattr(self, campo)
+
+    def get(self, campo, por_defecto=None):
+        return getattr(self, campo, por_defecto)
+
+    def __repr__(self):
+        return f"Ejercicio({self.nombre!r}, {self.tipo!r})"
+
+
+class CatalogoEjercicios:
+    """
+    Índices precalculados una sola vez al cargar el Excel:
+    por tipo de material, por nombre y separación estiramientos / entrenamiento.
+    El catálogo es de solo lectura y se comparte entre sesiones y hilos: todas las
+    colecciones son tuplas y los métodos devuelven listas nuevas.
+    """
+
+    def __init__(self, registros):
+        self.ejercicios = tuple(Ejercicio(r, i) for i, r in enumerate(registros))
+        self._por_tipo = {}
+        self._por_nombre = {}
+        for ej in self.ejercicios:
+            self._por_tipo.setdefault(ej.tipo, []).append(ej)
+            # Hay nombres repetidos en distintos tipos (rehabilitación): se guardan todos
+            self._por_nombre.setdefault(ej.nombre, []).append(ej)
+        self._por_tipo = {t: tuple(lista) for t, lista in self._por_tipo.items()}
+        self._por_nombre = {n: tuple(lista) for n, lista in self._por_nombre.items()}
+        self.tipos = tuple(sorted(t for t in self._por_tipo if t))
+        self.tipos_entreno = tuple(t for t in self.tipos if 'estiramiento' not in t.lower())
+        self.estiramientos = tuple(ej for ej in self.ejercicios if 'estiramiento' in ej.tipo.lower())
+        self.entrenamiento = tuple(ej for ej in self.ejercicios if 'estiramiento' not in ej.tipo.lower())
+        self.nombres_estiramientos = tuple(ej.nombre for ej in self.estiramientos)
+        # Matriz ejercicios x grupos musculares con el rol de cada uno: 0 si no
+        # interviene, 1 + su posición en ROLES_MUSCULARES si sí (3 = agonista).
+        # La usa el autorrelleno para puntuar miles de candidatos de golpe.
+        self.grupos_musculares = tuple(sorted({g for ej in self.ejercicios for g in ej.musculos}))
+        # Índice invertido grupo muscular -> rol -> ejercicios (en el orden del Excel)
+        self._por_musculo = {g: {rol: [] for rol in ROLES_MUSCULARES} for g in self.grupos_musculares}
+        for ej in self.ejercicios:
+            for grupo, rol in ej.musculos.items():
+                self._por_musculo[grupo][rol].append(ej)
+        self._por_musculo = {g: {rol: tuple(lista) for rol, lista in roles.items()}
+                             for g, roles in self._por_musculo.items()}
+        columna = {g: i for i, g in enumerate(self.grupos_musculares)}
+        nivel = {rol: i + 1 for i, rol in enumerate(ROLES_MUSCULARES)}
+        self.matriz_roles = np.zeros((len(self.ejercicios), len(self.grupos_musculares)), dtype=np.int8)
+        for ej in self.ejercicios:
+            for grupo, rol in ej.musculos.items():
+                self.matriz_roles[ej.orden, columna[grupo]] = nivel[rol]
+        self.matriz_roles.flags.writeable = False
+
+    def __len__(self):
+        return len(self.ejercicios)
+
+    def __iter__(self):
+        return iter(self.ejercicios)
+
+    def por_tipo(self, tipo):
+        return self._por_tipo.get(tipo, ())
+
+    def filtrar(self, tipos):
+        """Ejercicios de los tipos indicados, en el orden del Excel."""
+        if len(tipos) == 1:
+            return list(self.por_tipo(tipos[0]))
+        seleccion = [ej for t in dict.fromkeys(tipos) for ej in self.por_tipo(t)]
+        seleccion.sort(key=lambda ej: ej.orden)
+        return seleccion
+
+    def por_musculo(self, grupo, roles=ROLES_MUSCULARES):
+        """Ejercicios que trabajan 'grupo' con alguno de los 'roles', en el orden del Excel."""
+        indice = self._por_musculo.get(grupo)
+        if indice is None:
+            return []
+        seleccion = [ej for rol in roles for ej in indice[rol]]
+        if len(roles) > 1:
+            seleccion.sort(key=lambda ej: ej.orden)
+        return seleccion
+
+    def filtrar_musculos(self, ejercicios, grupos, roles=ROLES_MUSCULARES):
+        """De 'ejercicios', los que trabajan alguno de los 'grupos' con esos roles."""
+        if not grupos:
+            return list(ejercicios)
+        validos = {ej.orden for grupo in grupos for rol in roles for ej in self._por_musculo.get(grupo, {}).get(rol, ())}
+        return [ej for ej in ejercicios if ej.orden in validos]
+
+    @staticmethod
+    def buscar_texto(ejercicios, texto):
+        """Filtra por nombre, agonistas y sinergistas; todas las palabras deben aparecer."""
+        palabras = normalizar_texto(texto).split()
+        if not palabras:
+            return list(ejercicios)
+        return [ej for ej in ejercicios if all(p in ej.texto_busqueda for p in palabras)]
+
+    def buscar(self, nombre, tipos=None):
+        """Primer ejercicio con ese nombre (dentro de 'tipos' si se indican) o None."""
+        for ej in self._por_nombre.get(nombre, ()):
+            if tipos is None or ej.tipo in tipos:
+                return ej
+        return None
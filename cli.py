@@ -0,0 +1,145 @@
+"""
+Generador de rutinas sin Streamlit.
+
+    python cli.py ejercicios [--material "Barra Olímpica"]
+    python cli.py rutina --alumno Ana --objetivo "Hipertrofia Muscular" \
+        --material "Barra Olímpica" --ejercicio "Press de Banca=80" --ejercicio "Squats=100" \
+        [--analisis] [-o Rutina_Ana.docx | -o Rutina_Ana.pdf]
+    python cli.py lote clase.csv [-o Rutinas_Clase.zip] [--procesos 4]
+    python cli.py regenerar --alumno Ana [--fecha 2026-10-01] [--analisis] [-o Rutina_Ana.pdf]
+"""
+import argparse
+import os
+import sys
+import time
+
+from rutinas import PRESETS_OBJETIVO
+
+DIR_APP = os.path.dirname(os.path.abspath(__file__))
+
+
+def _cargar_db():
+    from recursos import obtener_catalogo
+
+    db = obtener_catalogo()
+    if db is None:
+        sys.exit("Error: DB_EJERCICIOS.xlsx no encontrado.")
+    if isinstance(db, str):
+        sys.exit(db)
+    return db
+
+
+def cmd_ejercicios(args):
+    catalogo = _cargar_db()
+    for e in (catalogo.filtrar(args.material) if args.material else catalogo):
+        print(f"{e.tipo}\t{e.nombre}")
+
+
+def cmd_rutina(args):
+    from generador_pdf import generar_pdf_final
+    from generador_word import generar_word_final
+    from lote import preparar_tarea
+
+    fila = {
+        "alumno": args.alumno,
+        "objetivo": args.objetivo,
+        "material": ";".join(args.material or []),
+        "ejercicios": ";".join(args.ejercicio or []),
+        "intensidad": args.intensidad or "",
+        "repeticiones": args.repeticiones or "",
+        "descanso": args.descanso or "",
+        "series": args.series or "",
+        "cardio": args.cardio or "",
+        "estiramientos": args.estiramientos,
+    }
+    try:
+        tarea = preparar_tarea(fila, _cargar_db())
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    inicio = time.perf_counter()
+    generar = generar_pdf_final if args.salida.lower().endswith('.pdf') else generar_word_final
+    buffer = generar(**tarea, incluir_analisis_muscular=args.analisis)
+    with open(args.salida, 'wb') as f:
+        f.write(buffer.getvalue())
+    print(f"{args.salida} ({len(buffer.getvalue()) // 1024} KB, {time.perf_counter() - inicio:.2f} s)")
+
+
+def cmd_lote(args):
+    from lote import generar_lote, leer_lista_clase
+
+    inicio = time.perf_counter()
+    # El ZIP se escribe directamente en el archivo de salida, sin pasar por memoria
+    with open(args.salida, 'w+b') as f:
+        _, num_alumnos, errores = generar_lote(leer_lista_clase(args.lista), _cargar_db(), args.procesos, destino=f)
+    for error in errores:
+        print(error, file=sys.stderr)
+    print(f"{args.salida}: {num_alumnos} alumnos, {num_alumnos * 2} documentos ({time.perf_counter() - inicio:.2f} s)")
+
+
+def cmd_regenerar(args):
+    import almacen
+    from generador_pdf import generar_pdf_final
+    from generador_word import generar_word_final
+
+    rutinas = almacen.rutinas_alumno(args.alumno, hasta=args.fecha, limite=1)
+    if not rutinas:
+        sys.exit(f"Error: no hay rutinas guardadas de '{args.alumno}'" + (f" hasta el {args.fecha}" if args.fecha else ""))
+    try:
+        parametros = almacen.parametros_documento(rutinas[0], _cargar_db())
+    except ValueError as e:
+        sys.exit(f"Error: {e}")
+    generar = generar_pdf_final if args.salida.lower().endswith('.pdf') else generar_word_final
+    buffer = generar(**parametros, incluir_analisis_muscular=args.analisis)
+    with open(args.salida, 'wb') as f:
+        f.write(buffer.getvalue())
+    print(f"{args.salida}: rutina del {rutinas[0]['fecha'][:10]} ({len(buffer.getvalue()) // 1024} KB)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py", description="Generador Científico de Rutinas (sin interfaz)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_ej = sub.add_parser("ejercicios", help="lista los ejercicios de la base de datos")
+    p_ej.add_argument("--material", action="append", help="filtra por tipo de material (repetible)")
+    p_ej.set_defaults(func=cmd_ejercicios)
+
+    p_rut = sub.add_parser("rutina", help="genera la rutina de un alumno")
+    p_rut.add_argument("--alumno", default="")
+    p_rut.add_argument("--objetivo", required=True, choices=list(PRESETS_OBJETIVO))
+    p_rut.add_argument("--material", action="append", help="tipo de material (repetible)")
+    p_rut.add_argument("--ejercicio", action="append", help="'Nombre=1RM' (repetible); sin ejercicios se eligen por cobertura muscular")
+    p_rut.add_argument("--intensidad", help="%% RM (por defecto, el del objetivo)")
+    p_rut.add_argument("--repeticiones")
+    p_rut.add_argument("--descanso")
+    p_rut.add_argument("--series")
+    p_rut.add_argument("--cardio")
+    p_rut.add_argument("--estiramientos", default="4", help="número o lista separada por ';'")
+    p_rut.add_argument("--analisis", action="store_true", help="incluye el análisis muscular")
+    p_rut.add_argument("-o", "--salida", default="Rutina.docx", help="con extensión .pdf se genera en PDF")
+    p_rut.set_defaults(func=cmd_rutina)
+
+    p_lote = sub.add_parser("lote", help="genera las rutinas de una lista de clase (CSV / Excel)")
+    p_lote.add_argument("lista")
+    p_lote.add_argument("-o", "--salida", default="Rutinas_Clase.zip")
+    p_lote.add_argument("--procesos", type=int, help="procesos en paralelo (por defecto, nº de CPUs)")
+    p_lote.set_defaults(func=cmd_lote)
+
+    p_reg = sub.add_parser("regenerar", help="rehace los documentos de una rutina guardada en el historial")
+    p_reg.add_argument("--alumno", required=True)
+    p_reg.add_argument("--fecha", help="la última rutina hasta ese día (AAAA-MM-DD); por defecto, la más reciente")
+    p_reg.add_argument("--analisis", action="store_true", help="incluye el análisis muscular")
+    p_reg.add_argument("-o", "--salida", default="Rutina.docx", help="con extensión .pdf se genera en PDF")
+    p_reg.set_defaults(func=cmd_regenerar)
+
+    args = parser.parse_args(argv)
+    # Las rutas de entrada/salida se resuelven antes de pasar a la carpeta de la app,
+    # donde están DB_EJERCICIOS.xlsx e img/
+    for atributo in ("salida", "lista"):
+        if getattr(args, atributo, None):
+            setattr(args, atributo, os.path.abspath(getattr(args, atributo)))
+    os.chdir(DIR_APP)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+from datetime import datetime
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm, inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import (CondPageBreak, Image, KeepTogether, PageBreak, Paragraph,
+                                SimpleDocTemplate, Spacer, Table, TableStyle)
+from xml.sax.saxutils import escape
+
+from cache_documentos import CacheLRUBytes
+from generador_word import (INFO_OBJETIVOS, TITULO_GUIA, TITULO_GUIA_ANALISIS, _ruta_marca_agua,
+                            huella_documento)
+from imagenes import encontrar_imagen_recursiva, preparar_imagen_documento
+
+# --- GENERADOR PDF (MISMO CONTENIDO QUE EL WORD) ---
+# Maquetación directa con reportlab: no hace falta LibreOffice ni ningún servicio externo.
+# Las fuentes base de PDF solo cubren cp1252, así que los emojis del Word se omiten.
+MIME_PDF = "application/pdf"
+AZUL_TITULO = colors.HexColor("#2C3E50")
+AZUL_PROGRAMA = colors.HexColor("#2980B9")
+GRIS_CARDIO = colors.HexColor("#EAEDED")
+FONDO_CABECERA = colors.HexColor("#2E4053")
+BORG_PDF = [
+    {"val": "6-8", "txt": "Muy Ligero", "color": "#A9DFBF"},
+    {"val": "9-11", "txt": "Ligero", "color": "#D4EFDF"},
+    {"val": "12-14", "txt": "Algo Duro", "color": "#F9E79F"},
+    {"val": "15-17", "txt": "Duro", "color": "#F5CBA7"},
+    {"val": "18-20", "txt": "Máximo", "color": "#E6B0AA"},
+]
+
+CACHE_PDF = CacheLRUBytes()
+
+_estilos = getSampleStyleSheet()
+ESTILO_NORMAL = ParagraphStyle('normal_rutina', parent=_estilos['Normal'], fontSize=10, leading=13)
+ESTILO_CELDA = ParagraphStyle('celda_rutina', parent=ESTILO_NORMAL, alignment=TA_CENTER)
+ESTILO_MUSCULOS = ParagraphStyle('musculos_rutina', parent=ESTILO_CELDA, fontSize=7, leading=9)
+ESTILO_H1 = ParagraphStyle('h1_rutina', parent=_estilos['Heading1'], fontSize=18, leading=22, textColor=AZUL_TITULO, spaceBefore=8, spaceAfter=8)
+ESTILO_H1_MENOR = ParagraphStyle('h1_menor_rutina', parent=ESTILO_H1, fontSize=14, leading=18)
+ESTILO_SUBTITULO = ParagraphStyle('subtitulo_rutina', parent=ESTILO_NORMAL, fontName='Times-Bold', fontSize=16, leading=20, spaceBefore=6)
+ESTILO_FECHA = ParagraphStyle('fecha_rutina', parent=ESTILO_NORMAL, alignment=TA_RIGHT, fontName='Helvetica-Bold')
+ESTILO_NOTA = ParagraphStyle('nota_rutina', parent=ESTILO_NORMAL, fontSize=9, textColor=colors.HexColor("#1F3864"), fontName='Helvetica-Oblique')
+
+
+def _texto_pdf(texto):
+    """Escapa para Paragraph y quita lo que las fuentes base no pueden pintar (emojis)."""
+    limpio = str(texto).encode('cp1252', errors='ignore').decode('cp1252')
+    return escape(limpio.strip())
+
+
+def _imagen(nombre, ancho_in, alto_in=None):
+    ruta, _ = encontrar_imagen_recursiva(nombre)
+    if not ruta:
+        return Paragraph("[FOTO NO DISPONIBLE]", ESTILO_CELDA)
+    datos = preparar_imagen_documento(ruta, ancho_in, alto_in)
+    if isinstance(datos, str):  # No se pudo leer la imagen
+        return Paragraph("[Error]", ESTILO_CELDA)
+    if alto_in is None:
+        ancho_px, alto_px = ImageReader(datos).getSize()
+        datos.seek(0)
+        alto_in = ancho_in * alto_px / ancho_px
+    return Image(datos, width=ancho_in * inch, height=alto_in * inch)
+
+
+def _rejilla(celdas, ancho_total):
+    cols = 4
+    filas = [celdas[i:i + cols] for i in range(0, len(celdas), cols)]
+    filas[-1] = filas[-1] + [""] * (cols - len(filas[-1]))
+    tabla = Table(filas, colWidths=[ancho_total / cols] * cols)
+    tabla.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ]))
+    return tabla
+
+
+def _pie_y_marca_agua(canvas, doc):
+    canvas.saveState()
+    ruta_marca = _ruta_marca_agua()
+    if ruta_marca:
+        datos = preparar_imagen_documento(ruta_marca, 2.5)
+        if not isinstance(datos, str):
+            imagen = ImageReader(datos)
+            ancho_px, alto_px = imagen.getSize()
+            ancho = 2.5 * inch
+            canvas.drawImage(imagen, 2 * cm, 0, width=ancho, height=ancho * alto_px / ancho_px, mask='auto')
+    canvas.setFont('Helvetica', 10)
+    canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.5 * cm, f"Página {doc.page}")
+    canvas.restoreState()
+
+
+def _historia(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular, ancho_util):
+    historia = []
+
+    # PÁGINA 1
+    nombre_mostrar = alumno if alumno.strip() else "ALUMNO"
+    cabecera = Paragraph(
+        f'<font size="12" color="#2980B9"><b>PROGRAMA DE ENTRENAMIENTO DE: {_texto_pdf(titulo_material.upper())}</b></font><br/>'
+        f'<b>OBJETIVO: </b>{_texto_pdf(objetivo)}   |   <b>INTENSIDAD DE TRABAJO: </b>({_texto_pdf(intensidad_str)})'
+        f'   |   <b>ALUMNO/A: </b>{_texto_pdf(nombre_mostrar.upper())}', ESTILO_NORMAL)
+    fecha = Paragraph(f"FECHA:<br/>{datetime.now().strftime('%d/%m/%Y')}", ESTILO_FECHA)
+    historia.append(Table([[cabecera, fecha]], colWidths=[ancho_util - 1.2 * inch, 1.2 * inch]))
+    historia.append(Paragraph("Situación de Aprendizaje: Trabajo en Salas de Musculación 1º de Bachillerato IES Lucía de Medrano", ESTILO_SUBTITULO))
+    historia.append(Paragraph("_" * 95, ESTILO_NORMAL))
+
+    titulo_seccion_1 = TITULO_GUIA_ANALISIS if incluir_analisis_muscular else TITULO_GUIA
+    historia.append(Paragraph(titulo_seccion_1, ESTILO_H1_MENOR))
+    cardio = Table([[Paragraph("<b>A) Calentamiento de 5 minutos de Duración</b>", ESTILO_CELDA),
+                     Paragraph(f"<b>B) Cardio: {_texto_pdf(cardio_tipo)} -&gt; {_texto_pdf(cardio_tiempo)}</b>", ESTILO_CELDA)]],
+                   colWidths=[ancho_util / 2] * 2)
+    cardio.setStyle(TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.black), ('BACKGROUND', (0, 0), (-1, -1), GRIS_CARDIO)]))
+    historia += [cardio, Spacer(1, 8)]
+
+    registros = rutina_df.to_dict('records')
+    celdas = []
+    for row_data in registros:
+        celda = [_imagen(row_data['Imagen'], 2.4, 1.55), Paragraph(f"<b>{_texto_pdf(row_data['Ejercicio'])}</b>", ESTILO_CELDA)]
+        if incluir_analisis_muscular:
+            for etiqueta, campo in (("Agonistas", 'agonistas'), ("Sinergistas", 'sinergistas'), ("Estabilizadores", 'estabilizadores')):
+                celda.append(Paragraph(f"<b>Músculos {etiqueta}:</b><br/>{_texto_pdf(row_data.get(campo, ''))}", ESTILO_MUSCULOS))
+        celdas.append(celda)
+    if celdas:
+        historia.append(_rejilla(celdas, ancho_util))
+    historia.append(PageBreak())
+
+    # PÁGINA 2
+    historia.append(Paragraph("2. Rutina Detallada", ESTILO_H1))
+    filas = [["Orden", "Ejercicio", "Series x Reps", "Carga", "Descanso", "Notas"]]
+    for idx, row_data in enumerate(registros):
+        filas.append([str(idx + 1), Paragraph(_texto_pdf(row_data['Ejercicio']), ESTILO_NORMAL), f"{series_str} x {row_data['Reps']}",
+                      f"{row_data['Peso']} kg", str(row_data['Descanso']), f"Int: {row_data['Intensidad_Real']}"])
+    anchos = [0.7, 3.5, 1.5, 1.0, 1.5, 2.4]
+    tabla = Table(filas, colWidths=[a * inch for a in anchos], repeatRows=1)
+    tabla.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), FONDO_CABECERA),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('ALIGN', (0, 1), (0, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]))
+    historia += [tabla, Spacer(1, 12)]
+
+    if lista_estiramientos:
+        celdas_est = [[_imagen(e['imagen'], 2.2, 1.4), Paragraph(f"<b>{_texto_pdf(e['nombre'])}</b>", ESTILO_CELDA)] for e in lista_estiramientos]
+        historia.append(KeepTogether([Paragraph("3. Ejercicios de Estiramientos", ESTILO_H1), _rejilla(celdas_est, ancho_util)]))
+        historia.append(Spacer(1, 12))
+
+    # SECCIÓN 4: BORG
+    borg = Table([[Paragraph(f'<font size="14">{d["val"]}</font>', ESTILO_CELDA) for d in BORG_PDF],
+                  [Paragraph(f"<b>{_texto_pdf(d['txt'])}</b>", ESTILO_CELDA) for d in BORG_PDF],
+                  [""] * len(BORG_PDF)],
+                 colWidths=[ancho_util / len(BORG_PDF)] * len(BORG_PDF), rowHeights=[None, None, 0.42 * inch])
+    estilo_borg = [('GRID', (0, 0), (-1, -1), 0.5, colors.black)]
+    for i, d in enumerate(BORG_PDF):
+        estilo_borg.append(('BACKGROUND', (i, 0), (i, -1), colors.HexColor(d['color'])))
+    borg.setStyle(TableStyle(estilo_borg))
+    historia.append(KeepTogether([
+        Paragraph("4. Percepción del Esfuerzo (RPE) - Escala de Borg", ESTILO_H1), borg,
+        Paragraph("Marca con una X la sensación global al terminar el entrenamiento.", ESTILO_NOTA),
+    ]))
+    historia.append(Spacer(1, 12))
+
+    # SECCIÓN 5: MARCO TEÓRICO
+    historia.append(CondPageBreak(1.5 * inch))
+    historia.append(Paragraph(f"5. {_texto_pdf(objetivo.upper())}", ESTILO_H1))
+    raw_text = INFO_OBJETIVOS.get(objetivo, "Información no disponible.")
+    for line in raw_text.split('\n')[1:]:
+        if not line.strip():
+            continue
+        texto = _texto_pdf(line)
+        # Las líneas que en el Word empiezan con emoji son los encabezados de bloque
+        if texto != escape(line.strip()):
+            texto = f"<b>{texto}</b>"
+        historia.append(Paragraph(texto, ESTILO_NORMAL))
+    historia.append(Spacer(1, 12))
+
+    # SECCIÓN 6: RESUMEN
+    ruta_resumen, _ = encontrar_imagen_recursiva("tabla_resumen")
+    resumen = _imagen("tabla_resumen", 9.0) if ruta_resumen else Paragraph("[Imagen 'tabla_resumen' no encontrada]", ESTILO_NORMAL)
+    historia.append(KeepTogether([Paragraph("6. RESUMEN DE FORMAS DE TRABAJO", ESTILO_H1), resumen]))
+    historia.append(Spacer(1, 12))
+
+    # SECCIÓN 7: REFLEXIÓN
+    historia.append(KeepTogether([
+        Paragraph("7. MI CIRCUITO DE TRABAJO SE BASA EN LOS SIGUIENTES PRINCIPIOS DE ENTRENAMIENTO Y SIGUE LA SIGUIENTE LÓGICA", ESTILO_H1_MENOR),
+        Paragraph("(Explica cómo y por qué estableces este circuito según tus objetivos y criterios científicos):", ESTILO_NORMAL),
+        Spacer(1, 200),
+    ]))
+    return historia
+
+
+def generar_pdf_final(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular):
+    """Mismos parámetros y mismo contenido que generar_word_final, en PDF (A4 apaisado)."""
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=1.0 * cm, bottomMargin=1.2 * cm,
+                            leftMargin=1.27 * cm, rightMargin=1.27 * cm, title=f"Rutina {alumno}".strip())
+    historia = _historia(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str,
+                         cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular, doc.width)
+    doc.build(historia, onFirstPage=_pie_y_marca_agua, onLaterPages=_pie_y_marca_agua)
+    buffer.seek(0)
+    return buffer
+
+
+def generar_pdf_cacheado(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular):
+    """generar_pdf_final con caché por la misma huella que el Word: una rutina no se maqueta dos veces."""
+    args = (rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular)
+    clave = huella_documento(*args)
+    datos = CACHE_PDF.get(clave)
+    if datos is None:
+        datos = generar_pdf_final(*args).getvalue()
+        CACHE_PDF.put(clave, datos)
+    return BytesIO(datos)
+
+
+def generar_variantes_pdf(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str):
+    """{False: PDF estándar, True: PDF con análisis}, pasando por CACHE_PDF."""
+    args = (rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str)
+    return {analisis: generar_pdf_cacheado(*args, analisis) for analisis in (False, True)}
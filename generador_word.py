@@ -0,0 +1,1068 @@
+import functools
+import hashlib
+import os
+import random
+import threading
+from datetime import datetime
+from io import BytesIO
+
+from docx import Document
+from docx.shared import Inches, Pt, Cm, RGBColor
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.enum.section import WD_ORIENT
+from docx.oxml import OxmlElement, ns
+from docx.oxml.ns import qn
+from docx.oxml.shape import CT_Inline
+from docx.shape import InlineShape
+
+from cache_documentos import CacheLRUBytes, huella
+from cargas import formatear_kg
+from imagenes import encontrar_imagen_recursiva, preparar_imagen_documento
+from tiempos import etapa, medir
+
+# --- DATOS TEÓRICOS DE LOS OBJETIVOS ---
+INFO_OBJETIVOS = {
+    "Fuerza Máxima": """1️⃣ FUERZA MÁXIMA
+🎯 Objetivo
+Aumentar la capacidad máxima de producción de fuerza (adaptación neural).
+
+🏋️‍♂️ Trabajo de fuerza
+Intensidad: 85–100 % RM
+Repeticiones: 1–5
+Series: 4–6
+Descanso: 3–6 min
+Ejercicios: multiarticulares (sentadilla, peso muerto, press banca, press militar)
+
+❤️ Trabajo cardiovascular
+Tipo: aeróbico extensivo
+Intensidad: 60–70 % FCmáx
+Duración: 15–25 min
+Frecuencia: 1–2 días/semana
+Objetivo: recuperación, no interferir con la fuerza""",
+
+    "Hipertrofia Muscular": """2️⃣ HIPERTROFIA MUSCULAR
+🎯 Objetivo
+Aumentar el tamaño muscular (hipertrofia miofibrilar y sarcoplasmática).
+
+🏋️‍♂️ Trabajo de fuerza
+Intensidad: 65–85 % RM
+Repeticiones: 6–12
+Series: 3–6
+Descanso: 60–120 s
+RIR: 0–2 (cerca del fallo)
+
+❤️ Trabajo cardiovascular
+Tipo: aeróbico moderado
+Intensidad: 65–75 % FCmáx
+Duración: 20–30 min
+Frecuencia: 2–3 días/semana
+Objetivo: salud cardiovascular sin comprometer ganancias musculares""",
+
+    "Definición Muscular": """3️⃣ DEFINICIÓN MUSCULAR
+🎯 Objetivo
+Mantener masa muscular + reducir grasa corporal.
+
+🏋️‍♂️ Trabajo de fuerza
+Intensidad: 60–75 % RM
+Repeticiones: 10–15
+Series: 3–5
+Descanso: 30–60 s
+Métodos: superseries, circuitos, alta densidad
+
+❤️ Trabajo cardiovascular
+Tipo: HIIT + aeróbico
+HIIT: 85–95 % FCmáx | 10–20 min | 1–2 días/sem
+Aeróbico: 65–75 % FCmáx | 30–45 min | 2–3 días/sem""",
+
+    "Resistencia Muscular": """4️⃣ RESISTENCIA MUSCULAR
+🎯 Objetivo
+Mejorar la capacidad de sostener esfuerzos prolongados.
+
+🏋️‍♂️ Trabajo de fuerza
+Intensidad: 30–60 % RM
+Repeticiones: 15–30+
+Series: 2–4
+Descanso: 15–45 s
+Formato: circuitos o estaciones
+
+❤️ Trabajo cardiovascular
+Tipo: aeróbico extensivo
+Intensidad: 65–80 % FCmáx
+Duración: 30–60 min
+Frecuencia: 3–5 días/semana
+Objetivo: base aeróbica y resistencia general""",
+
+    "Mantenimiento Muscular": """5️⃣ MANTENIMIENTO MUSCULAR
+🎯 Objetivo
+Conservar masa muscular, fuerza y salud con bajo volumen.
+
+🏋️‍♂️ Trabajo de fuerza
+Intensidad: 60–75 % RM
+Repeticiones: 8–12
+Series: 2–3
+Descanso: 60–90 s
+Frecuencia: 2–3 días/semana
+
+❤️ Trabajo cardiovascular
+Tipo: aeróbico saludable
+Intensidad: 60–75 % FCmáx
+Duración: 20–40 min
+Frecuencia: 2–4 días/semana""",
+
+    "Rehabilitación Muscular y Articular": """5️⃣ REHABILITACIÓN MUSCULAR Y ARTICULAR
+🔁 Progresión recomendada (por fases)
+
+🟢 Fase 1 – Readaptación
+20–30 % RM
+Isométricos + movilidad
+Cardio muy suave
+
+🟡 Fase 2 – Reacondicionamiento
+30–50 % RM
+Concéntrico + excéntrico lento
+Propiocepción dinámica
+
+🔵 Fase 3 – Transición al entrenamiento
+50–60 % RM
+Patrones básicos
+Integración progresiva con mantenimiento muscular""",
+
+    "Programa de Pérdida de Peso": """🔥 PROGRAMA DE PÉRDIDA DE PESO
+
+🎯 Objetivo
+Reducir grasa corporal
+Mantener o minimizar la pérdida de masa muscular
+Aumentar el gasto energético total
+Mejorar la salud metabólica y cardiovascular
+Crear hábitos de actividad física sostenibles
+
+🏋️‍♂️ Fuerza (entrenamiento principal)
+🔹 Intensidad
+50–70 % de 1RM
+🔹 Repeticiones
+12–20 repeticiones
+🔹 Series
+3–4 series
+🔹 Descanso
+20–45 segundos
+
+🔹 Organización del trabajo
+Circuitos
+Superseries
+Ejercicios multiarticulares prioritarios
+Ritmo continuo, intensidad alta
+
+Objetivo de la fuerza
+Mantener masa muscular
+Aumentar gasto calórico
+Mejorar tono muscular
+
+❤️ Entrenamiento cardiovascular
+🔹 Aeróbico continuo
+Intensidad: 60–75 % FCmáx
+Duración: 30–60 min
+Frecuencia: 3–5 días/semana
+Ejemplos: caminar rápido, bici, elíptica, natación
+
+🔹 HIIT (opcional)
+Intensidad: 85–95 % FCmáx
+Duración: 10–20 min
+Frecuencia: 1–2 días/semana
+Formato: intervalos cortos de alta intensidad + recuperación activa
+
+🧠 Consejos clave
+La fuerza es imprescindible para no perder músculo
+No bajar de 50 % RM de forma sistemática
+Mantener déficit calórico moderado
+Priorizar adherencia y progresión
+Dormir y recuperarse adecuadamente
+Aumentar el NEAT- Non Exercice Activity Thermogenesis (pasos diarios, vida activa)
+Revaluar cargas cada 4–6 semanas
+
+⚠️ Errores comunes
+Solo cardio y nada de fuerza
+Usar cargas muy ligeras durante meses
+Descansos excesivos
+Déficits calóricos extremos"""
+}
+
+# --- FUNCIONES AUXILIARES WORD ---
+def create_element(name):
+    return OxmlElement(name)
+
+def create_attribute(element, name, value):
+    element.set(ns.qn(name), value)
+
+def add_page_number(run):
+    fldChar1 = create_element('w:fldChar')
+    create_attribute(fldChar1, 'w:fldCharType', 'begin')
+    instrText = create_element('w:instrText')
+    create_attribute(instrText, 'xml:space', 'preserve')
+    instrText.text = "PAGE"
+    fldChar2 = create_element('w:fldChar')
+    create_attribute(fldChar2, 'w:fldCharType', 'end')
+    run._r.append(fldChar1)
+    run._r.append(instrText)
+    run._r.append(fldChar2)
+
+def set_cell_bg_color(cell, hex_color):
+    tcPr = cell._tc.get_or_add_tcPr()
+    shd = OxmlElement('w:shd')
+    shd.set(qn('w:val'), 'clear')
+    shd.set(qn('w:color'), 'auto')
+    shd.set(qn('w:fill'), hex_color)
+    tcPr.append(shd)
+
+def style_header_cell(cell, text, width_inches=None):
+    cell.text = text
+    if width_inches:
+        cell.width = Inches(width_inches)
+    p = cell.paragraphs[0]
+    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run = p.runs[0]
+    run.font.bold = True
+    run.font.color.rgb = RGBColor(255, 255, 255)
+    set_cell_bg_color(cell, "2E4053")
+
+def set_row_cant_split(row):
+    tr = row._tr
+    trPr = tr.get_or_add_trPr()
+    cantSplit = OxmlElement('w:cantSplit')
+    trPr.append(cantSplit)
+
+def set_keep_with_next(paragraph):
+    paragraph.paragraph_format.keep_with_next = True
+
+# --- IMÁGENES ÚNICAS POR DOCUMENTO ---
+class ImagenesDocumento:
+    """
+    Registro de imágenes de UN documento: un único rId por imagen (hash SHA-1) y
+    parte (cuerpo, encabezado...), que se reutiliza en todas las colocaciones
+    posteriores. python-docx ya guarda una sola parte por contenido en
+    get_or_add_image; lo que ahorra este registro es volver a analizar la imagen
+    (cabecera y dimensiones) y recorrer las partes del paquete en cada colocación.
+    """
+
+    def __init__(self):
+        self._registradas = {}  # (parte, sha1) -> (rId, Image de python-docx)
+
+    def add_picture(self, run, image_path_or_stream, width=None, height=None):
+        if isinstance(image_path_or_stream, str):
+            with open(image_path_or_stream, 'rb') as f:
+                datos = f.read()
+        else:
+            image_path_or_stream.seek(0)
+            datos = image_path_or_stream.read()
+        part = run.part
+        clave = (part.partname, hashlib.sha1(datos).hexdigest())
+        if clave not in self._registradas:
+            self._registradas[clave] = part.get_or_add_image(BytesIO(datos))
+        rId, image = self._registradas[clave]
+        cx, cy = image.scaled_dimensions(width, height)
+        inline = CT_Inline.new_pic_inline(part.next_id, rId, image.filename, cx, cy)
+        run._r.add_drawing(inline)
+        return InlineShape(inline)
+
+# --- XML MAGIC: FUNCIÓN PARA MARCA DE AGUA FLOTANTE ---
+def add_float_picture(p, image_path_or_stream, width=None, height=None, imagenes_doc=None):
+    """
+    Inserta una imagen flotante en el párrafo 'p'.
+    La imagen se posiciona "Behind Text" (detrás del texto)
+    y se ancla a la parte INFERIOR IZQUIERDA de la PÁGINA.
+    """
+    run = p.add_run()
+    if imagenes_doc is not None:
+        inline = imagenes_doc.add_picture(run, image_path_or_stream, width=width, height=height)
+    else:
+        inline = run.add_picture(image_path_or_stream, width=width, height=height)
+    inline_shape = inline._inline
+    
+    # IDs aleatorios
+    shape_id = random.randint(1, 10000)
+    
+    # Crear la estructura XML para 'anchor' (flotante)
+    # Namespaces
+    wp = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+    a  = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+    pic = 'http://schemas.openxmlformats.org/drawingml/2006/picture'
+    
+    # Convertir inline a anchor
+    # Paso 1: Crear el elemento <wp:anchor>
+    anchor = OxmlElement('wp:anchor')
+    anchor.set('distT', "0")
+    anchor.set('distB', "0")
+    anchor.set('distL', "0")
+    anchor.set('distR', "0")
+    anchor.set('simplePos', "0")
+    anchor.set('relativeHeight', "251658240")
+    anchor.set('behindDoc', "1") # 1 = Detrás del texto
+    anchor.set('locked', "0")
+    anchor.set('layoutInCell', "1")
+    anchor.set('allowOverlap', "1")
+    
+    # Paso 2: simplePos
+    simplePos = OxmlElement('wp:simplePos')
+    simplePos.set('x', "0")
+    simplePos.set('y', "0")
+    anchor.append(simplePos)
+    
+    # Paso 3: Posición Horizontal (Alineado a la Izquierda de la Página)
+    positionH = OxmlElement('wp:positionH')
+    positionH.set('relativeFrom', "page")
+    posOffsetH = OxmlElement('wp:posOffset')
+    posOffsetH.text = "720000" # Unos 2 cm desde el borde izq (en EMUs)
+    positionH.append(posOffsetH)
+    anchor.append(positionH)
+    
+    # Paso 4: Posición Vertical (Alineado Abajo de la Página)
+    positionV = OxmlElement('wp:positionV')
+    positionV.set('relativeFrom', "page")
+    alignV = OxmlElement('wp:align')
+    alignV.text = "bottom" # Alineado abajo
+    positionV.append(alignV)
+    # Ajuste fino hacia arriba para que no se salga (offset negativo visual simulado)
+    # En XML puro, 'bottom' pega al borde. Si queremos margen, usamos posOffset con valor alto.
+    # Pero align=bottom suele funcionar bien para pies de página.
+    anchor.append(positionV)
+    
+    # Paso 5: Extent (Tamaño)
+    extent = OxmlElement('wp:extent')
+    extent.set('cx', str(inline_shape.extent.cx))
+    extent.set('cy', str(inline_shape.extent.cy))
+    anchor.append(extent)
+    
+    # Paso 6: EffectExtent
+    effectExtent = OxmlElement('wp:effectExtent')
+    effectExtent.set('l', "0")
+    effectExtent.set('t', "0")
+    effectExtent.set('r', "0")
+    effectExtent.set('b', "0")
+    anchor.append(effectExtent)
+    
+    # Paso 7: WrapNone (Para que no afecte al texto)
+    wrapNone = OxmlElement('wp:wrapNone')
+    anchor.append(wrapNone)
+    
+    # Paso 8: DocPr
+    docPr = OxmlElement('wp:docPr')
+    docPr.set('id', str(shape_id))
+    docPr.set('name', f"Picture {shape_id}")
+    anchor.append(docPr)
+    
+    # Paso 9: Graphic (El contenido real de la imagen)
+    graphic = inline_shape.graphic
+    anchor.append(graphic)
+    
+    # Reemplazar el elemento inline por el anchor en el párrafo
+    inline_parent = inline_shape.getparent()
+    inline_parent.replace(inline_shape, anchor)
+
+# --- SECCIONES DEL DOCUMENTO ---
+def _configurar_pagina(doc, imagenes_doc):
+    section = doc.sections[0]
+    section.orientation = WD_ORIENT.LANDSCAPE
+    section.page_width = Inches(11.69)
+    section.page_height = Inches(8.27)
+    section.top_margin = Cm(1.0)
+    section.bottom_margin = Cm(1.0)
+    section.left_margin = Cm(1.27)
+    section.right_margin = Cm(1.27)
+
+    # --- ENCABEZADO "HACK" (Marca de agua Fantasma) ---
+    header = section.header
+    # Limpiar header por si acaso
+    for p in header.paragraphs:
+        p._element.getparent().remove(p._element)
+
+    path_watermark = _ruta_marca_agua()
+
+    if path_watermark:
+        p_header = header.add_paragraph()
+        # Inyectamos la imagen flotante que se irá al fondo de la página
+        with etapa("marca_agua"):
+            add_float_picture(p_header, preparar_imagen_documento(path_watermark, 2.5), width=Inches(2.5), imagenes_doc=imagenes_doc) # Ajusta ancho si es necesario
+
+    # --- PIE DE PÁGINA (SOLO PAGINACIÓN) ---
+    footer = section.footer
+    for p in footer.paragraphs:
+        p._element.getparent().remove(p._element)
+
+    p_foot = footer.add_paragraph()
+    p_foot.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    run_pag = p_foot.add_run("Página ")
+    run_pag.font.size = Pt(10)
+    add_page_number(p_foot.add_run())
+    p_foot.runs[-1].font.size = Pt(10) # Aplicar tamaño al número
+
+def _ruta_marca_agua():
+    path_watermark, _ = encontrar_imagen_recursiva("logo_firma")
+    if not path_watermark:
+        path_watermark, _ = encontrar_imagen_recursiva("watermark")
+    return path_watermark
+
+def _añadir_cabecera_alumno(doc, objetivo, alumno, titulo_material, intensidad_str):
+    head_tbl = doc.add_table(rows=1, cols=2)
+    head_tbl.autofit = False
+    head_tbl.columns[0].width = Inches(9.8)
+    head_tbl.columns[1].width = Inches(1.0)
+
+    c1 = head_tbl.cell(0,0)
+    p = c1.paragraphs[0]
+    r1 = p.add_run(f"PROGRAMA DE ENTRENAMIENTO DE: {titulo_material.upper()}\n")
+    r1.font.bold = True
+    r1.font.size = Pt(12)
+    r1.font.color.rgb = RGBColor(41, 128, 185)
+
+    nombre_mostrar = alumno if alumno.strip() else "ALUMNO"
+
+    font_size_meta = Pt(10)
+    r_obj_label = p.add_run("OBJETIVO: ")
+    r_obj_label.font.bold = True
+    r_obj_label.font.size = font_size_meta
+    p.add_run(f"{objetivo}").font.size = font_size_meta
+    p.add_run("   |   ").font.size = font_size_meta
+
+    r_int_label = p.add_run("INTENSIDAD DE TRABAJO: ")
+    r_int_label.font.bold = True
+    r_int_label.font.size = font_size_meta
+    p.add_run(f"({intensidad_str})").font.size = font_size_meta
+    p.add_run("   |   ").font.size = font_size_meta
+
+    r_alu_label = p.add_run("ALUMNO/A: ")
+    r_alu_label.font.bold = True
+    r_alu_label.font.size = font_size_meta
+    p.add_run(f"{nombre_mostrar.upper()}").font.size = font_size_meta
+
+    c2 = head_tbl.cell(0,1)
+    p2 = c2.paragraphs[0]
+    p2.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    p2.add_run(f"FECHA:\n{datetime.now().strftime('%d/%m/%Y')}").bold = True
+
+    p_sub = doc.add_paragraph()
+    p_sub.alignment = WD_ALIGN_PARAGRAPH.LEFT
+    run_sub = p_sub.add_run("Situación de Aprendizaje: Trabajo en Salas de Musculación 1º de Bachillerato IES Lucía de Medrano")
+    run_sub.font.bold = True
+    run_sub.font.name = 'Cambria'
+    run_sub.font.size = Pt(16)
+    rPr = run_sub._element.get_or_add_rPr()
+    rFonts = OxmlElement('w:rFonts')
+    rFonts.set(qn('w:ascii'), 'Cambria')
+    rFonts.set(qn('w:hAnsi'), 'Cambria')
+    rPr.append(rFonts)
+
+    doc.add_paragraph("_" * 95)
+
+TITULO_GUIA = '1. Guía Visual de Ejercicios'
+TITULO_GUIA_ANALISIS = '1. Guía Visual de Ejercicios con Análisis Muscular'
+TR_HEIGHT_GUIA = 2800
+TR_HEIGHT_GUIA_ANALISIS = 3800
+
+def _añadir_tabla_cardio(doc, cardio_tipo, cardio_tiempo):
+    cardio_table = doc.add_table(rows=1, cols=2)
+    cardio_table.style = 'Table Grid'
+    c_warm = cardio_table.cell(0,0)
+    p_warm = c_warm.paragraphs[0]
+    p_warm.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run_w = p_warm.add_run("A) Calentamiento de 5 minutos de Duración")
+    run_w.font.bold = True
+    run_w.font.size = Pt(10)
+    set_cell_bg_color(c_warm, "EAEDED")
+    c_card = cardio_table.cell(0,1)
+    p_card = c_card.paragraphs[0]
+    p_card.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    run_c = p_card.add_run(f"B) Cardio: {cardio_tipo} -> {cardio_tiempo}")
+    run_c.font.bold = True
+    run_c.font.size = Pt(10)
+    set_cell_bg_color(c_card, "EAEDED")
+
+def _añadir_rejilla_ejercicios(doc, imagenes_doc, registros):
+    """Rejilla de 4 columnas con foto y nombre de cada ejercicio ('Imagen' y
+    'Ejercicio' de cada registro). Devuelve (alturas, celdas) para el modo análisis."""
+    num_ej = len(registros)
+    cols_visual = 4
+    rows_visual = (num_ej + cols_visual - 1) // cols_visual
+    vis_table = doc.add_table(rows=rows_visual, cols=cols_visual)
+    vis_table.style = 'Table Grid'
+
+    alturas = []
+    for row in vis_table.rows:
+        tr = row._tr
+        trPr = tr.get_or_add_trPr()
+        trHeight = OxmlElement('w:trHeight')
+        trHeight.set(qn('w:val'), str(TR_HEIGHT_GUIA))
+        trHeight.set(qn('w:hRule'), "atLeast")
+        trPr.append(trHeight)
+        alturas.append(trHeight)
+        set_row_cant_split(row)
+
+    celdas = []
+    for i, row_data in enumerate(registros):
+        r = i // cols_visual
+        c = i % cols_visual
+        cell = vis_table.cell(r, c)
+        p = cell.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+        with etapa("buscar_imagen"):
+            ruta_img, msg = encontrar_imagen_recursiva(row_data['Imagen'])
+            imagen = preparar_imagen_documento(ruta_img, 2.4, 1.55) if ruta_img else None
+        if ruta_img:
+            try:
+                run = p.add_run()
+                with etapa("add_picture"):
+                    imagenes_doc.add_picture(run, imagen, width=Inches(2.4), height=Inches(1.55))
+                p.paragraph_format.space_before = Pt(4)
+                p.paragraph_format.space_after = Pt(2)
+            except:
+                p.add_run(f"[Error]\n")
+        else:
+            p.add_run(f"\n[FOTO NO DISPONIBLE]\n")
+
+        run_nom = p.add_run("\n" + row_data['Ejercicio'])
+        run_nom.font.bold = True
+        run_nom.font.size = Pt(10)
+        celdas.append((p, row_data))
+
+    return alturas, celdas
+
+def _añadir_guia_visual(doc, imagenes_doc, rutina_df, cardio_tipo, cardio_tiempo):
+    """Sección 1 en modo estándar. Devuelve lo que _convertir_a_analisis necesita
+    para pasarla a modo análisis sin reconstruirla."""
+    h1 = doc.add_heading(level=1)
+    run_titulo = h1.add_run(TITULO_GUIA)
+    run_titulo.font.color.rgb = RGBColor(44, 62, 80)
+
+    _añadir_tabla_cardio(doc, cardio_tipo, cardio_tiempo)
+    doc.add_paragraph("")
+
+    alturas, celdas = _añadir_rejilla_ejercicios(doc, imagenes_doc, rutina_df.to_dict('records'))
+
+    doc.add_page_break()
+    return run_titulo, alturas, celdas
+
+def _convertir_a_analisis(guia):
+    """Pasa la sección 1 ya construida a modo análisis: título, altura de fila y
+    músculos de cada ejercicio. El resto del documento no cambia."""
+    run_titulo, alturas, celdas = guia
+    run_titulo.text = TITULO_GUIA_ANALISIS
+    for trHeight in alturas:
+        trHeight.set(qn('w:val'), str(TR_HEIGHT_GUIA_ANALISIS))
+    for p, row_data in celdas:
+        p.add_run("\n" + "_"*25 + "\n").font.size = Pt(6)
+
+        p.add_run("Músculos Agonistas:\n").font.bold = True
+        p.add_run(f"{str(row_data.get('agonistas', ''))}\n").font.size = Pt(8)
+
+        p.add_run("Músculos Sinergistas:\n").font.bold = True
+        p.add_run(f"{str(row_data.get('sinergistas', ''))}\n").font.size = Pt(8)
+
+        p.add_run("Músculos Estabilizadores:\n").font.bold = True
+        p.add_run(f"{str(row_data.get('estabilizadores', ''))}").font.size = Pt(8)
+
+def _añadir_rutina_detallada(doc, rutina_df, series_str):
+    h2 = doc.add_heading(level=1)
+    run_h2 = h2.add_run('2. Rutina Detallada')
+    run_h2.font.size = Pt(18)
+    run_h2.font.color.rgb = RGBColor(44, 62, 80)
+
+    tech_table = doc.add_table(rows=1, cols=6)
+    tech_table.style = 'Table Grid'
+    tech_table.autofit = False
+    widths = [0.7, 3.5, 1.5, 1.0, 1.5, 2.4]
+    headers = ["Orden", "Ejercicio", "Series x Reps", "Carga", "Descanso", "Notas"]
+    row_hdr = tech_table.rows[0]
+    set_row_cant_split(row_hdr)
+    for i, h in enumerate(headers):
+        style_header_cell(row_hdr.cells[i], h, widths[i])
+
+    for idx, row_data in rutina_df.iterrows():
+        row_cells = tech_table.add_row().cells
+        set_row_cant_split(tech_table.rows[-1])
+        for i in range(6):
+            row_cells[i].width = Inches(widths[i])
+        row_cells[0].text = str(idx + 1)
+        row_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+        row_cells[1].text = row_data['Ejercicio']
+        row_cells[2].text = f"{series_str} x {row_data['Reps']}"
+        row_cells[3].text = f"{row_data['Peso']} kg"
+        row_cells[4].text = row_data['Descanso']
+        row_cells[5].text = f"Int: {row_data['Intensidad_Real']}"
+
+    doc.add_paragraph("\n")
+
+def _añadir_estiramientos(doc, imagenes_doc, lista_estiramientos):
+    if not lista_estiramientos:
+        return
+    h3 = doc.add_heading(level=1)
+    run_h3 = h3.add_run('3. Ejercicios de Estiramientos')
+    run_h3.font.size = Pt(18)
+    run_h3.font.color.rgb = RGBColor(44, 62, 80)
+    set_keep_with_next(h3)
+
+    num_est = len(lista_estiramientos)
+    cols_est = 4
+    rows_est = (num_est + cols_est - 1) // cols_est
+    est_table = doc.add_table(rows=rows_est, cols=cols_est)
+    est_table.style = 'Table Grid'
+    for row in est_table.rows:
+        tr = row._tr
+        trPr = tr.get_or_add_trPr()
+        trHeight = OxmlElement('w:trHeight')
+        trHeight.set(qn('w:val'), str(2600))
+        trHeight.set(qn('w:hRule'), "atLeast")
+        trPr.append(trHeight)
+        set_row_cant_split(row)
+
+    for i, item_est in enumerate(lista_estiramientos):
+        r = i // cols_est
+        c = i % cols_est
+        cell = est_table.cell(r, c)
+        p = cell.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        with etapa("buscar_imagen"):
+            ruta_img, msg = encontrar_imagen_recursiva(item_est['imagen'])
+            imagen = preparar_imagen_documento(ruta_img, 2.2, 1.4) if ruta_img else None
+        if ruta_img:
+            try:
+                run = p.add_run()
+                with etapa("add_picture"):
+                    imagenes_doc.add_picture(run, imagen, width=Inches(2.2), height=Inches(1.4))
+                p.paragraph_format.space_before = Pt(3)
+                p.paragraph_format.space_after = Pt(3)
+            except:
+                p.add_run(f"[Error]\n")
+        else:
+            p.add_run(f"\n[FOTO NO DISPONIBLE]\n")
+        run_nom = p.add_run("\n" + item_est['nombre'])
+        run_nom.font.bold = True
+        run_nom.font.size = Pt(9)
+    doc.add_paragraph("\n")
+
+# ================= SECCIÓN 4: BORG (BLOQUE INDIVISIBLE) =================
+def _añadir_borg(doc):
+    h4 = doc.add_heading(level=1)
+    run_h4 = h4.add_run('4. Percepción del Esfuerzo (RPE) - Escala de Borg')
+    run_h4.font.size = Pt(18)
+    run_h4.font.color.rgb = RGBColor(44, 62, 80)
+    set_keep_with_next(h4)
+
+    borg_table = doc.add_table(rows=3, cols=5)
+    borg_table.style = 'Table Grid'
+    borg_table.autofit = True
+
+    for row in borg_table.rows:
+        set_row_cant_split(row)
+
+    borg_data = [
+        {"val": "6-8", "txt": "Muy Ligero", "icon": "🙂", "color": "A9DFBF"},
+        {"val": "9-11", "txt": "Ligero", "icon": "😌", "color": "D4EFDF"},
+        {"val": "12-14", "txt": "Algo Duro", "icon": "😐", "color": "F9E79F"},
+        {"val": "15-17", "txt": "Duro", "icon": "😓", "color": "F5CBA7"},
+        {"val": "18-20", "txt": "Máximo", "icon": "🥵", "color": "E6B0AA"}
+    ]
+
+    row_icons = borg_table.rows[0]
+    for i, data in enumerate(borg_data):
+        c = row_icons.cells[i]
+        p = c.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        run_icon = p.add_run(f"{data['icon']}\n")
+        run_icon.font.size = Pt(26)
+        run_val = p.add_run(f"{data['val']}")
+        run_val.font.size = Pt(14)
+        set_cell_bg_color(c, data['color'])
+
+    row_text = borg_table.rows[1]
+    for i, data in enumerate(borg_data):
+        c = row_text.cells[i]
+        p = c.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        p.add_run(data['txt']).font.bold = True
+        set_cell_bg_color(c, data['color'])
+
+    row_check = borg_table.rows[2]
+    tr = row_check._tr
+    trPr = tr.get_or_add_trPr()
+    trHeight = OxmlElement('w:trHeight')
+    trHeight.set(qn('w:val'), "600")
+    trPr.append(trHeight)
+    for i, data in enumerate(borg_data):
+        c = row_check.cells[i]
+        set_cell_bg_color(c, data['color'])
+
+    p_note = doc.add_paragraph("Marca con una X la sensación global al terminar el entrenamiento.")
+    p_note.style = "Caption"
+    set_keep_with_next(p_note) # Para que no quede huérfana
+
+    doc.add_paragraph("\n")
+
+# --- SECCIÓN 5: MARCO TEÓRICO ---
+def _añadir_marco_teorico(doc, objetivo):
+    h5 = doc.add_heading(level=1)
+    run_h5 = h5.add_run(f"5. {objetivo.upper()}")
+    run_h5.font.size = Pt(18)
+    run_h5.font.color.rgb = RGBColor(44, 62, 80)
+
+    raw_text = INFO_OBJETIVOS.get(objetivo, "Información no disponible.")
+    clean_lines = raw_text.split('\n')[1:]
+
+    emojis_clave = ['🎯', '🏋️‍♂️', '❤️', '🔁', '🟢', '🟡', '🔵', '🔥', '🔹', '🧠', '⚠️']
+
+    for line in clean_lines:
+        if not line.strip():
+            continue
+
+        p_teoria = doc.add_paragraph()
+
+        if any(line.strip().startswith(e) for e in emojis_clave):
+            parts = line.strip().split(' ', 1)
+            emoji_part = parts[0]
+            text_part = parts[1] if len(parts) > 1 else ""
+
+            r_emo = p_teoria.add_run(emoji_part + " ")
+            r_emo.font.size = Pt(18)
+
+            r_txt = p_teoria.add_run(text_part)
+            r_txt.font.size = Pt(11)
+        else:
+            r_normal = p_teoria.add_run(line)
+            r_normal.font.size = Pt(11)
+
+    doc.add_paragraph("\n")
+
+# --- SECCIÓN 6: RESUMEN (IMAGEN) ---
+def _añadir_resumen(doc, imagenes_doc):
+    h6 = doc.add_heading(level=1)
+    run_h6 = h6.add_run('6. RESUMEN DE FORMAS DE TRABAJO')
+    run_h6.font.size = Pt(18)
+    run_h6.font.color.rgb = RGBColor(44, 62, 80)
+    set_keep_with_next(h6)
+
+    ruta_resumen, msg = encontrar_imagen_recursiva("tabla_resumen")
+    if ruta_resumen:
+        try:
+            imagenes_doc.add_picture(doc.add_paragraph().add_run(), preparar_imagen_documento(ruta_resumen, 9.0), width=Inches(9.0))
+        except:
+            doc.add_paragraph("[Error al insertar la imagen de resumen]")
+    else:
+        doc.add_paragraph("[Imagen 'tabla_resumen' no encontrada]")
+
+    doc.add_paragraph("\n")
+
+# --- SECCIÓN 7: REFLEXIÓN ALUMNO ---
+def _añadir_reflexion(doc):
+    h7 = doc.add_heading(level=1)
+    run_h7 = h7.add_run('7. MI CIRCUITO DE TRABAJO SE BASA EN LOS SIGUIENTES PRINCIPIOS DE ENTRENAMIENTO Y SIGUE LA SIGUIENTE LÓGICA')
+    run_h7.font.size = Pt(14)
+    run_h7.font.color.rgb = RGBColor(44, 62, 80)
+    set_keep_with_next(h7)
+
+    p_inst = doc.add_paragraph("(Explica cómo y por qué estableces este circuito según tus objetivos y criterios científicos):")
+    p_inst.paragraph_format.space_after = Pt(200)
+
+# --- PLANTILLA PRECONSTRUIDA ---
+# Página, encabezado, pie y secciones 4-7 solo dependen del objetivo: se construyen
+# una vez, se guardan como .docx en memoria y cada petición parte de una copia.
+def _firma_imagen(ruta):
+    """(ruta, mtime, tamaño) del archivo: cambia si se sustituye la foto aunque conserve el nombre."""
+    if not ruta:
+        return None
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return ruta, st.st_mtime_ns, st.st_size
+
+def _firma_imagenes_estaticas():
+    return tuple(_firma_imagen(ruta) for ruta in (_ruta_marca_agua(), encontrar_imagen_recursiva("tabla_resumen")[0]))
+
+@functools.lru_cache(maxsize=32)
+def _plantilla_base(objetivo, firma_imagenes):
+    doc = Document()
+    imagenes_doc = ImagenesDocumento()
+    _configurar_pagina(doc, imagenes_doc)
+    _añadir_secciones_finales(doc, imagenes_doc, objetivo)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+# Una sola construcción por plantilla aunque lleguen varias sesiones a la vez
+_lock_plantillas = threading.Lock()
+
+def _bytes_plantilla(objetivo):
+    firma = _firma_imagenes_estaticas()
+    with _lock_plantillas:
+        return _plantilla_base(objetivo, firma)
+
+def preparar_plantillas(objetivos=None):
+    """Construye por adelantado las plantillas (todas, si no se indican objetivos)."""
+    for objetivo in objetivos or INFO_OBJETIVOS:
+        _bytes_plantilla(objetivo)
+
+def vaciar_plantillas():
+    with _lock_plantillas:
+        _plantilla_base.cache_clear()
+
+def _documento_desde_plantilla(objetivo):
+    """Abre una copia de la plantilla y devuelve (doc, cola) con la cola (secciones 4-7)
+    ya separada del cuerpo para volver a colocarla al final."""
+    doc = Document(BytesIO(_bytes_plantilla(objetivo)))
+    body = doc.element.body
+    cola = [el for el in body.iterchildren() if el.tag != qn('w:sectPr')]
+    for el in cola:
+        body.remove(el)
+    return doc, cola
+
+def _recolocar_cola(doc, cola):
+    body = doc.element.body
+    sectPr = body.sectPr
+    for el in cola:
+        if sectPr is not None:
+            sectPr.addprevious(el)
+        else:
+            body.append(el)
+
+# --- GENERADOR WORD ---
+def _añadir_secciones_finales(doc, imagenes_doc, objetivo):
+    with etapa("borg"):
+        _añadir_borg(doc)
+    with etapa("marco_teorico"):
+        _añadir_marco_teorico(doc, objetivo)
+    with etapa("resumen"):
+        _añadir_resumen(doc, imagenes_doc)
+    with etapa("reflexion"):
+        _añadir_reflexion(doc)
+
+def _construir_documento(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, usar_plantilla=True):
+    """Documento completo en modo estándar. Devuelve (doc, guia) para poder pasarlo
+    después a modo análisis con _convertir_a_analisis."""
+    imagenes_doc = ImagenesDocumento()
+    if usar_plantilla:
+        # Cabecera, pie y secciones 4-7 ya vienen hechos en la plantilla
+        with etapa("plantilla"):
+            doc, cola = _documento_desde_plantilla(objetivo)
+    else:
+        doc = Document()
+        with etapa("cabecera_pie"):
+            _configurar_pagina(doc, imagenes_doc)
+
+    # PÁGINA 1
+    with etapa("cabecera_alumno"):
+        _añadir_cabecera_alumno(doc, objetivo, alumno, titulo_material, intensidad_str)
+    with etapa("guia_visual"):
+        guia = _añadir_guia_visual(doc, imagenes_doc, rutina_df, cardio_tipo, cardio_tiempo)
+
+    # PÁGINA 2
+    with etapa("rutina_detallada"):
+        _añadir_rutina_detallada(doc, rutina_df, series_str)
+    with etapa("estiramientos"):
+        _añadir_estiramientos(doc, imagenes_doc, lista_estiramientos)
+
+    if usar_plantilla:
+        with etapa("recolocar_cola"):
+            _recolocar_cola(doc, cola)
+    else:
+        _añadir_secciones_finales(doc, imagenes_doc, objetivo)
+    return doc, guia
+
+def _numerar_dibujos(doc):
+    """Vuelve a numerar los wp:docPr de todo el paquete (cuerpo, encabezados, pies)
+    de 1 en adelante. La cola de la plantilla se separa del cuerpo antes de añadir
+    fotos, así que part.next_id no ve sus ids y los repite; la marca de agua usa
+    un id al azar. Word da el archivo por dañado si dos dibujos comparten id."""
+    siguiente = 1
+    for part in doc.part.package.iter_parts():
+        elemento = getattr(part, '_element', None)
+        if elemento is None:
+            continue
+        for docPr in elemento.iter(qn('wp:docPr')):
+            docPr.set('id', str(siguiente))
+            siguiente += 1
+
+def _guardar(doc, nombre_etapa="guardar"):
+    with etapa(nombre_etapa):
+        _numerar_dibujos(doc)
+        buffer = BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+    return buffer
+
+def generar_word_final(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular, usar_plantilla=True):
+    with medir("generar_word_final", ejercicios=len(rutina_df), estiramientos=len(lista_estiramientos or []), analisis=bool(incluir_analisis_muscular)):
+        doc, guia = _construir_documento(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, usar_plantilla)
+        if incluir_analisis_muscular:
+            with etapa("analisis"):
+                _convertir_a_analisis(guia)
+        return _guardar(doc)
+
+def generar_variantes_word(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, usar_plantilla=True):
+    """
+    Las dos variantes en una sola pasada: se construye el documento una vez,
+    se guarda la versión Estándar, se añade el análisis muscular sobre el mismo
+    documento y se guarda la versión Análisis.
+    Devuelve {False: BytesIO estándar, True: BytesIO análisis}.
+    """
+    with medir("generar_variantes_word", ejercicios=len(rutina_df), estiramientos=len(lista_estiramientos or [])):
+        doc, guia = _construir_documento(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, usar_plantilla)
+        estandar = _guardar(doc, "guardar_estandar")
+        with etapa("analisis"):
+            _convertir_a_analisis(guia)
+        return {False: estandar, True: _guardar(doc, "guardar_analisis")}
+
+# --- MESOCICLO: TODAS LAS SESIONES EN UN DOCUMENTO ---
+# Parte de la misma plantilla que la sesión suelta y cada foto entra una sola vez
+# (ImagenesDocumento + miniaturas ya reducidas). Las semanas van en columnas: una
+# tabla por día de rutina en lugar de una rutina detallada por sesión.
+COLOR_DESCARGA = "D4EFDF"
+ANCHO_COLUMNA_EJERCICIO = 2.6
+ANCHO_TABLA_CARGAS = 10.9
+
+def _titulo_seccion(doc, texto, nivel=1, tamano=18):
+    h = doc.add_heading(level=nivel)
+    run = h.add_run(texto)
+    run.font.size = Pt(tamano)
+    run.font.color.rgb = RGBColor(44, 62, 80)
+    set_keep_with_next(h)
+    return h
+
+def _añadir_guia_mesociclo(doc, imagenes_doc, plan, cardio_tipo, cardio_tiempo):
+    _titulo_seccion(doc, '1. Guía Visual de Ejercicios por Día de Rutina', tamano=16)
+    _añadir_tabla_cardio(doc, cardio_tipo, cardio_tiempo)
+    for nombre, ejercicios in plan['dias'].items():
+        _titulo_seccion(doc, f"Día {nombre}", nivel=2, tamano=13)
+        _añadir_rejilla_ejercicios(doc, imagenes_doc, [{'Ejercicio': ej['nombre'], 'Imagen': ej['imagen']} for ej in ejercicios])
+    doc.add_page_break()
+
+def _añadir_calendario(doc, plan):
+    _titulo_seccion(doc, '2. Planificación del Mesociclo')
+    doc.add_paragraph(f"{plan['semanas']} semanas · {plan['dias_semana']} sesiones por semana · "
+                      f"{plan['reps']} repeticiones · descanso {plan['descanso']}. "
+                      "Las semanas de descarga (en verde) bajan la intensidad y la mitad de series.")
+
+    calendario = plan['calendario']
+    widths = [0.9, 1.2, 1.2, 1.6, 5.9]
+    headers = ["Semana", "Tipo", "% RM", "Series x Reps", "Sesiones (día de rutina)"]
+    tabla = doc.add_table(rows=len(calendario) + 1, cols=len(headers))
+    tabla.style = 'Table Grid'
+    tabla.autofit = False
+    filas = tabla.rows
+    for i, h in enumerate(headers):
+        style_header_cell(filas[0].cells[i], h, widths[i])
+    for fila, datos in zip(filas[1:], calendario.itertuples(index=False)):
+        set_row_cant_split(fila)
+        textos = (str(datos.Semana), datos.Tipo, f"{formatear_kg(datos.Intensidad)}%", f"{datos.Series} x {plan['reps']}", datos.Sesiones)
+        for i, (celda, texto) in enumerate(zip(fila.cells, textos)):
+            celda.width = Inches(widths[i])
+            celda.text = texto
+            celda.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+            if datos.Tipo == "Descarga":
+                set_cell_bg_color(celda, COLOR_DESCARGA)
+    doc.add_paragraph("")
+
+def _añadir_cargas_por_dia(doc, plan):
+    """Por cada día de rutina, tabla ejercicios x semanas con la carga de cada una."""
+    calendario = plan['calendario']
+    descargas = (calendario['Tipo'] == "Descarga").tolist()
+    ancho_semana = (ANCHO_TABLA_CARGAS - ANCHO_COLUMNA_EJERCICIO) / plan['semanas']
+    for nombre, cargas in plan['cargas'].items():
+        _titulo_seccion(doc, f"Día {nombre}: carga por semana (kg)", nivel=2, tamano=13)
+        tabla = doc.add_table(rows=len(cargas) + 1, cols=plan['semanas'] + 1)
+        tabla.style = 'Table Grid'
+        tabla.autofit = False
+        filas = tabla.rows
+        cabecera = filas[0].cells
+        set_row_cant_split(filas[0])
+        style_header_cell(cabecera[0], "Ejercicio", ANCHO_COLUMNA_EJERCICIO)
+        for i, datos in enumerate(calendario.itertuples(index=False)):
+            style_header_cell(cabecera[i + 1], f"S{datos.Semana}\n{formatear_kg(datos.Intensidad)}%", ancho_semana)
+            cabecera[i + 1].paragraphs[0].runs[0].font.size = Pt(8)
+        for fila, (ejercicio, pesos) in zip(filas[1:], cargas.iterrows()):
+            set_row_cant_split(fila)
+            celdas = fila.cells
+            celdas[0].width = Inches(ANCHO_COLUMNA_EJERCICIO)
+            celdas[0].text = ejercicio
+            celdas[0].paragraphs[0].runs[0].font.size = Pt(9)
+            for i, peso in enumerate(pesos):
+                celda = celdas[i + 1]
+                celda.width = Inches(ancho_semana)
+                celda.text = formatear_kg(peso)
+                celda.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
+                celda.paragraphs[0].runs[0].font.size = Pt(9)
+                if descargas[i]:
+                    set_cell_bg_color(celda, COLOR_DESCARGA)
+        doc.add_paragraph("")
+
+def generar_mesociclo_word(plan, lista_estiramientos, alumno, titulo_material, cardio_tipo, cardio_tiempo, usar_plantilla=True):
+    """Documento del mesociclo completo ('plan' de mesociclo.planificar_mesociclo)."""
+    objetivo = plan['objetivo']
+    intensidades = plan['calendario']['Intensidad']
+    intensidad_str = f"{formatear_kg(intensidades.min())}-{formatear_kg(intensidades.max())}% · {plan['semanas']} semanas"
+    with medir("generar_mesociclo_word", semanas=plan['semanas'], dias_rutina=len(plan['dias']),
+               sesiones=plan['semanas'] * plan['dias_semana']):
+        imagenes_doc = ImagenesDocumento()
+        if usar_plantilla:
+            with etapa("plantilla"):
+                doc, cola = _documento_desde_plantilla(objetivo)
+        else:
+            doc = Document()
+            with etapa("cabecera_pie"):
+                _configurar_pagina(doc, imagenes_doc)
+        with etapa("cabecera_alumno"):
+            _añadir_cabecera_alumno(doc, objetivo, alumno, titulo_material, intensidad_str)
+        with etapa("guia_visual"):
+            _añadir_guia_mesociclo(doc, imagenes_doc, plan, cardio_tipo, cardio_tiempo)
+        with etapa("calendario"):
+            _añadir_calendario(doc, plan)
+        with etapa("cargas_por_dia"):
+            _añadir_cargas_por_dia(doc, plan)
+        with etapa("estiramientos"):
+            _añadir_estiramientos(doc, imagenes_doc, lista_estiramientos)
+        if usar_plantilla:
+            with etapa("recolocar_cola"):
+                _recolocar_cola(doc, cola)
+        else:
+            _añadir_secciones_finales(doc, imagenes_doc, objetivo)
+        return _guardar(doc)
+
+# --- DOCUMENTOS YA GENERADOS (MEMOIZACIÓN) ---
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+CACHE_DOCUMENTOS = CacheLRUBytes()
+CAMPOS_TABLA = ("Ejercicio", "Imagen", "Reps", "Peso", "Descanso", "Intensidad_Real")
+CAMPOS_ANALISIS = ("agonistas", "sinergistas", "estabilizadores")
+
+def huella_documento(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular):
+    """Hash de todo lo que se ve en el documento y nada más: dos alumnos cuya rutina
+    solo difiere en cosas que no se imprimen comparten el mismo documento. Las fotos
+    entran con su firma de archivo, así que sustituir una en img/ invalida la clave."""
+    campos = CAMPOS_TABLA + (CAMPOS_ANALISIS if incluir_analisis_muscular else ())
+    filas = [[str(fila.get(c, '')) for c in campos] + [_firma_imagen(encontrar_imagen_recursiva(fila.get('Imagen'))[0])]
+             for fila in rutina_df.to_dict('records')]
+    estiramientos = [(e['nombre'], e['imagen'], _firma_imagen(encontrar_imagen_recursiva(e['imagen'])[0]))
+                     for e in lista_estiramientos or []]
+    nombre_mostrar = alumno.upper() if alumno.strip() else "ALUMNO"
+    return huella(
+        filas, estiramientos, objetivo, nombre_mostrar, titulo_material.upper(), intensidad_str,
+        cardio_tipo, cardio_tiempo, series_str, bool(incluir_analisis_muscular),
+        datetime.now().strftime('%d/%m/%Y'), _firma_imagenes_estaticas(),
+    )
+
+def generar_word_cacheado(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular):
+    """Igual que generar_word_final, pero sirve desde CACHE_DOCUMENTOS los documentos ya generados."""
+    args = (rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str, incluir_analisis_muscular)
+    clave = huella_documento(*args)
+    datos = CACHE_DOCUMENTOS.get(clave)
+    if datos is None:
+        datos = generar_word_final(*args).getvalue()
+        CACHE_DOCUMENTOS.put(clave, datos)
+    return BytesIO(datos)
+
+def generar_variantes_cacheado(rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str):
+    """Igual que generar_variantes_word, pero pasando por CACHE_DOCUMENTOS."""
+    args = (rutina_df, lista_estiramientos, objetivo, alumno, titulo_material, intensidad_str, cardio_tipo, cardio_tiempo, series_str)
+    claves = {analisis: huella_documento(*args, analisis) for analisis in (False, True)}
+    datos = {analisis: CACHE_DOCUMENTOS.get(clave) for analisis, clave in claves.items()}
+    if any(d is None for d in datos.values()):
+        for analisis, buffer in generar_variantes_word(*args).items():
+            datos[analisis] = buffer.getvalue()
+            CACHE_DOCUMENTOS.put(claves[analisis], datos[analisis])
+    return {analisis: BytesIO(d) for analisis, d in datos.items()}
@@ -0,0 +1,377 @@
+import functools
+import hashlib
+import math
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# --- ÍNDICE DE IMÁGENES ---
+EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg', '.bmp')
+# Cada cuánto (segundos) se comprueban las fechas de modificación de las carpetas
+INTERVALO_COMPROBACION = 2.0
+
+
+def normalizar_nombre(nombre):
+    """Nombre en minúsculas, sin espacios laterales y en forma Unicode NFC
+    (macOS guarda 'á' descompuesta y el Excel la trae compuesta)."""
+    return unicodedata.normalize('NFC', str(nombre).strip().lower())
+
+
+class IndiceImagenes:
+    """
+    Registro incremental de las imágenes del árbol: se recorre UNA sola vez y
+    después solo se vuelve a leer la carpeta cuya fecha de modificación cambia
+    (añadir o borrar una foto cambia la de su carpeta). Mantiene dos diccionarios:
+    nombre completo -> ruta y nombre sin extensión -> ruta; si hay nombres
+    repetidos gana el primero en el orden de os.walk, como antes.
+    Las comprobaciones se hacen al buscar (como mucho cada INTERVALO_COMPROBACION
+    segundos) o en un hilo aparte con iniciar_vigilancia(). Cada alta o baja se
+    notifica a las funciones registradas con suscribir(funcion(evento, ruta)),
+    con evento "añadida" o "eliminada".
+    """
+
+    def __init__(self, raiz="."):
+        self.raiz = raiz
+        self.version = 0  # Sube con cada cambio: sirve de clave a quien cachee resultados
+        self._carpetas = {}  # carpeta -> (mtime_ns, {archivo: ruta}, {subcarpetas})
+        self._orden = {}  # ruta -> clave con el orden de os.walk
+        self._prefijos = {}  # carpeta -> parte de esa clave
+        self._candidatos_archivo = {}
+        self._candidatos_base = {}
+        self._por_archivo = {}
+        self._por_base = {}
+        self._ultima_comprobacion = 0.0
+        self._construido = False
+        self._lock = threading.RLock()
+        self._suscriptores = []
+        self._vigilancia = None
+
+    def _carpetas_visibles(self, dirs):
+        # Fuera .git, .cache y demás carpetas ocultas
+        return {d for d in dirs if not d.startswith('.') and d != '__pycache__'}
+
+    def _leer_carpeta(self, carpeta):
+        """(mtime, imágenes, subcarpetas) de UNA carpeta, o None si ya no existe."""
+        try:
+            mtime = os.stat(carpeta).st_mtime_ns
+            entradas = list(os.scandir(carpeta))
+        except OSError:
+            return None
+        archivos, dirs = {}, []
+        for entrada in entradas:
+            try:
+                es_carpeta = entrada.is_dir()
+            except OSError:
+                continue
+            if es_carpeta:
+                # os.walk no entra en enlaces simbólicos a carpetas
+                if not entrada.is_symlink():
+                    dirs.append(entrada.name)
+            elif entrada.name.lower().endswith(EXTENSIONES_IMAGEN):
+                archivos[entrada.name] = os.path.join(carpeta, entrada.name)
+        return mtime, archivos, self._carpetas_visibles(dirs)
+
+    def _clave_orden(self, ruta):
+        # Recorrido en preorden de os.walk con carpetas y archivos ordenados:
+        # los archivos de una carpeta van antes que sus subcarpetas
+        carpeta, archivo = os.path.split(ruta)
+        prefijo = self._prefijos.get(carpeta)
+        if prefijo is None:
+            relativa = os.path.relpath(carpeta, self.raiz)
+            partes = [] if relativa == os.curdir else relativa.split(os.sep)
+            prefijo = self._prefijos[carpeta] = tuple((1, parte) for parte in partes)
+        return prefijo + ((0, archivo),)
+
+    def _elegir(self, candidatos, destino, clave):
+        rutas = candidatos.get(clave)
+        if rutas:
+            destino[clave] = next(iter(rutas)) if len(rutas) == 1 else min(rutas, key=self._orden.__getitem__)
+        else:
+            candidatos.pop(clave, None)
+            destino.pop(clave, None)
+
+    def _alta(self, ruta, eventos):
+        nombre = normalizar_nombre(os.path.basename(ruta))
+        base = os.path.splitext(nombre)[0]
+        self._orden[ruta] = self._clave_orden(ruta)
+        self._candidatos_archivo.setdefault(nombre, set()).add(ruta)
+        self._candidatos_base.setdefault(base, set()).add(ruta)
+        self._elegir(self._candidatos_archivo, self._por_archivo, nombre)
+        self._elegir(self._candidatos_base, self._por_base, base)
+        eventos.append(("añadida", ruta))
+
+    def _baja(self, ruta, eventos):
+        nombre = normalizar_nombre(os.path.basename(ruta))
+        base = os.path.splitext(nombre)[0]
+        self._candidatos_archivo.get(nombre, set()).discard(ruta)
+        self._candidatos_base.get(base, set()).discard(ruta)
+        self._elegir(self._candidatos_archivo, self._por_archivo, nombre)
+        self._elegir(self._candidatos_base, self._por_base, base)
+        del self._orden[ruta]
+        eventos.append(("eliminada", ruta))
+
+    def _añadir_carpeta(self, carpeta, eventos):
+        datos = self._leer_carpeta(carpeta)
+        if datos is None:
+            return
+        self._carpetas[carpeta] = datos
+        _, archivos, subcarpetas = datos
+        for ruta in archivos.values():
+            self._alta(ruta, eventos)
+        for sub in subcarpetas:
+            self._añadir_carpeta(os.path.join(carpeta, sub), eventos)
+
+    def _quitar_carpeta(self, carpeta, eventos):
+        _, archivos, subcarpetas = self._carpetas.pop(carpeta)
+        for ruta in archivos.values():
+            self._baja(ruta, eventos)
+        for sub in subcarpetas:
+            if os.path.join(carpeta, sub) in self._carpetas:
+                self._quitar_carpeta(os.path.join(carpeta, sub), eventos)
+
+    def _actualizar_carpeta(self, carpeta, eventos):
+        datos = self._leer_carpeta(carpeta)
+        if datos is None:
+            self._quitar_carpeta(carpeta, eventos)
+            return
+        _, antes, subs_antes = self._carpetas[carpeta]
+        self._carpetas[carpeta] = datos
+        _, archivos, subcarpetas = datos
+        for archivo in antes.keys() - archivos.keys():
+            self._baja(antes[archivo], eventos)
+        for archivo in archivos.keys() - antes.keys():
+            self._alta(archivos[archivo], eventos)
+        for sub in subs_antes - subcarpetas:
+            if os.path.join(carpeta, sub) in self._carpetas:
+                self._quitar_carpeta(os.path.join(carpeta, sub), eventos)
+        for sub in subcarpetas - subs_antes:
+            self._añadir_carpeta(os.path.join(carpeta, sub), eventos)
+
+    def _construir(self):
+        self._carpetas = {}
+        self._orden = {}
+        self._candidatos_archivo = {}
+        self._candidatos_base = {}
+        self._por_archivo = {}
+        self._por_base = {}
+        eventos = []
+        self._añadir_carpeta(self.raiz, eventos)
+        self._construido = True
+        self._ultima_comprobacion = time.monotonic()
+        self.version += 1
+
+    def _notificar(self, eventos):
+        for funcion in list(self._suscriptores):
+            for evento, ruta in eventos:
+                try:
+                    funcion(evento, ruta)
+                except Exception:
+                    pass  # Un suscriptor con errores no debe romper las búsquedas
+
+    def comprobar_cambios(self):
+        """Relee solo las carpetas modificadas. Devuelve la lista de (evento, ruta)."""
+        eventos = []
+        with self._lock:
+            if not self._construido:
+                self._construir()
+                return eventos
+            self._ultima_comprobacion = time.monotonic()
+            for carpeta, (mtime, _, _) in list(self._carpetas.items()):
+                if carpeta not in self._carpetas:  # Ya quitada junto con su carpeta padre
+                    continue
+                try:
+                    cambiada = os.stat(carpeta).st_mtime_ns != mtime
+                except OSError:
+                    cambiada = True
+                if cambiada:
+                    self._actualizar_carpeta(carpeta, eventos)
+            if eventos:
+                self.version += 1
+        self._notificar(eventos)
+        return eventos
+
+    def _asegurar_actualizado(self):
+        if self._construido and (self._vigilancia is not None
+                                 or time.monotonic() - self._ultima_comprobacion < INTERVALO_COMPROBACION):
+            return
+        self.comprobar_cambios()
+
+    def refrescar(self):
+        """Recorrido completo desde cero; avisa a los suscriptores de las diferencias."""
+        with self._lock:
+            antes = set(self._orden)
+            self._construir()
+            despues = set(self._orden)
+        self._notificar([("eliminada", r) for r in sorted(antes - despues)] + [("añadida", r) for r in sorted(despues - antes)])
+
+    def suscribir(self, funcion):
+        if funcion not in self._suscriptores:
+            self._suscriptores.append(funcion)
+        return funcion
+
+    def quitar_suscripcion(self, funcion):
+        if funcion in self._suscriptores:
+            self._suscriptores.remove(funcion)
+
+    def iniciar_vigilancia(self, intervalo=INTERVALO_COMPROBACION):
+        """Comprueba los cambios en un hilo aparte: las búsquedas ya no hacen ni un stat."""
+        with self._lock:
+            if self._vigilancia is not None:
+                return
+            self._asegurar_actualizado()
+            self._vigilancia = threading.Thread(target=self._vigilar, args=(intervalo,), name="vigilancia-imagenes", daemon=True)
+            self._vigilancia.start()
+
+    def _vigilar(self, intervalo):
+        while True:
+            time.sleep(intervalo)
+            try:
+                self.comprobar_cambios()
+            except Exception:
+                pass  # Se reintenta en la siguiente vuelta
+
+    def buscar(self, nombre_objetivo):
+        """Devuelve (ruta, tipo_coincidencia) igual que encontrar_imagen_recursiva."""
+        self._asegurar_actualizado()
+        nombre_limpio = normalizar_nombre(nombre_objetivo)
+        ruta = self._por_archivo.get(nombre_limpio)
+        if ruta:
+            return ruta, "Exacta"
+        ruta = self._por_base.get(os.path.splitext(nombre_limpio)[0])
+        if ruta:
+            return ruta, "Por Nombre"
+        return None, "No encontrado"
+
+    def faltantes(self, nombres):
+        """Los nombres de 'nombres' que no corresponden a ninguna imagen."""
+        return [n for n in nombres if self.buscar(n)[0] is None]
+
+    def __len__(self):
+        self._asegurar_actualizado()
+        return len(self._por_archivo)
+
+
+INDICE_IMAGENES = IndiceImagenes(".")
+
+
+# --- BUSCADOR ---
+def encontrar_imagen_recursiva(nombre_objetivo):
+    if not nombre_objetivo or (isinstance(nombre_objetivo, float) and math.isnan(nombre_objetivo)):
+        return None, "Celda Vacía"
+    # Búsqueda O(1) sobre el índice en memoria (se reconstruye si cambian las carpetas)
+    return INDICE_IMAGENES.buscar(nombre_objetivo)
+
+
+# --- MINIATURAS PARA LAS GALERÍAS ---
+DIR_MINIATURAS = os.path.join(".cache", "miniaturas")
+ANCHO_MINIATURA = 320  # px: suficiente para 6 columnas en layout 'wide' (también en pantallas retina)
+CALIDAD_MINIATURA = 70
+
+_miniaturas = {}
+_lock_miniaturas = threading.Lock()
+
+
+def _hash_contenido(ruta):
+    h = hashlib.sha1()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(65536), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _crear_miniatura(ruta_origen, ruta_destino, ancho):
+    with Image.open(ruta_origen) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGB')
+        if img.width > ancho:
+            alto = max(1, round(img.height * ancho / img.width))
+            img = img.resize((ancho, alto), Image.LANCZOS)
+        os.makedirs(os.path.dirname(ruta_destino), exist_ok=True)
+        # Escritura atómica: otra sesión puede estar leyendo la misma miniatura
+        fd, ruta_tmp = tempfile.mkstemp(dir=os.path.dirname(ruta_destino), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                img.save(f, 'WEBP', quality=CALIDAD_MINIATURA, method=4)
+            os.replace(ruta_tmp, ruta_destino)
+        except BaseException:
+            if os.path.exists(ruta_tmp):
+                os.remove(ruta_tmp)
+            raise
+
+
+def obtener_miniatura(ruta, ancho=ANCHO_MINIATURA):
+    """
+    Devuelve la ruta de una miniatura WebP de 'ancho' px generada a partir de 'ruta'.
+    El nombre en disco es el hash del contenido original, así que dos fotos iguales
+    comparten miniatura y una foto modificada genera otra nueva.
+    Si algo falla se devuelve la imagen original.
+    """
+    try:
+        st_origen = os.stat(ruta)
+    except OSError:
+        return ruta
+    clave = (ruta, st_origen.st_mtime_ns, st_origen.st_size, ancho)
+    with _lock_miniaturas:
+        ruta_mini = _miniaturas.get(clave)
+    if ruta_mini and os.path.exists(ruta_mini):
+        return ruta_mini
+    try:
+        ruta_mini = os.path.join(DIR_MINIATURAS, f"{_hash_contenido(ruta)}_{ancho}.webp")
+        if not os.path.exists(ruta_mini):
+            _crear_miniatura(ruta, ruta_mini, ancho)
+    except Exception:
+        return ruta
+    with _lock_miniaturas:
+        _miniaturas[clave] = ruta_mini
+    return ruta_mini
+
+
+# --- IMÁGENES PARA EL DOCUMENTO WORD ---
+# Resolución objetivo dentro del .docx: suficiente para imprimir en A4 sin pixelar
+DPI_DOCUMENTO = 150
+CALIDAD_DOCUMENTO = 80
+
+
+@functools.lru_cache(maxsize=512)
+def _bytes_documento(ruta, mtime_ns, tamano, ancho_in, alto_in, dpi):
+    with open(ruta, 'rb') as f:
+        original = f.read()
+    with Image.open(BytesIO(original)) as img:
+        img = ImageOps.exif_transpose(img)
+        ancho_px = max(1, round(ancho_in * dpi))
+        if alto_in:
+            alto_px = max(1, round(alto_in * dpi))
+        else:
+            alto_px = max(1, round(img.height * ancho_px / img.width))
+        # Nunca se amplía: solo se reduce a lo que cabe en la caja a 'dpi'
+        if img.width > ancho_px or img.height > alto_px:
+            img = img.resize((min(img.width, ancho_px), min(img.height, alto_px)), Image.LANCZOS)
+        salida = BytesIO()
+        if img.mode in ('RGBA', 'LA') or 'transparency' in img.info:
+            img.save(salida, 'PNG', optimize=True)
+        else:
+            img.convert('RGB').save(salida, 'JPEG', quality=CALIDAD_DOCUMENTO, optimize=True, progressive=True)
+    procesado = salida.getvalue()
+    # Si la foto ya era pequeña y recomprimir no gana nada, se usa tal cual
+    return procesado if len(procesado) < len(original) else original
+
+
+def preparar_imagen_documento(ruta, ancho_in, alto_in=None, dpi=DPI_DOCUMENTO):
+    """
+    Devuelve un stream con la imagen reducida y recomprimida para la caja
+    (ancho_in x alto_in pulgadas) en la que se va a pintar dentro del Word.
+    El resultado se cachea por (imagen, caja). Si la imagen no se puede
+    procesar se devuelve la ruta original para que python-docx lo intente.
+    """
+    try:
+        st_origen = os.stat(ruta)
+        datos = _bytes_documento(ruta, st_origen.st_mtime_ns, st_origen.st_size, ancho_in, alto_in, dpi)
+    except Exception:
+        return ruta
+    return BytesIO(datos)
@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+
+from autorrelleno import completar_ejercicios, completar_estiramientos
+from cargas import ESQUEMAS_SERIES
+from generador_word import generar_variantes_word
+from rutinas import PRESETS_OBJETIVO, construir_rutina, titulo_material
+
+# --- GENERACIÓN POR LOTES (TODA LA CLASE) ---
+# Columnas de la lista de clase (CSV o Excel):
+#   alumno, objetivo, material, ejercicios
+#   opcionales: intensidad, repeticiones, descanso, series, cardio, estiramientos, esquema
+# 'material' y 'ejercicios' son listas separadas por ';'. Cada ejercicio lleva su 1RM
+# como "Press de Banca=80; Squats=100" (sin '=' se usa 60 kg, como en la interfaz).
+# 'estiramientos' puede ser un número (se eligen al azar) o una lista de nombres.
+# 'esquema' es uno de cargas.ESQUEMAS_SERIES (fijo, piramide, piramide_inversa, ondulante).
+SEPARADOR_LISTA = ';'
+RM_POR_DEFECTO = 60
+NUM_EJERCICIOS_AUTO = 6
+NUM_ESTIRAMIENTOS_AUTO = 4
+CARDIO_POR_DEFECTO = "Bicicleta"
+MIME_ZIP = "application/zip"
+# Por encima de este tamaño el ZIP de la clase pasa de memoria a un archivo temporal
+MAX_ZIP_EN_MEMORIA = 4 * 1024 * 1024
+
+
+def leer_lista_clase(archivo, nombre_archivo=None):
+    """Lee la lista de clase (ruta o archivo subido) y devuelve una lista de dicts."""
+    nombre = str(nombre_archivo or getattr(archivo, 'name', archivo)).lower()
+    if nombre.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(archivo)
+    else:
+        df = pd.read_csv(archivo)
+    df.columns = df.columns.str.strip().str.lower()
+    return df.fillna("").to_dict('records')
+
+
+def _lista(celda):
+    return [x.strip() for x in str(celda).split(SEPARADOR_LISTA) if x.strip()]
+
+
+def _texto(celda, por_defecto):
+    if isinstance(celda, float) and celda.is_integer():
+        celda = int(celda)
+    celda = str(celda).strip()
+    return celda if celda else por_defecto
+
+
+def _nombre_archivo(texto):
+    return re.sub(r'[^\w\-]+', '_', texto.strip()).strip('_') or "ALUMNO"
+
+
+def preparar_tarea(fila, catalogo):
+    """Traduce una fila de la lista de clase a los argumentos de generar_word_final.
+    Lanza ValueError con un mensaje legible si la fila no es válida."""
+    alumno = _texto(fila.get('alumno', ''), "")
+    objetivo = _texto(fila.get('objetivo', ''), "")
+    if objetivo not in PRESETS_OBJETIVO:
+        raise ValueError(f"objetivo desconocido '{objetivo}'")
+    preset = PRESETS_OBJETIVO[objetivo]
+
+    sel_tipos = _lista(fila.get('material', ''))
+    desconocidos = [t for t in sel_tipos if not catalogo.por_tipo(t)]
+    if desconocidos:
+        raise ValueError(f"material desconocido: {', '.join(desconocidos)}")
+
+    seleccionados_data = []
+    rm_inputs = {}
+    for par in _lista(fila.get('ejercicios', '')):
+        nombre, _, rm = par.partition('=')
+        nombre = nombre.strip()
+        ejercicio = catalogo.buscar(nombre, sel_tipos or None) or catalogo.buscar(nombre)
+        if ejercicio is None:
+            raise ValueError(f"ejercicio desconocido '{nombre}'")
+        seleccionados_data.append(ejercicio)
+        rm_inputs[nombre] = int(float(rm)) if rm.strip() else RM_POR_DEFECTO
+    if not seleccionados_data:
+        pool = catalogo.filtrar(sel_tipos) if sel_tipos else []
+        if not pool:
+            raise ValueError("sin ejercicios ni material")
+        seleccionados_data = completar_ejercicios(catalogo, pool, NUM_EJERCICIOS_AUTO)
+        rm_inputs = {e['nombre']: RM_POR_DEFECTO for e in seleccionados_data}
+
+    celda_est = _texto(fila.get('estiramientos', ''), str(NUM_ESTIRAMIENTOS_AUTO))
+    if celda_est.isdigit():
+        estiramientos = completar_estiramientos(catalogo, seleccionados_data, int(celda_est))
+    else:
+        estiramientos = []
+        for nombre in _lista(celda_est):
+            estiramiento = catalogo.buscar(nombre)
+            if estiramiento is None:
+                raise ValueError(f"estiramiento desconocido '{nombre}'")
+            estiramientos.append(estiramiento)
+
+    intensidad = int(float(_texto(fila.get('intensidad', ''), preset['intensidad'])))
+    series = _texto(fila.get('series', ''), preset['series'])
+    esquema = _texto(fila.get('esquema', ''), "fijo").lower()
+    if esquema not in ESQUEMAS_SERIES:
+        raise ValueError(f"esquema desconocido '{esquema}'")
+    rutina_export = construir_rutina(
+        seleccionados_data, rm_inputs, intensidad,
+        _texto(fila.get('repeticiones', ''), preset['reps']),
+        _texto(fila.get('descanso', ''), preset['descanso']),
+        series, esquema,
+    )
+    return {
+        "rutina_df": pd.DataFrame(rutina_export),
+        "lista_estiramientos": estiramientos,
+        "objetivo": objetivo,
+        "alumno": alumno,
+        "titulo_material": titulo_material(sel_tipos),
+        "intensidad_str": f"{intensidad}%",
+        "cardio_tipo": _texto(fila.get('cardio', ''), CARDIO_POR_DEFECTO),
+        "cardio_tiempo": preset['cardio'],
+        "series_str": series,
+    }
+
+
+def _generar_documentos(indice, tarea):
+    """Trabajo de cada proceso: las dos variantes de un alumno."""
+    base = f"{indice:02d}_Rutina_{_nombre_archivo(tarea['alumno'])}"
+    documentos = generar_variantes_word(**tarea)
+    return [(f"{base}_Estandar.docx", documentos[False].getvalue()), (f"{base}_Analisis.docx", documentos[True].getvalue())]
+
+
+def generar_lote(filas, catalogo, max_procesos=None, destino=None):
+    """
+    Genera las rutinas Estándar y Análisis de toda la lista de clase en un único ZIP.
+    Los documentos se reparten en un pool de procesos y se escriben en el ZIP según
+    van terminando. Las filas con errores no detienen el lote: se listan en
+    ERRORES.txt dentro del ZIP.
+    El ZIP se escribe en 'destino' (cualquier archivo binario con seek) o, si no se
+    indica, en un SpooledTemporaryFile que pasa a disco al superar MAX_ZIP_EN_MEMORIA.
+    Devuelve (archivo con el ZIP, rebobinado; nº de alumnos cuyos documentos están
+    en el ZIP; lista de errores).
+    """
+    errores = []
+    tareas = []
+    procesados = 0
+    for i, fila in enumerate(filas, start=1):
+        try:
+            tareas.append((i, preparar_tarea(fila, catalogo)))
+        except Exception as e:
+            errores.append(f"Fila {i} ({fila.get('alumno', '')}): {e}")
+
+    if destino is None:
+        destino = tempfile.SpooledTemporaryFile(max_size=MAX_ZIP_EN_MEMORIA)
+    # ZIP_STORED: los .docx ya van comprimidos, volver a comprimirlos solo gasta CPU
+    with zipfile.ZipFile(destino, 'w', zipfile.ZIP_STORED) as zf:
+        procesos = max_procesos or min(len(tareas), os.cpu_count() or 1)
+        if procesos <= 1:
+            for i, tarea in tareas:
+                try:
+                    for nombre, datos in _generar_documentos(i, tarea):
+                        zf.writestr(nombre, datos)
+                    procesados += 1
+                except Exception as e:
+                    errores.append(f"Fila {i}: {e}")
+        elif tareas:
+            # 'spawn': el servidor de Streamlit tiene hilos y hacer fork desde ahí no es seguro
+            contexto = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                futuros = {pool.submit(_generar_documentos, i, tarea): i for i, tarea in tareas}
+                for futuro in as_completed(futuros):
+                    try:
+                        for nombre, datos in futuro.result():
+                            zf.writestr(nombre, datos)
+                        procesados += 1
+                    except Exception as e:
+                        errores.append(f"Fila {futuros[futuro]}: {e}")
+        if errores:
+            zf.writestr("ERRORES.txt", "\n".join(sorted(errores)))
+    destino.seek(0)
+    return destino, procesados, errores
@@ -0,0 +1,123 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from cargas import INCREMENTO_POR_DEFECTO, incrementos_para, num_series, tabla_cargas
+
+# --- PLANIFICADOR DE MESOCICLOS ---
+# A partir del objetivo y de los ejercicios elegidos construye un bloque de 4 a 12
+# semanas:
+#   - los ejercicios se reparten en días de rutina (A, B, C) juntando los que
+#     comparten agonistas, y las sesiones de la semana van rotando A-B-A, B-A-B...
+#   - la intensidad sube PASO_SEMANAL puntos de % RM cada semana de carga y cada
+#     bloque empieza un paso por encima del anterior (progresión en ondas)
+#   - cada 'descarga_cada' semanas hay una semana de descarga: menos intensidad
+#     y la mitad de series
+# Las cargas de todas las semanas salen de una sola llamada a cargas.tabla_cargas.
+SEMANAS_MIN, SEMANAS_MAX = 4, 12
+DIAS_SEMANA_MIN, DIAS_SEMANA_MAX = 2, 6
+DESCARGA_CADA = 4  # La 4ª semana de cada bloque es de descarga
+PASO_SEMANAL = 2.5  # Puntos de % RM por semana de carga
+PUNTOS_DESCARGA = 10  # La descarga baja la intensidad base estos puntos
+INTENSIDAD_MAXIMA = 100
+
+# Sesiones por semana de cada objetivo (frecuencias de INFO_OBJETIVOS)
+DIAS_POR_OBJETIVO = {
+    "Fuerza Máxima": 3,
+    "Hipertrofia Muscular": 4,
+    "Definición Muscular": 4,
+    "Programa de Pérdida de Peso": 3,
+    "Resistencia Muscular": 3,
+    "Mantenimiento Muscular": 2,
+    "Rehabilitación Muscular y Articular": 3,
+}
+DIAS_POR_DEFECTO = 3
+NOMBRES_DIAS = "ABC"
+
+
+def num_dias_rutina(n_ejercicios, dias_semana):
+    """Días de rutina distintos: cuerpo completo con pocos ejercicios, A/B a partir
+    de 4 y A/B/C a partir de 9 (nunca más que sesiones por semana)."""
+    if n_ejercicios < 4:
+        dias = 1
+    elif n_ejercicios < 9:
+        dias = 2
+    else:
+        dias = 3
+    return max(1, min(dias, dias_semana, len(NOMBRES_DIAS)))
+
+
+def repartir_dias(ejercicios, n_dias):
+    """Lista de n_dias listas de ejercicios. Cada ejercicio va al día con el que más
+    agonistas comparte entre los que aún tienen hueco (el reparto queda equilibrado);
+    dentro de cada día se respeta el orden de selección."""
+    capacidad = math.ceil(len(ejercicios) / n_dias) if ejercicios else 0
+    agonistas = [{g for g, rol in ej.musculos.items() if rol == 'agonistas'} for ej in ejercicios]
+    dias = [[] for _ in range(n_dias)]
+    musculos_dia = [set() for _ in range(n_dias)]
+    # Primero los que más músculos mueven: son los que definen cada día
+    for i in sorted(range(len(ejercicios)), key=lambda i: -len(agonistas[i])):
+        libres = [d for d in range(n_dias) if len(dias[d]) < capacidad]
+        d = max(libres, key=lambda d: (len(agonistas[i] & musculos_dia[d]), -len(dias[d])))
+        dias[d].append(i)
+        musculos_dia[d] |= agonistas[i]
+    return [[ejercicios[i] for i in sorted(dia)] for dia in dias]
+
+
+def progresion_semanal(semanas, intensidad, descarga_cada=DESCARGA_CADA, paso=PASO_SEMANAL):
+    """(intensidades, descargas): % RM de cada semana y máscara de semanas de descarga."""
+    indices = np.arange(semanas)
+    bloque, posicion = np.divmod(indices, descarga_cada)
+    descargas = posicion == descarga_cada - 1
+    intensidades = np.where(descargas, float(intensidad) - PUNTOS_DESCARGA, float(intensidad) + paso * (bloque + posicion))
+    return np.clip(intensidades, 0, INTENSIDAD_MAXIMA), descargas
+
+
+def planificar_mesociclo(ejercicios, rm_inputs, objetivo, intensidad, reps, descanso, series, semanas=8,
+                         dias_semana=None, descarga_cada=DESCARGA_CADA, redondear_material=False):
+    """
+    Plan completo del mesociclo como dict:
+      - 'dias': {'A': [ejercicios], ...}
+      - 'calendario': DataFrame con una fila por semana (tipo, % RM, series y día de rutina de cada sesión)
+      - 'cargas': {'A': DataFrame ejercicios x semanas con la carga en kg}
+    más los datos comunes (objetivo, reps, descanso, semanas, sesiones por semana).
+    """
+    semanas = int(np.clip(semanas, SEMANAS_MIN, SEMANAS_MAX))
+    dias_semana = int(np.clip(dias_semana or DIAS_POR_OBJETIVO.get(objetivo, DIAS_POR_DEFECTO), DIAS_SEMANA_MIN, DIAS_SEMANA_MAX))
+    nombres = NOMBRES_DIAS[:num_dias_rutina(len(ejercicios), dias_semana)]
+    dias = dict(zip(nombres, repartir_dias(list(ejercicios), len(nombres))))
+
+    intensidades, descargas = progresion_semanal(semanas, intensidad, descarga_cada)
+    series_carga = series
+    series_descarga = str((num_series(series) + 1) // 2)
+
+    # Todas las cargas de golpe: (ejercicios, semanas)
+    rms = np.array([rm_inputs[ej['nombre']] for ej in ejercicios], dtype=float)
+    incremento = incrementos_para([ej.get('tipo', '') for ej in ejercicios]) if redondear_material else INCREMENTO_POR_DEFECTO
+    pesos = tabla_cargas(rms, intensidades, incremento)
+    fila = {ej['nombre']: i for i, ej in enumerate(ejercicios)}
+    columnas = [f"S{s}" for s in range(1, semanas + 1)]
+    cargas = {
+        nombre: pd.DataFrame(pesos[[fila[ej['nombre']] for ej in lista]], index=[ej['nombre'] for ej in lista], columns=columnas)
+        for nombre, lista in dias.items()
+    }
+
+    sesiones = [nombres[i % len(nombres)] for i in range(semanas * dias_semana)]
+    calendario = pd.DataFrame({
+        "Semana": np.arange(1, semanas + 1),
+        "Tipo": np.where(descargas, "Descarga", "Carga"),
+        "Intensidad": intensidades,
+        "Series": np.where(descargas, series_descarga, series_carga),
+        "Sesiones": ["-".join(sesiones[s * dias_semana:(s + 1) * dias_semana]) for s in range(semanas)],
+    })
+    return {
+        "objetivo": objetivo,
+        "semanas": semanas,
+        "dias_semana": dias_semana,
+        "reps": reps,
+        "descanso": descanso,
+        "dias": dias,
+        "calendario": calendario,
+        "cargas": cargas,
+    }
@@ -0,0 +1,70 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from generador_word import generar_variantes_cacheado
+
+# --- PREGENERACIÓN EN SEGUNDO PLANO ---
+# Mientras el alumno sigue con el formulario se construyen las dos variantes Word
+# (Estándar y Análisis) en un pool de hilos compartido por todas las sesiones.
+# Los documentos acaban en CACHE_DOCUMENTOS, así que el botón los sirve al instante.
+# Los PDF no se pregeneran: solo se construyen al pulsar su descarga. El trabajo no
+# guarda copia de los bytes: solo calienta la caché.
+MAX_HILOS_PREGENERACION = 2
+# Espera antes de encolar: si en ese tiempo cambia algo, el trabajo se descarta sin
+# haber ocupado ningún hilo del pool
+ESPERA_ASENTAR = 0.6
+
+_pool = ThreadPoolExecutor(max_workers=MAX_HILOS_PREGENERACION, thread_name_prefix="pregeneracion")
+
+
+class TrabajoPregeneracion:
+    """Construcción en segundo plano de las dos variantes Word de UNA rutina (identificada por 'clave')."""
+
+    def __init__(self, clave, parametros, espera=ESPERA_ASENTAR):
+        self.clave = clave
+        self.futuro = None
+        self._parametros = parametros
+        self._cancelado = False
+        self._lock = threading.Lock()
+        self._temporizador = threading.Timer(espera, self._encolar)
+        self._temporizador.daemon = True
+        self._temporizador.start()
+
+    def _encolar(self):
+        with self._lock:
+            if not self._cancelado:
+                self.futuro = _pool.submit(generar_variantes_cacheado, **self._parametros)
+
+    def cancelar(self):
+        # Un Word a medias no se puede interrumpir: si ya ha empezado, termina igualmente
+        with self._lock:
+            self._cancelado = True
+            self._temporizador.cancel()
+            if self.futuro is not None:
+                self.futuro.cancel()
+
+    @property
+    def cancelado(self):
+        return self._cancelado
+
+    def esperar(self):
+        """Si el trabajo ya está en marcha espera a que termine y devuelve True (relanza
+        el error si falló). Si aún no había empezado lo descarta y devuelve False: quien
+        llama genera los documentos en su hilo en lugar de hacer cola tras otras sesiones."""
+        with self._lock:
+            self._temporizador.cancel()
+            if self.futuro is None or self.futuro.cancel():
+                self._cancelado = True
+                return False
+        self.futuro.result()
+        return True
+
+
+def programar(clave, parametros, anterior=None):
+    """Devuelve el trabajo para 'clave'. Si 'anterior' es de otra rutina se cancela
+    y se lanza uno nuevo; si es de la misma, se reutiliza."""
+    if anterior is not None:
+        if anterior.clave == clave and not anterior.cancelado:
+            return anterior
+        anterior.cancelar()
+    return TrabajoPregeneracion(clave, parametros)
@@ -0,0 +1,96 @@
+import os
+import threading
+from collections import deque
+
+from catalogo import CatalogoEjercicios
+from generador_pdf import CACHE_PDF
+from generador_word import CACHE_DOCUMENTOS, preparar_plantillas, vaciar_plantillas
+from imagenes import INDICE_IMAGENES, encontrar_imagen_recursiva
+from rutinas import RUTA_DB, leer_ejercicios
+
+# --- RECURSOS COMPARTIDOS POR TODAS LAS SESIONES ---
+# Un solo ejemplar por proceso de: catálogo del Excel, índice de imágenes, miniaturas
+# (en disco, con su memo en imagenes.py) y plantillas de documento (generador_word).
+# Una vez cargado todo es de solo lectura; las cargas van con lock para que 30
+# alumnos que abren la app a la vez no lean el Excel ni recorran las carpetas 30 veces.
+_lock = threading.Lock()
+_catalogo = None
+_firma_catalogo = None
+_cargado = False
+_precargado = False
+_faltantes = (None, [])  # (clave, ejercicios sin imagen)
+
+# Últimas altas y bajas de imágenes (las muestra el panel de administración)
+MAX_CAMBIOS_IMAGENES = 20
+CAMBIOS_IMAGENES = deque(maxlen=MAX_CAMBIOS_IMAGENES)
+INDICE_IMAGENES.suscribir(lambda evento, ruta: CAMBIOS_IMAGENES.append((evento, ruta)))
+
+
+def firma_excel(ruta=RUTA_DB):
+    """Fecha y tamaño del Excel: si cambian, el catálogo se vuelve a leer."""
+    try:
+        st_excel = os.stat(ruta)
+        return st_excel.st_mtime_ns, st_excel.st_size
+    except OSError:
+        return None
+
+
+def obtener_catalogo():
+    """CatalogoEjercicios compartido, o lo mismo que leer_ejercicios si falla
+    (None si no hay Excel, 'Error: ...' si no se puede leer)."""
+    global _catalogo, _firma_catalogo, _cargado
+    firma = firma_excel()
+    if _cargado and _firma_catalogo == firma:
+        return _catalogo
+    with _lock:
+        if not (_cargado and _firma_catalogo == firma):
+            registros = leer_ejercicios()
+            _catalogo = registros if registros is None or isinstance(registros, str) else CatalogoEjercicios(registros)
+            _firma_catalogo = firma
+            _cargado = True
+        return _catalogo
+
+
+def num_imagenes():
+    return len(INDICE_IMAGENES)
+
+
+def imagenes_faltantes():
+    """Ejercicios del catálogo cuya imagen no está en el árbol. Se recalcula solo
+    cuando cambia el catálogo o las imágenes."""
+    global _faltantes
+    catalogo = obtener_catalogo()
+    if not isinstance(catalogo, CatalogoEjercicios):
+        return []
+    clave = (catalogo, INDICE_IMAGENES.version)
+    if _faltantes[0] != clave:
+        _faltantes = (clave, [ej for ej in catalogo if encontrar_imagen_recursiva(ej.imagen)[0] is None])
+    return _faltantes[1]
+
+
+def precargar():
+    """Catálogo, índice de imágenes (con su hilo de vigilancia) y plantillas de todos
+    los objetivos. Solo la primera llamada del proceso hace algo; las demás vuelven
+    al instante."""
+    global _precargado
+    if _precargado:
+        return
+    with _lock:
+        if _precargado:
+            return
+        _precargado = True
+    obtener_catalogo()
+    INDICE_IMAGENES.iniciar_vigilancia()
+    preparar_plantillas()
+
+
+def recargar():
+    """Vuelve a leer el Excel y las imágenes y vacía plantillas y documentos en caché
+    (afecta a TODAS las sesiones)."""
+    global _cargado
+    with _lock:
+        _cargado = False
+    INDICE_IMAGENES.refrescar()
+    vaciar_plantillas()
+    CACHE_DOCUMENTOS.limpiar()
+    CACHE_PDF.limpiar()
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from cargas import INCREMENTO_POR_DEFECTO, formatear_kg, incrementos_para, intensidades_series, num_series, tabla_cargas
+
+RUTA_DB = "DB_EJERCICIOS.xlsx"
+# Copia binaria ya normalizada del Excel (se invalida por fecha/tamaño y hash)
+RUTA_CACHE_DB = os.path.join(".cache", "DB_EJERCICIOS.pkl")
+# Subir este número si cambia la normalización de leer_ejercicios
+VERSION_CACHE_DB = 1
+
+# --- VALORES POR DEFECTO DE CADA OBJETIVO ---
+# Son los que muestra la interfaz al elegir el objetivo (primera opción de cada desplegable)
+PRESETS_OBJETIVO = {
+    "Fuerza Máxima": {"intensidad": 85, "reps": "1", "descanso": "3 min", "series": "4-6", "cardio": "Bajo"},
+    "Hipertrofia Muscular": {"intensidad": 65, "reps": "6", "descanso": "60 seg", "series": "3-6", "cardio": "Moderado"},
+    "Definición Muscular": {"intensidad": 60, "reps": "10", "descanso": "30 seg", "series": "3-5", "cardio": "Alto"},
+    "Programa de Pérdida de Peso": {"intensidad": 50, "reps": "12", "descanso": "20 seg", "series": "3-4", "cardio": "30-60 min + HIIT"},
+    "Resistencia Muscular": {"intensidad": 30, "reps": "15", "descanso": "15 seg", "series": "2-4", "cardio": "Muy Alto"},
+    "Mantenimiento Muscular": {"intensidad": 60, "reps": "8", "descanso": "60 seg", "series": "2-3", "cardio": "Moderado"},
+    "Rehabilitación Muscular y Articular": {"intensidad": 20, "reps": "12", "descanso": "30 seg", "series": "3", "cardio": "Muy bajo"},
+}
+
+# --- CARGAR EXCEL ---
+def _normalizar_excel(ruta):
+    df = pd.read_excel(ruta)
+    df.columns = df.columns.str.strip().str.lower()
+    if 'nombre' not in df.columns:
+        if 'ejercicio' in df.columns: df.rename(columns={'ejercicio': 'nombre'}, inplace=True)
+    for col in ['tipo', 'imagen', 'desc', 'agonistas', 'sinergistas', 'estabilizadores']:
+        if col not in df.columns: df[col] = ""
+
+    df['tipo'] = df['tipo'].astype(str).str.replace('Olimpica', 'Olímpica', regex=False)
+    df['tipo'] = df['tipo'].str.replace('olimpica', 'Olímpica', regex=False, case=False)
+    df['tipo'] = df['tipo'].str.replace('Rehabilitacion', 'Rehabilitación', regex=False)
+    df['tipo'] = df['tipo'].str.replace('Rotualiana', 'Rotuliana', regex=False)
+    df['tipo'] = df['tipo'].str.strip()
+    df = df.fillna("")
+    return df.to_dict('records')
+
+def _hash_archivo(ruta):
+    with open(ruta, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def _leer_cache_db(ruta_cache):
+    try:
+        with open(ruta_cache, 'rb') as f:
+            cache = pickle.load(f)
+    except Exception:
+        return None
+    if not isinstance(cache, dict) or cache.get('version') != VERSION_CACHE_DB:
+        return None
+    return cache
+
+def _guardar_cache_db(ruta_cache, cache):
+    try:
+        os.makedirs(os.path.dirname(ruta_cache), exist_ok=True)
+        fd, ruta_tmp = tempfile.mkstemp(dir=os.path.dirname(ruta_cache), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(ruta_tmp, ruta_cache)
+    except OSError:
+        pass  # Sin caché en disco (p. ej. sistema de archivos de solo lectura): se sigue igual
+
+def leer_ejercicios(ruta=RUTA_DB, ruta_cache=RUTA_CACHE_DB):
+    """
+    Lee y normaliza el Excel. Devuelve la lista de ejercicios, None si no existe
+    el archivo o un texto 'Error: ...' si no se puede leer.
+    El resultado se guarda en 'ruta_cache'; mientras el Excel no cambie (misma
+    fecha y tamaño, o mismo hash si solo ha cambiado la fecha) no se vuelve a abrir
+    con openpyxl.
+    """
+    try:
+        if os.path.exists(ruta):
+            st_excel = os.stat(ruta)
+            cache = _leer_cache_db(ruta_cache)
+            if cache and cache['mtime_ns'] == st_excel.st_mtime_ns and cache['tamano'] == st_excel.st_size:
+                return cache['registros']
+            sha1 = _hash_archivo(ruta)
+            if cache and cache['sha1'] == sha1:
+                registros = cache['registros']
+            else:
+                registros = _normalizar_excel(ruta)
+            _guardar_cache_db(ruta_cache, {
+                'version': VERSION_CACHE_DB,
+                'mtime_ns': st_excel.st_mtime_ns,
+                'tamano': st_excel.st_size,
+                'sha1': sha1,
+                'registros': registros,
+            })
+            return registros
+        else:
+            return None
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+# --- CONSTRUCCIÓN DE LA RUTINA ---
+def titulo_material(sel_tipos):
+    if len(sel_tipos) > 1:
+        return "MIXTO"
+    elif len(sel_tipos) == 1:
+        return sel_tipos[0]
+    return "GENERAL"
+
+def volumen_por_musculo(seleccionados_data, series, reps):
+    """Series y repeticiones de la sesión por grupo muscular. Cuentan como
+    directas las series donde el grupo es agonista y como indirectas donde es
+    sinergista (los estabilizadores no suman). Sale de Ejercicio.musculos, sin
+    recorrer el catálogo."""
+    n_series = num_series(series)
+    n_reps = num_series(reps)
+    directas = {}
+    indirectas = {}
+    for item in seleccionados_data:
+        for grupo, rol in item.musculos.items():
+            if rol == 'agonistas':
+                directas[grupo] = directas.get(grupo, 0) + n_series
+            elif rol == 'sinergistas':
+                indirectas[grupo] = indirectas.get(grupo, 0) + n_series
+    filas = [(grupo, directas.get(grupo, 0), indirectas.get(grupo, 0), directas.get(grupo, 0) * n_reps)
+             for grupo in {**directas, **indirectas}]
+    filas.sort(key=lambda fila: (-fila[1], -fila[2], fila[0]))
+    return pd.DataFrame(filas, columns=["Músculo", "Series directas", "Series indirectas", "Repeticiones directas"])
+
+
+def construir_rutina(seleccionados_data, rm_inputs, intensidad, reps, descanso, series=None, esquema="fijo", redondear_material=False):
+    """Filas de la rutina (una por ejercicio) tal y como las espera generar_word_final.
+    Las cargas salen de cargas.py en una sola operación sobre el vector de 1RM. Con un
+    esquema distinto de 'fijo' se calculan tantas series como el mínimo de 'series'
+    y la carga y la intensidad de cada fila llevan un valor por serie ('50-55-60')."""
+    rms = np.array([rm_inputs[item['nombre']] for item in seleccionados_data], dtype=float)
+    pct = intensidades_series(intensidad, 1 if esquema == "fijo" else num_series(series), esquema)
+    incremento = incrementos_para([item.get('tipo', '') for item in seleccionados_data]) if redondear_material else INCREMENTO_POR_DEFECTO
+    pesos = tabla_cargas(rms, pct, incremento)
+    if esquema == "fijo":
+        intensidad_real = f"{intensidad}%"
+    else:
+        intensidad_real = "-".join(formatear_kg(p) for p in pct) + "%"
+
+    rutina_export = []
+    for item, pesos_series in zip(seleccionados_data, pesos):
+        if esquema == "fijo":
+            peso_real = int(pesos_series[0]) if pesos_series[0].is_integer() else float(pesos_series[0])
+        else:
+            peso_real = "-".join(formatear_kg(p) for p in pesos_series)
+        rutina_export.append({
+            "Ejercicio": item['nombre'],
+            "Imagen": item['imagen'],
+            "Reps": reps,
+            "Peso": peso_real,
+            "Descanso": descanso,
+            "Intensidad_Real": intensidad_real,
+            "agonistas": item.get('agonistas', ''),
+            "sinergistas": item.get('sinergistas', ''),
+            "estabilizadores": item.get('estabilizadores', '')
+        })
+    return rutina_export
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture(autouse=True)
+def en_raiz(monkeypatch):
+    """Los módulos buscan img/, el Excel y la caché con rutas relativas a la raíz."""
+    monkeypatch.chdir(RAIZ)
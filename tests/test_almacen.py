@@ -0,0 +1,58 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import almacen
+from catalogo import CatalogoEjercicios
+from rutinas import leer_ejercicios
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return CatalogoEjercicios(leer_ejercicios())
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    ruta = str(tmp_path / "historial.sqlite3")
+    yield ruta
+    almacen.cerrar(ruta)
+
+
+def _guardar(catalogo, ruta, alumno, rm, fecha):
+    ejercicios = catalogo.entrenamiento[:3]
+    return almacen.guardar_rutina(alumno, "Hipertrofia Muscular", ["Mancuernas"], ejercicios,
+                                  {ej['nombre']: rm for ej in ejercicios}, 65, "10", "60 seg", "3-6",
+                                  "Bicicleta", "Moderado", catalogo.estiramientos[:2], fecha=fecha, ruta=ruta)
+
+
+def test_ultima_rutina_y_ultimos_rm(catalogo, ruta):
+    _guardar(catalogo, ruta, "Ana", 60, "2026-10-01T10:00:00")
+    _guardar(catalogo, ruta, "Ana", 70, "2026-10-08T10:00:00")
+    ultima = almacen.ultima_rutina("ana", ruta=ruta)
+    assert ultima["fecha"] == "2026-10-08T10:00:00"
+    assert set(almacen.ultimos_rm("Ana", ruta=ruta).values()) == {70}
+    assert len(almacen.rutinas_alumno("Ana", hasta="2026-10-01", ruta=ruta)) == 1
+    assert almacen.parametros_documento(ultima, catalogo)["alumno"] == "Ana"
+
+
+def test_una_conexion_por_archivo_para_todos_los_hilos(catalogo, ruta, monkeypatch):
+    _guardar(catalogo, ruta, "Ana", 60, None)
+    conexiones = []
+    conectar = sqlite3.connect
+    monkeypatch.setattr(almacen.sqlite3, "connect", lambda *a, **k: conexiones.append(a) or conectar(*a, **k))
+    # Cada rerun de Streamlit va en un hilo nuevo
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: almacen.ultima_rutina("Ana", ruta=ruta), range(8)))
+    assert conexiones == []
+    almacen.cerrar(ruta)
+    almacen.ultima_rutina("Ana", ruta=ruta)
+    assert len(conexiones) == 1
+
+
+def test_escrituras_desde_varios_hilos(catalogo, ruta):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: _guardar(catalogo, ruta, f"Alumno {i % 4}", 50 + i, None), range(32)))
+    assert sorted(almacen.nombres_alumnos(ruta=ruta)) == [f"Alumno {i}" for i in range(4)]
+    assert sum(len(almacen.rutinas_alumno(f"Alumno {i}", ruta=ruta)) for i in range(4)) == 32
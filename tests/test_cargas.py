@@ -0,0 +1,24 @@
+import pytest
+
+from cargas import INCREMENTOS_MATERIAL, TIPOS_SIN_CARGA, incrementos_para
+from catalogo import CatalogoEjercicios
+from rutinas import leer_ejercicios
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return CatalogoEjercicios(leer_ejercicios())
+
+
+def test_cada_tipo_del_catalogo_tiene_incremento_o_es_sin_carga(catalogo):
+    sin_decidir = [t for t in catalogo.tipos if t not in INCREMENTOS_MATERIAL and t not in TIPOS_SIN_CARGA]
+    assert sin_decidir == []
+    assert not set(INCREMENTOS_MATERIAL) & TIPOS_SIN_CARGA
+
+
+def test_las_tablas_solo_usan_tipos_del_catalogo(catalogo):
+    assert set(INCREMENTOS_MATERIAL) | TIPOS_SIN_CARGA <= set(catalogo.tipos)
+
+
+def test_incrementos_por_tipo():
+    assert list(incrementos_para(["Barra Olímpica", "Mancuernas", "TRX"])) == [2.5, 2.0, 1.0]
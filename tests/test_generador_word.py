@@ -0,0 +1,96 @@
+import os
+import re
+import zipfile
+
+import pandas as pd
+import pytest
+
+from catalogo import CatalogoEjercicios
+from generador_word import generar_mesociclo_word, generar_variantes_word, generar_word_final, huella_documento
+from imagenes import encontrar_imagen_recursiva
+from mesociclo import planificar_mesociclo
+from rutinas import construir_rutina, leer_ejercicios
+
+
+def _medios(buffer):
+    return [n for n in zipfile.ZipFile(buffer).namelist() if n.startswith("word/media/")]
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return CatalogoEjercicios(leer_ejercicios())
+
+
+def _con_foto(ejercicios, n):
+    """Los n primeros ejercicios con foto, cada uno con una foto distinta."""
+    elegidos, rutas = [], set()
+    for ej in ejercicios:
+        ruta, _ = encontrar_imagen_recursiva(ej['imagen'])
+        if ruta and ruta not in rutas:
+            elegidos.append(ej)
+            rutas.add(ruta)
+        if len(elegidos) == n:
+            return elegidos
+    pytest.skip("no hay bastantes ejercicios con foto")
+
+
+def _word(ejercicios, estiramientos, usar_plantilla):
+    rm = {ej['nombre']: 60 for ej in ejercicios}
+    rutina_df = pd.DataFrame(construir_rutina(ejercicios, rm, 65, "10", "60 seg"))
+    return generar_word_final(rutina_df, estiramientos, "Hipertrofia Muscular", "Alumno", "MIXTO", "65%",
+                              "Bicicleta", "Moderado", "3-6", False, usar_plantilla)
+
+
+# --- IMÁGENES ÚNICAS POR DOCUMENTO ---
+@pytest.mark.parametrize("usar_plantilla", [True, False])
+def test_una_parte_por_foto_distinta(catalogo, usar_plantilla):
+    e0, e1 = _con_foto(catalogo.entrenamiento, 2)
+    s0, s1 = _con_foto(catalogo.estiramientos, 2)
+    # Imágenes fijas (marca de agua, tabla resumen): lo que queda al quitar una foto de cada rejilla
+    fijas = len(_medios(_word([e0], [s0], usar_plantilla))) - 2
+    distintas = _medios(_word([e0, e1], [s0, s1], usar_plantilla))
+    repetidas = _medios(_word([e0, e1, e0, e1, e0], [s0, s1, s0, s0], usar_plantilla))
+    assert len(distintas) == fijas + 4
+    # Volver a colocar las mismas fotos no añade partes al paquete
+    assert len(repetidas) == len(distintas)
+
+
+# --- IDS DE DIBUJO ---
+def _ids_dibujos(paquete):
+    return [int(i) for nombre in paquete.namelist() if nombre.endswith(".xml")
+            for i in re.findall(rb'<wp:docPr id="(\d+)"', paquete.read(nombre))]
+
+
+@pytest.mark.parametrize("usar_plantilla", [True, False])
+def test_ids_de_dibujo_unicos(catalogo, usar_plantilla):
+    seleccion = catalogo.entrenamiento[:6]
+    rm = {ej['nombre']: 60 for ej in seleccion}
+    rutina_df = pd.DataFrame(construir_rutina(seleccion, rm, 65, "10", "60 seg"))
+    documentos = list(generar_variantes_word(rutina_df, catalogo.estiramientos[:4], "Hipertrofia Muscular", "Alumno",
+                                             "MIXTO", "65%", "Bicicleta", "Moderado", "3-6", usar_plantilla).values())
+    plan = planificar_mesociclo(seleccion, rm, "Hipertrofia Muscular", 65, "10", "60 seg", "3-6", semanas=4)
+    documentos.append(generar_mesociclo_word(plan, catalogo.estiramientos[:4], "Alumno", "MIXTO", "Bicicleta",
+                                             "Moderado", usar_plantilla))
+    for buffer in documentos:
+        ids = _ids_dibujos(zipfile.ZipFile(buffer))
+        assert ids and len(ids) == len(set(ids))
+
+
+# --- CLAVE DE LA CACHÉ DE DOCUMENTOS ---
+def test_la_huella_cambia_al_sustituir_una_foto(catalogo):
+    seleccion = catalogo.entrenamiento[:3]
+    rutina_df = pd.DataFrame(construir_rutina(seleccion, {ej['nombre']: 60 for ej in seleccion}, 65, "10", "60 seg"))
+    estiramientos = catalogo.estiramientos[:2]
+    args = (rutina_df, estiramientos, "Hipertrofia Muscular", "Alumno", "MIXTO", "65%", "Bicicleta", "Moderado", "3-6", False)
+    for nombre_imagen in (seleccion[0]['imagen'], estiramientos[0]['imagen']):
+        ruta, _ = encontrar_imagen_recursiva(nombre_imagen)
+        assert ruta
+        antes = huella_documento(*args)
+        st = os.stat(ruta)
+        try:
+            # Misma ruta y mismo nombre, otro archivo (lo que deja una foto sustituida)
+            os.utime(ruta, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            assert huella_documento(*args) != antes
+        finally:
+            os.utime(ruta, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert huella_documento(*args) == antes
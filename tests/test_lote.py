@@ -0,0 +1,32 @@
+import zipfile
+
+import pytest
+
+import lote
+from catalogo import CatalogoEjercicios
+from rutinas import leer_ejercicios
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return CatalogoEjercicios(leer_ejercicios())
+
+
+def test_solo_cuenta_los_alumnos_escritos_en_el_zip(catalogo, monkeypatch):
+    generar = lote._generar_documentos
+
+    def falla_el_segundo(indice, tarea):
+        if indice == 2:
+            raise RuntimeError("fallo al generar")
+        return generar(indice, tarea)
+
+    monkeypatch.setattr(lote, "_generar_documentos", falla_el_segundo)
+    material = catalogo.tipos_entreno[0]
+    filas = [{"alumno": f"Alumno {i}", "objetivo": "Hipertrofia Muscular", "material": material} for i in range(3)]
+    filas.append({"alumno": "Sin objetivo", "objetivo": "", "material": material})
+    zip_clase, procesados, errores = lote.generar_lote(filas, catalogo, max_procesos=1)
+
+    documentos = [n for n in zipfile.ZipFile(zip_clase).namelist() if n.endswith(".docx")]
+    assert procesados == 2
+    assert len(documentos) == 2 * procesados
+    assert len(errores) == 2
@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+# Pico de RSS que puede añadir una descarga de la rutina (12 ejercicios y 12
+# estiramientos) en un proceso ya en marcha: generar el .docx y entregar sus bytes
+MAX_PICO_DESCARGA_KB = 24 * 1024  # Hoy ronda los 6 MB
+
+
+def _pico_rss_kb():
+    with open('/proc/self/status') as f:
+        for linea in f:
+            if linea.startswith('VmHWM:'):
+                return int(linea.split()[1])
+
+
+def _rss_descarga_hijo(raiz, cola):
+    """Proceso nuevo: calienta plantilla e imágenes con un alumno, pone a cero el pico
+    de RSS y mide la descarga diferida de otro (generar_word_cacheado + getvalue)."""
+    os.chdir(raiz)
+    sys.path.insert(0, raiz)
+    import pandas as pd
+    from catalogo import CatalogoEjercicios
+    from generador_word import generar_word_cacheado
+    from rutinas import construir_rutina, leer_ejercicios
+
+    catalogo = CatalogoEjercicios(leer_ejercicios())
+    seleccion = catalogo.entrenamiento[:12]
+    rutina_df = pd.DataFrame(construir_rutina(seleccion, {ej['nombre']: 60 for ej in seleccion}, 65, "10", "60 seg"))
+
+    def descargar(alumno):
+        return generar_word_cacheado(rutina_df, catalogo.estiramientos[:12], "Hipertrofia Muscular", alumno, "MIXTO",
+                                     "65%", "Bicicleta", "Moderado", "3-6", True).getvalue()
+
+    descargar("Calentamiento")
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    antes = _pico_rss_kb()
+    datos = descargar("Alumno")
+    cola.put((_pico_rss_kb() - antes, len(datos)))
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/clear_refs'), reason="el pico de RSS se pone a cero con /proc (Linux)")
+def test_pico_rss_de_una_descarga():
+    contexto = multiprocessing.get_context('spawn')
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_rss_descarga_hijo, args=(os.getcwd(), cola))
+    proceso.start()
+    pico_kb, tamano = cola.get(timeout=120)
+    proceso.join()
+    assert tamano > 0
+    assert pico_kb < MAX_PICO_DESCARGA_KB, f"la descarga sube el pico de RSS {pico_kb} KB"
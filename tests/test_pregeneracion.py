@@ -0,0 +1,45 @@
+import threading
+import time
+
+import pregeneracion
+
+
+def test_sin_empezar_se_descarta_y_no_se_espera(monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(pregeneracion, "generar_variantes_cacheado", lambda **p: llamadas.append(p))
+    trabajo = pregeneracion.TrabajoPregeneracion("a", {"alumno": "A"}, espera=10)
+    inicio = time.perf_counter()
+    assert trabajo.esperar() is False
+    assert time.perf_counter() - inicio < 1
+    assert trabajo.cancelado
+    time.sleep(0.1)
+    assert llamadas == []
+
+
+def test_en_marcha_se_espera_a_que_termine(monkeypatch):
+    empezado, seguir = threading.Event(), threading.Event()
+    terminados = []
+
+    def generar(**parametros):
+        empezado.set()
+        seguir.wait(5)
+        terminados.append(parametros)
+
+    monkeypatch.setattr(pregeneracion, "generar_variantes_cacheado", generar)
+    trabajo = pregeneracion.TrabajoPregeneracion("a", {"alumno": "A"}, espera=0)
+    assert empezado.wait(5)
+    threading.Timer(0.1, seguir.set).start()
+    assert trabajo.esperar() is True
+    assert terminados == [{"alumno": "A"}]
+
+
+def test_la_espera_no_ocupa_el_pool(monkeypatch):
+    monkeypatch.setattr(pregeneracion, "generar_variantes_cacheado", lambda **p: None)
+    trabajos = [pregeneracion.TrabajoPregeneracion(i, {}, espera=10) for i in range(pregeneracion.MAX_HILOS_PREGENERACION + 1)]
+    # Mientras se asientan no hay nada en el pool: otro trabajo entra y termina enseguida
+    rapido = pregeneracion.TrabajoPregeneracion("rapido", {}, espera=0)
+    time.sleep(0.2)
+    assert rapido.futuro is not None and rapido.futuro.result(timeout=1) is None
+    assert all(t.futuro is None for t in trabajos)
+    for t in trabajos:
+        t.cancelar()
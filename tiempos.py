@@ -0,0 +1,90 @@
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# --- TIEMPOS POR ETAPA DE LA GENERACIÓN ---
+# generar_word_final (y el resto de generadores) abren una medición con medir() y
+# marcan cada sección con etapa(). Las etapas anidadas se guardan como "padre/hija"
+# y las que se repiten (p. ej. una por imagen) se suman.
+# Al cerrar la medición el resumen:
+#   - se escribe como una línea JSON en el logger "rutinas.tiempos" (nivel INFO)
+#   - se pasa a cada función registrada con registrar_hook()
+#   - se guarda en ULTIMAS_MEDICIONES (lo muestra el panel de administración)
+REGISTRO = logging.getLogger("rutinas.tiempos")
+MAX_MEDICIONES_GUARDADAS = 50
+ULTIMAS_MEDICIONES = deque(maxlen=MAX_MEDICIONES_GUARDADAS)
+
+_hooks = []
+_local = threading.local()  # Cada hilo (sesión, pregeneración) mide lo suyo
+
+
+class _Medicion:
+    def __init__(self):
+        self.etapas = defaultdict(float)
+        self.pila = []
+
+
+def registrar_hook(funcion):
+    """'funcion(resumen)' se llamará al terminar cada documento."""
+    if funcion not in _hooks:
+        _hooks.append(funcion)
+    return funcion
+
+
+def quitar_hook(funcion):
+    if funcion in _hooks:
+        _hooks.remove(funcion)
+
+
+@contextmanager
+def etapa(nombre):
+    """Cronometra un bloque dentro de la medición en curso (sin medición, no hace nada)."""
+    medicion = getattr(_local, 'medicion', None)
+    if medicion is None:
+        yield
+        return
+    ruta = f"{medicion.pila[-1]}/{nombre}" if medicion.pila else nombre
+    medicion.pila.append(ruta)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.etapas[ruta] += time.perf_counter() - inicio
+        medicion.pila.pop()
+
+
+@contextmanager
+def medir(documento, **datos):
+    """Medición completa de un documento. Si ya hay una en curso (un generador que
+    llama a otro) se comporta como una etapa más de la exterior."""
+    if getattr(_local, 'medicion', None) is not None:
+        with etapa(documento):
+            yield
+        return
+    medicion = _local.medicion = _Medicion()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - inicio
+        _local.medicion = None
+        _publicar({
+            "documento": documento,
+            **datos,
+            "total_ms": round(total * 1000, 2),
+            "etapas": {nombre: round(segundos * 1000, 2) for nombre, segundos in medicion.etapas.items()},
+        })
+
+
+def _publicar(resumen):
+    ULTIMAS_MEDICIONES.append(resumen)
+    if REGISTRO.isEnabledFor(logging.INFO):
+        REGISTRO.info(json.dumps(resumen, ensure_ascii=False))
+    for funcion in list(_hooks):
+        try:
+            funcion(resumen)
+        except Exception:
+            REGISTRO.exception("Fallo en un hook de tiempos")